@@ -5,7 +5,8 @@ from sqlalchemy import pool
 from sqlalchemy.engine import Connection
 from sqlalchemy.ext.asyncio import async_engine_from_config
 
-from src.models import Base
+from src.models import Base, ScheduledJobRun
+from src.build.models import BuildJob, BuildPhaseTiming
 from src.container.models import ContainerImage
 from src.function.models import Function
 
@@ -0,0 +1,40 @@
+"""add build job
+
+Revision ID: 3f8b2d6e91c4
+Revises: 7c3e1f9a42d0
+Create Date: 2026-10-18 11:02:17.540913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f8b2d6e91c4'
+down_revision: Union[str, Sequence[str], None] = '7c3e1f9a42d0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('build_job',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('language', sa.String(), nullable=False),
+    sa.Column('phase', sa.Enum('queued', 'context_uploaded', 'builder_scheduled', 'image_pushed', 'service_ready', 'healthy', 'failed', name='buildphase'), nullable=False),
+    sa.Column('function_id', sa.String(), nullable=True),
+    sa.Column('error', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_build_job_phase'), 'build_job', ['phase'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_build_job_phase'), table_name='build_job')
+    op.drop_table('build_job')
+    sa.Enum(name='buildphase').drop(op.get_bind(), checkfirst=True)
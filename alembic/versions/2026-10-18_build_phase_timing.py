@@ -0,0 +1,47 @@
+"""build phase timing
+
+Revision ID: 8011b66ea655
+Revises: 5d0c83a7e1f2
+Create Date: 2026-10-18 18:12:47.530912
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8011b66ea655'
+down_revision: Union[str, Sequence[str], None] = '5d0c83a7e1f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('build_phase_timing',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('job_id', sa.String(), nullable=False),
+    sa.Column('function_id', sa.String(), nullable=True),
+    sa.Column('container_image_tag', sa.String(), nullable=True),
+    sa.Column('phase', sa.Enum('context_assembly', 'context_upload', 'pod_scheduled', 'pod_running', 'image_pushed', 'knative_ready', 'first_healthy', name='timelinephase'), nullable=False),
+    sa.Column('started_at', sa.TIMESTAMP(timezone=True), nullable=False),
+    sa.Column('finished_at', sa.TIMESTAMP(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['job_id'], ['build_job.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_build_phase_timing_container_image_tag'), 'build_phase_timing', ['container_image_tag'], unique=False)
+    op.create_index(op.f('ix_build_phase_timing_finished_at'), 'build_phase_timing', ['finished_at'], unique=False)
+    op.create_index(op.f('ix_build_phase_timing_function_id'), 'build_phase_timing', ['function_id'], unique=False)
+    op.create_index(op.f('ix_build_phase_timing_job_id'), 'build_phase_timing', ['job_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_build_phase_timing_job_id'), table_name='build_phase_timing')
+    op.drop_index(op.f('ix_build_phase_timing_function_id'), table_name='build_phase_timing')
+    op.drop_index(op.f('ix_build_phase_timing_finished_at'), table_name='build_phase_timing')
+    op.drop_index(op.f('ix_build_phase_timing_container_image_tag'), table_name='build_phase_timing')
+    op.drop_table('build_phase_timing')
+    sa.Enum(name='timelinephase').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,40 @@
+"""build queue
+
+Revision ID: 5d0c83a7e1f2
+Revises: e42a9c17d6b5
+Create Date: 2026-10-18 16:41:09.318274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d0c83a7e1f2'
+down_revision: Union[str, Sequence[str], None] = 'e42a9c17d6b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('build_job', sa.Column('tenant', sa.String(), server_default='default', nullable=False))
+    op.add_column('build_job', sa.Column('priority', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('build_job', sa.Column('enqueued_at', sa.TIMESTAMP(timezone=True), nullable=True))
+    op.add_column('build_job', sa.Column('admitted_at', sa.TIMESTAMP(timezone=True), nullable=True))
+    op.add_column('build_job', sa.Column('released_at', sa.TIMESTAMP(timezone=True), nullable=True))
+    op.add_column('build_job', sa.Column('lease_expires_at', sa.TIMESTAMP(timezone=True), nullable=True))
+    op.create_index(op.f('ix_build_job_lease_expires_at'), 'build_job', ['lease_expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_build_job_lease_expires_at'), table_name='build_job')
+    op.drop_column('build_job', 'lease_expires_at')
+    op.drop_column('build_job', 'released_at')
+    op.drop_column('build_job', 'admitted_at')
+    op.drop_column('build_job', 'enqueued_at')
+    op.drop_column('build_job', 'priority')
+    op.drop_column('build_job', 'tenant')
@@ -0,0 +1,50 @@
+"""content addressed images
+
+Revision ID: 7c3e1f9a42d0
+Revises: 2a6f03b78205
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c3e1f9a42d0'
+down_revision: Union[str, Sequence[str], None] = '2a6f03b78205'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('container_image', sa.Column('digest', sa.String(), nullable=True))
+    op.add_column('container_image', sa.Column('ref_count', sa.Integer(), server_default='0', nullable=False))
+    op.create_index(op.f('ix_container_image_digest'), 'container_image', ['digest'], unique=True)
+
+    # Functions get their own identity, the image becomes a shared reference
+    op.add_column('function', sa.Column('container_image_tag', sa.String(), nullable=True))
+    op.execute('UPDATE function SET container_image_tag = id')
+    op.alter_column('function', 'container_image_tag', nullable=False)
+    op.drop_constraint('function_id_fkey', 'function', type_='foreignkey')
+    op.create_foreign_key(None, 'function', 'container_image', ['container_image_tag'], ['tag'])
+    op.create_index(op.f('ix_function_container_image_tag'), 'function', ['container_image_tag'], unique=False)
+
+    op.execute(
+        'UPDATE container_image SET ref_count = '
+        '(SELECT count(*) FROM function WHERE function.container_image_tag = container_image.tag)'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_function_container_image_tag'), table_name='function')
+    op.drop_constraint('function_container_image_tag_fkey', 'function', type_='foreignkey')
+    op.drop_column('function', 'container_image_tag')
+    op.create_foreign_key('function_id_fkey', 'function', 'container_image', ['id'], ['tag'])
+
+    op.drop_index(op.f('ix_container_image_digest'), table_name='container_image')
+    op.drop_column('container_image', 'ref_count')
+    op.drop_column('container_image', 'digest')
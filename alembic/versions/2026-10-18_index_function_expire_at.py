@@ -0,0 +1,27 @@
+"""index function expire_at
+
+Revision ID: b71d4a0c5e38
+Revises: 3f8b2d6e91c4
+Create Date: 2026-10-18 13:45:09.302871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b71d4a0c5e38'
+down_revision: Union[str, Sequence[str], None] = '3f8b2d6e91c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_function_expire_at'), 'function', ['expire_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_function_expire_at'), table_name='function')
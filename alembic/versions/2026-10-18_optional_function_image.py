@@ -0,0 +1,32 @@
+"""optional function image
+
+Revision ID: e42a9c17d6b5
+Revises: b71d4a0c5e38
+Create Date: 2026-10-18 15:20:44.871256
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e42a9c17d6b5'
+down_revision: Union[str, Sequence[str], None] = 'b71d4a0c5e38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column('function', 'container_image_tag',
+               existing_type=sa.String(),
+               nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column('function', 'container_image_tag',
+               existing_type=sa.String(),
+               nullable=False)
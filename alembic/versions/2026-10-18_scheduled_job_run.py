@@ -0,0 +1,32 @@
+"""scheduled job run
+
+Revision ID: 4c9e27b1d8f3
+Revises: 8011b66ea655
+Create Date: 2026-10-18 20:05:31.284716
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c9e27b1d8f3'
+down_revision: Union[str, Sequence[str], None] = '8011b66ea655'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('scheduled_job_run',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('last_run_at', sa.TIMESTAMP(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('scheduled_job_run')
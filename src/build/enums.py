@@ -0,0 +1,31 @@
+from enum import StrEnum
+
+
+class BuildPhase(StrEnum):
+    """Phases of a function build job, in pipeline order"""
+
+    queued = "queued"
+    context_uploaded = "context_uploaded"
+    builder_scheduled = "builder_scheduled"
+    image_pushed = "image_pushed"
+    service_ready = "service_ready"
+    healthy = "healthy"
+    failed = "failed"
+
+    @property
+    def is_terminal(self) -> bool:
+        return self in (BuildPhase.healthy, BuildPhase.failed)
+
+
+class TimelinePhase(StrEnum):
+    """Timed steps of a create, in pipeline order. Builds skip the first five
+    when the image is cached, and warm pool and runtime image deploys always do.
+    """
+
+    context_assembly = "context_assembly"
+    context_upload = "context_upload"
+    pod_scheduled = "pod_scheduled"
+    pod_running = "pod_running"
+    image_pushed = "image_pushed"
+    knative_ready = "knative_ready"
+    first_healthy = "first_healthy"
@@ -0,0 +1,81 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+from sqlalchemy import ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.types import TIMESTAMP
+
+from src.function.models import FunctionResponse
+from src.models import Base, TimestampMixin
+
+from .enums import BuildPhase, TimelinePhase
+
+
+# Pydantic models
+class BuildJobResponse(BaseModel):
+    id: str
+    language: str
+    phase: BuildPhase
+    error: str | None = None
+    function: FunctionResponse | None = None
+    # Set while the job waits for a build slot, 1 is next in line
+    queue_position: int | None = None
+    estimated_wait_secs: float | None = None
+    created_at: datetime
+    updated_at: datetime | None = None
+
+
+class PhaseTiming(BaseModel):
+    phase: TimelinePhase
+    started_at: datetime
+    finished_at: datetime
+    duration_secs: float
+
+
+class FunctionTimeline(BaseModel):
+    function_id: str
+    job_id: str
+    container_image_tag: str | None = None
+    phases: list[PhaseTiming]
+
+
+class PhasePercentiles(BaseModel):
+    phase: TimelinePhase
+    count: int
+    p50_secs: float
+    p95_secs: float
+    p99_secs: float
+
+
+# SQLAlchemy models
+class BuildJob(TimestampMixin, Base):
+    id: Mapped[str] = mapped_column(primary_key=True)
+    language: Mapped[str]
+    phase: Mapped[BuildPhase] = mapped_column(default=BuildPhase.queued, index=True)
+    function_id: Mapped[str | None]
+    error: Mapped[str | None]
+
+    # Build queue, see src/build/queue.py
+    tenant: Mapped[str] = mapped_column(server_default="default")
+    priority: Mapped[int] = mapped_column(server_default="0")
+    enqueued_at: Mapped[datetime | None] = mapped_column(TIMESTAMP(timezone=True))
+    admitted_at: Mapped[datetime | None] = mapped_column(TIMESTAMP(timezone=True))
+    released_at: Mapped[datetime | None] = mapped_column(TIMESTAMP(timezone=True))
+    lease_expires_at: Mapped[datetime | None] = mapped_column(
+        TIMESTAMP(timezone=True), index=True
+    )
+
+
+class BuildPhaseTiming(Base):
+    """One timed phase of a create, see src/build/timeline.py"""
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    job_id: Mapped[str] = mapped_column(
+        ForeignKey("build_job.id", ondelete="CASCADE"), index=True
+    )
+    # Plain columns like BuildJob.function_id, timings outlive expired functions
+    function_id: Mapped[str | None] = mapped_column(index=True)
+    container_image_tag: Mapped[str | None] = mapped_column(index=True)
+    phase: Mapped[TimelinePhase]
+    started_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True))
+    finished_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), index=True)
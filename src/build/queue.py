@@ -0,0 +1,374 @@
+import asyncio
+import heapq
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from itertools import groupby
+from typing import AsyncIterator
+
+from sqlalchemy import and_, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import config
+from src.database import advisory_lock, async_session_factory
+from src.function.cache import TTLCache
+
+from .enums import BuildPhase
+from .models import BuildJob
+
+log = logging.getLogger(__name__)
+
+# Assumed build duration until builds have been measured
+DEFAULT_BUILD_SECS = 60.0
+# Recent builds averaged for wait estimates, and how long the average is reused
+ESTIMATE_SAMPLE_SIZE = 20
+ESTIMATE_CACHE_SECS = 10
+# Most waiting jobs considered per dispatch
+DISPATCH_WINDOW = 1000
+
+
+@dataclass(frozen=True)
+class QueuedBuild:
+    id: str
+    tenant: str
+    priority: int
+    enqueued_at: datetime
+
+
+def fair_order(
+    waiting: list[QueuedBuild], running: dict[str, int]
+) -> list[QueuedBuild]:
+    """Orders waiting builds for admission.
+
+    Higher priorities go first. Within a priority, tenants take turns, the
+    one with the fewest running and already ordered builds first, so a burst
+    from one tenant doesn't hold up everybody else.
+    """
+    load = dict(running)
+    ordered = []
+    by_priority = sorted(waiting, key=lambda b: (-b.priority, b.enqueued_at))
+    for _, builds in groupby(by_priority, key=lambda b: b.priority):
+        per_tenant: dict[str, deque[QueuedBuild]] = {}
+        for build in builds:
+            per_tenant.setdefault(build.tenant, deque()).append(build)
+
+        turns = [(load.get(t, 0), q[0].enqueued_at, t) for t, q in per_tenant.items()]
+        heapq.heapify(turns)
+        while turns:
+            tenant_load, _, tenant = heapq.heappop(turns)
+            queue = per_tenant[tenant]
+            ordered.append(queue.popleft())
+            load[tenant] = tenant_load + 1
+            if queue:
+                heapq.heappush(turns, (tenant_load + 1, queue[0].enqueued_at, tenant))
+    return ordered
+
+
+def estimate_wait(position: int, concurrency: int, build_secs: float) -> float:
+    """Seconds until the build at a 1-based queue position is admitted.
+
+    At full load builds finish at `concurrency / build_secs` per second, and
+    `position` of them have to finish first.
+    """
+    return position * build_secs / concurrency
+
+
+def lease_alive():
+    return BuildJob.lease_expires_at > func.now()
+
+
+def waiting_clause():
+    return and_(
+        BuildJob.enqueued_at.is_not(None),
+        BuildJob.admitted_at.is_(None),
+        BuildJob.released_at.is_(None),
+        lease_alive(),
+    )
+
+
+def running_clause():
+    return and_(
+        BuildJob.admitted_at.is_not(None),
+        BuildJob.released_at.is_(None),
+        lease_alive(),
+    )
+
+
+async def running_by_tenant(db_session: AsyncSession) -> dict[str, int]:
+    query = (
+        select(BuildJob.tenant, func.count())
+        .where(running_clause())
+        .group_by(BuildJob.tenant)
+    )
+    return dict((await db_session.execute(query)).all())
+
+
+def to_queued(rows) -> list[QueuedBuild]:
+    return [QueuedBuild(r.id, r.tenant, r.priority, r.enqueued_at) for r in rows]
+
+
+_average_build_secs: TTLCache[float] = TTLCache(
+    ttl_secs=ESTIMATE_CACHE_SECS, max_entries=1
+)
+
+
+async def average_build_secs(db_session: AsyncSession) -> float:
+    """Average of the recent build durations, cached for ESTIMATE_CACHE_SECS."""
+    cached = _average_build_secs.get("average")
+    if cached is not None:
+        return cached
+
+    recent = (
+        select(
+            func.extract("epoch", BuildJob.released_at - BuildJob.admitted_at).label(
+                "secs"
+            )
+        )
+        .where(BuildJob.admitted_at.is_not(None), BuildJob.released_at.is_not(None))
+        .order_by(BuildJob.released_at.desc())
+        .limit(ESTIMATE_SAMPLE_SIZE)
+        .subquery()
+    )
+    average = await db_session.scalar(select(func.avg(recent.c.secs)))
+    build_secs = float(average) if average else DEFAULT_BUILD_SECS
+    _average_build_secs.put("average", build_secs)
+    return build_secs
+
+
+async def queue_status(
+    db_session: AsyncSession, job: BuildJob
+) -> tuple[int, float] | None:
+    """Queue position and estimated wait of a job waiting for a build slot."""
+    if job.enqueued_at is None or job.admitted_at is not None:
+        return None
+
+    waiting = to_queued(
+        await db_session.execute(
+            select(
+                BuildJob.id, BuildJob.tenant, BuildJob.priority, BuildJob.enqueued_at
+            ).where(waiting_clause())
+        )
+    )
+    order = [b.id for b in fair_order(waiting, await running_by_tenant(db_session))]
+    if job.id not in order:
+        return None
+
+    position = order.index(job.id) + 1
+    build_secs = await average_build_secs(db_session)
+    return position, estimate_wait(position, config.BUILD_MAX_CONCURRENT, build_secs)
+
+
+class BuildQueue:
+    """Admission of builder pods, shared by all API replicas through the database.
+
+    A build waits in line in the build_job table until a dispatch admits it.
+    Dispatches run on whichever replica has waiting builds, one at a time
+    under an advisory lock, and lock the rows they admit with SKIP LOCKED.
+    Jobs hold a lease renewed by their replica from creation until their last
+    phase, so the slots of a replica that died are freed once its leases run
+    out, and `fail_abandoned` fails its jobs whichever phase they were in.
+    """
+
+    def __init__(self, max_concurrent: int, poll_secs: float, lease_secs: float):
+        self.max_concurrent = max_concurrent
+        self.poll_secs = poll_secs
+        self.lease_secs = lease_secs
+        self._waiting: dict[str, asyncio.Future] = {}
+        self._leased: set[str] = set()
+        self._renewed_at = 0.0
+        self._changed = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def lease_expiry(self):
+        """Expiry of a lease taken or renewed now, for new jobs to start with."""
+        return func.now() + timedelta(seconds=self.lease_secs)
+
+    @asynccontextmanager
+    async def lease(self, job_id: str) -> AsyncIterator[None]:
+        """Renews the lease of a job for the block, ending it afterwards.
+
+        The block runs the whole job, the build slot being only one part of it.
+        """
+        self._leased.add(job_id)
+        try:
+            yield
+        finally:
+            self._leased.discard(job_id)
+            await self._end_lease(job_id)
+
+    async def _end_lease(self, job_id: str):
+        try:
+            async with async_session_factory() as db_session:
+                await db_session.execute(
+                    update(BuildJob)
+                    .where(BuildJob.id == job_id)
+                    .values(lease_expires_at=None)
+                )
+                await db_session.commit()
+        except Exception:
+            # Left to expire, jobs in a final phase aren't failed again
+            log.exception("Failed to end build job lease", extra={"job_id": job_id})
+
+    @asynccontextmanager
+    async def slot(self, job_id: str) -> AsyncIterator[None]:
+        """Waits in line for a build slot and holds it for the block.
+
+        Slots are only admitted to jobs inside `lease`, which keeps them alive.
+        """
+        try:
+            await self._acquire(job_id)
+            yield
+        finally:
+            self._waiting.pop(job_id, None)
+            await self._release(job_id)
+
+    async def _acquire(self, job_id: str):
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[job_id] = future
+        async with async_session_factory() as db_session:
+            await db_session.execute(
+                update(BuildJob)
+                .where(BuildJob.id == job_id)
+                .values(enqueued_at=func.now())
+            )
+            await db_session.commit()
+        self._changed.set()
+        await future
+        log.info("Build admitted", extra={"job_id": job_id})
+
+    async def _release(self, job_id: str):
+        try:
+            async with async_session_factory() as db_session:
+                await db_session.execute(
+                    update(BuildJob)
+                    .where(BuildJob.id == job_id)
+                    .values(released_at=func.now())
+                )
+                await db_session.commit()
+        except Exception:
+            # The slot frees itself once the lease runs out
+            log.exception("Failed to release build slot", extra={"job_id": job_id})
+        self._changed.set()
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._changed.wait(), self.poll_secs)
+            except asyncio.TimeoutError:
+                pass
+            self._changed.clear()
+
+            try:
+                await self.tick()
+            except Exception:
+                log.exception("Build queue dispatch failed")
+
+    async def tick(self):
+        """Renews this replica's leases, dispatches and wakes admitted builds."""
+        if self._leased and time.monotonic() - self._renewed_at > self.lease_secs / 3:
+            await self._renew_leases()
+        if not self._waiting:
+            return
+
+        async with advisory_lock("build_queue_dispatch") as acquired:
+            if acquired:
+                await self.dispatch()
+
+        async with async_session_factory() as db_session:
+            admitted = await db_session.scalars(
+                select(BuildJob.id).where(
+                    BuildJob.id.in_(list(self._waiting)),
+                    BuildJob.admitted_at.is_not(None),
+                )
+            )
+            for job_id in admitted:
+                future = self._waiting.pop(job_id, None)
+                if future and not future.done():
+                    future.set_result(None)
+
+    async def _renew_leases(self):
+        self._renewed_at = time.monotonic()
+        async with async_session_factory() as db_session:
+            await db_session.execute(
+                update(BuildJob)
+                .where(BuildJob.id.in_(list(self._leased)))
+                .values(lease_expires_at=self.lease_expiry())
+            )
+            await db_session.commit()
+
+    async def dispatch(self) -> list[str]:
+        """Admits waiting builds into free slots, returns the admitted job ids."""
+        async with async_session_factory() as db_session:
+            running = await running_by_tenant(db_session)
+            free = self.max_concurrent - sum(running.values())
+            if free <= 0:
+                return []
+
+            query = (
+                select(
+                    BuildJob.id,
+                    BuildJob.tenant,
+                    BuildJob.priority,
+                    BuildJob.enqueued_at,
+                )
+                .where(waiting_clause())
+                .order_by(BuildJob.priority.desc(), BuildJob.enqueued_at)
+                .limit(DISPATCH_WINDOW)
+                .with_for_update(skip_locked=True)
+            )
+            waiting = to_queued(await db_session.execute(query))
+            admitted = [b.id for b in fair_order(waiting, running)[:free]]
+            if admitted:
+                await db_session.execute(
+                    update(BuildJob)
+                    .where(BuildJob.id.in_(admitted))
+                    .values(admitted_at=func.now())
+                )
+            await db_session.commit()
+
+        if admitted:
+            log.info(
+                f"Admitted {len(admitted)} builds",
+                extra={"admitted": len(admitted), "waiting": len(waiting)},
+            )
+        return admitted
+
+    async def fail_abandoned(self) -> int:
+        """Fails unfinished jobs whose replica stopped renewing their lease.
+
+        Returns the number of jobs failed.
+        """
+        async with async_session_factory() as db_session:
+            result = await db_session.execute(
+                update(BuildJob)
+                .where(
+                    BuildJob.lease_expires_at <= func.now(),
+                    BuildJob.phase.not_in([BuildPhase.healthy, BuildPhase.failed]),
+                )
+                .values(
+                    phase=BuildPhase.failed,
+                    error="Build interrupted",
+                    lease_expires_at=None,
+                )
+            )
+            await db_session.commit()
+        return result.rowcount
+
+
+build_queue = BuildQueue(
+    max_concurrent=config.BUILD_MAX_CONCURRENT,
+    poll_secs=config.BUILD_QUEUE_POLL_SECS,
+    lease_secs=config.BUILD_LEASE_SECS,
+)
@@ -0,0 +1,19 @@
+import logging
+
+from src.config import config
+from src.scheduler import leader_only, scheduler
+
+from .queue import build_queue
+
+log = logging.getLogger(__name__)
+
+
+@scheduler.scheduled_job(
+    "interval", seconds=config.BUILD_LEASE_SECS, misfire_grace_time=10
+)
+@leader_only("build_fail_abandoned", config.BUILD_LEASE_SECS)
+async def build_fail_abandoned():
+    """Fails build jobs whose replica died, once their lease has run out"""
+    failed = await build_queue.fail_abandoned()
+    if failed:
+        log.warning(f"Failed {failed} abandoned build jobs", extra={"failed": failed})
@@ -0,0 +1,231 @@
+import asyncio
+import logging
+from contextlib import AbstractAsyncContextManager
+from functools import partial
+from typing import Any, Awaitable, Callable
+from uuid import uuid4
+
+from aiohttp import ClientSession as AsyncHttpSession
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.container import service as container_service
+from src.container.models import ContainerImageCreate
+from src.database import async_session_factory
+from src.function import pool
+from src.function import service as function_service
+from src.function.models import Function, FunctionCreate, FunctionResponse
+from src.metrics import BUILD_JOBS, PIPELINE_PHASE_SECONDS
+
+from .enums import BuildPhase, TimelinePhase
+from .models import BuildJob, BuildJobResponse
+from .queue import build_queue, queue_status
+from .timeline import Timeline, save_timeline
+
+log = logging.getLogger(__name__)
+
+# Callback used by the pipeline to report progress
+PhaseCallback = Callable[[BuildPhase], Awaitable[None]]
+# Context a build runs in, e.g. a build queue slot
+Admission = Callable[[], AbstractAsyncContextManager]
+
+# Strong references to running jobs, the event loop only keeps weak ones
+_running_jobs: set[asyncio.Task] = set()
+
+
+async def create(db_session: AsyncSession, function_in: FunctionCreate) -> BuildJob:
+    """Records a new build job in the queued phase."""
+    job = BuildJob(
+        id=str(uuid4()),
+        language=function_in.language,
+        phase=BuildPhase.queued,
+        tenant=function_in.tenant,
+        priority=function_in.priority,
+        # Renewed by `run`, so the job fails if this replica dies before then
+        lease_expires_at=build_queue.lease_expiry(),
+    )
+    db_session.add(job)
+    await db_session.commit()
+    return job
+
+
+async def get(db_session: AsyncSession, job_id: str) -> BuildJob | None:
+    """Returns a build job based on the given id."""
+    return await db_session.get(BuildJob, job_id)
+
+
+async def to_response(db_session: AsyncSession, job: BuildJob) -> BuildJobResponse:
+    """Builds the API representation of a job, including its function once ready."""
+    function_response = None
+    if job.function_id:
+        function = await function_service.get_metadata(db_session, job.function_id)
+        if function:
+            function_response = FunctionResponse(
+                id=function.id,
+                language=job.language,
+                url=function.url,
+                created_at=function.created_at,
+            )
+
+    # Only jobs still waiting for a slot have a place in line
+    position, wait = None, None
+    if job.phase == BuildPhase.queued:
+        position, wait = await queue_status(db_session, job) or (None, None)
+
+    return BuildJobResponse(
+        id=job.id,
+        language=job.language,
+        phase=job.phase,
+        error=job.error,
+        function=function_response,
+        queue_position=position,
+        estimated_wait_secs=wait,
+        created_at=job.created_at,
+        updated_at=job.updated_at,
+    )
+
+
+async def set_phase(job_id: str, phase: BuildPhase, **values: Any):
+    """Persists a phase transition so any API replica can report it."""
+    async with async_session_factory() as db_session:
+        job = await db_session.get(BuildJob, job_id)
+        job.phase = phase
+        for key, value in values.items():
+            setattr(job, key, value)
+        await db_session.commit()
+
+    log.info("Build job phase", extra={"job_id": job_id, "phase": phase})
+
+
+async def build_and_create(
+    k8s_api_client: Any,
+    db_session: AsyncSession,
+    function_in: FunctionCreate,
+    progress: PhaseCallback,
+    admission: Admission | None = None,
+    timeline: Timeline | None = None,
+) -> Function:
+    """Builds an image for the function, or reuses a cached one, and deploys it."""
+    timeline = timeline or Timeline()
+    container_image_in = ContainerImageCreate(
+        language=function_in.language, body=function_in.body
+    )
+    container = await container_service.create(
+        k8s_api_client, db_session, container_image_in, progress, admission, timeline
+    )
+
+    try:
+        with timeline.phase(TimelinePhase.knative_ready):
+            return await function_service.create(
+                k8s_api_client, db_session, container, function_in
+            )
+    except Exception:
+        await container_service.release(db_session, container.tag)
+        raise
+
+
+async def deploy(
+    k8s_api_client: Any,
+    db_session: AsyncSession,
+    http_session: AsyncHttpSession,
+    function_in: FunctionCreate,
+    progress: PhaseCallback,
+    admission: Admission | None = None,
+    timeline: Timeline | None = None,
+) -> Function:
+    """Deploys on a warm pool instance, the runtime image or a built image"""
+    timeline = timeline or Timeline()
+    language = function_in.language
+    if pool.is_enabled(language):
+        with timeline.phase(TimelinePhase.knative_ready):
+            function = await pool.get_warm_pool(language).claim(
+                k8s_api_client, db_session, http_session, function_in.body, function_in
+            )
+        if function:
+            return function
+
+    if function_service.runtime_image(language):
+        with timeline.phase(TimelinePhase.knative_ready):
+            return await function_service.create_from_source(
+                k8s_api_client, db_session, language, function_in.body, function_in
+            )
+    return await build_and_create(
+        k8s_api_client,
+        db_session,
+        function_in,
+        progress,
+        admission,
+        timeline,
+    )
+
+
+async def run(
+    job_id: str,
+    function_in: FunctionCreate,
+    k8s_api_client: Any,
+    http_session: AsyncHttpSession,
+):
+    """Runs the build and deploy pipeline of a job, recording each phase."""
+
+    async def progress(phase: BuildPhase):
+        await set_phase(job_id, phase)
+
+    timeline = Timeline()
+    function = None
+    # Held until the job is healthy or failed, the build slot is only part of it
+    async with build_queue.lease(job_id):
+        try:
+            async with async_session_factory() as db_session:
+                function = await deploy(
+                    k8s_api_client,
+                    db_session,
+                    http_session,
+                    function_in,
+                    progress,
+                    partial(build_queue.slot, job_id),
+                    timeline,
+                )
+
+            await set_phase(job_id, BuildPhase.service_ready, function_id=function.id)
+
+            with (
+                PIPELINE_PHASE_SECONDS.labels("health_wait").time(),
+                timeline.phase(TimelinePhase.first_healthy),
+            ):
+                await function_service.wait_for_healthy(http_session, function.url)
+            await set_phase(job_id, BuildPhase.healthy)
+            BUILD_JOBS.labels("healthy").inc()
+        except asyncio.CancelledError:
+            BUILD_JOBS.labels("interrupted").inc()
+            await set_phase(job_id, BuildPhase.failed, error="Build interrupted")
+            raise
+        except Exception as e:
+            BUILD_JOBS.labels("failed").inc()
+            log.exception("Build job failed", extra={"job_id": job_id})
+            await set_phase(job_id, BuildPhase.failed, error=str(e))
+        finally:
+            await save_timeline(
+                job_id,
+                timeline,
+                function_id=function.id if function else None,
+                container_image_tag=function.container_image_tag if function else None,
+            )
+
+
+def start(
+    job_id: str,
+    function_in: FunctionCreate,
+    k8s_api_client: Any,
+    http_session: AsyncHttpSession,
+) -> asyncio.Task:
+    """Runs a job in the background of the current event loop."""
+    task = asyncio.create_task(run(job_id, function_in, k8s_api_client, http_session))
+    _running_jobs.add(task)
+    task.add_done_callback(_running_jobs.discard)
+    return task
+
+
+async def cancel_running():
+    """Cancels jobs still running in this process, e.g. on shutdown."""
+    for task in list(_running_jobs):
+        task.cancel()
+    await asyncio.gather(*_running_jobs, return_exceptions=True)
@@ -0,0 +1,181 @@
+import logging
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterator
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database import async_session_factory
+
+from .enums import TimelinePhase
+from .models import (
+    BuildPhaseTiming,
+    FunctionTimeline,
+    PhasePercentiles,
+    PhaseTiming,
+)
+
+log = logging.getLogger(__name__)
+
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class Timeline:
+    """Start and end times of the phases of one create, kept in memory.
+
+    The pipeline records into it as it goes and the job saves it once, when it
+    finishes, so timing costs no database round-trips along the way.
+    """
+
+    def __init__(self):
+        self.phases: dict[TimelinePhase, tuple[datetime, datetime]] = {}
+
+    def add(self, phase: TimelinePhase, started_at: datetime, finished_at: datetime):
+        self.phases[phase] = (started_at, finished_at)
+
+    @contextmanager
+    def phase(self, phase: TimelinePhase) -> Iterator[None]:
+        """Times a block, recording it only if it completes."""
+        started_at = utc_now()
+        yield
+        self.add(phase, started_at, utc_now())
+
+    def add_builder_pod(self, pod: Any):
+        """Adds the builder pod phases from the timestamps Kubernetes recorded.
+
+        These have a resolution of one second and use the API server's clock.
+        """
+        status = pod.status
+        scheduled_at = next(
+            (
+                c.last_transition_time
+                for c in status.conditions or []
+                if c.type == "PodScheduled"
+            ),
+            None,
+        )
+        terminated = next(
+            (
+                s.state.terminated
+                for s in status.container_statuses or []
+                if s.state and s.state.terminated
+            ),
+            None,
+        )
+        if scheduled_at is None or terminated is None:
+            return
+
+        self.add(
+            TimelinePhase.pod_scheduled, pod.metadata.creation_timestamp, scheduled_at
+        )
+        self.add(TimelinePhase.pod_running, scheduled_at, terminated.started_at)
+        self.add(
+            TimelinePhase.image_pushed, terminated.started_at, terminated.finished_at
+        )
+
+
+async def save_timeline(
+    job_id: str,
+    timeline: Timeline,
+    function_id: str | None = None,
+    container_image_tag: str | None = None,
+):
+    """Persists the phases of a finished job in one insert, never raising."""
+    if not timeline.phases:
+        return
+
+    try:
+        async with async_session_factory() as db_session:
+            db_session.add_all(
+                BuildPhaseTiming(
+                    job_id=job_id,
+                    function_id=function_id,
+                    container_image_tag=container_image_tag,
+                    phase=phase,
+                    started_at=started_at,
+                    finished_at=finished_at,
+                )
+                for phase, (started_at, finished_at) in timeline.phases.items()
+            )
+            await db_session.commit()
+    except Exception:
+        log.exception("Failed to save build timeline", extra={"job_id": job_id})
+
+
+def duration(started_at: datetime, finished_at: datetime) -> float:
+    return (finished_at - started_at).total_seconds()
+
+
+async def get_function_timeline(
+    db_session: AsyncSession, function_id: str
+) -> FunctionTimeline | None:
+    """Returns the timeline of the create that deployed a function."""
+    rows = (
+        await db_session.scalars(
+            select(BuildPhaseTiming).where(BuildPhaseTiming.function_id == function_id)
+        )
+    ).all()
+    if not rows:
+        return None
+
+    order = list(TimelinePhase)
+    rows = sorted(rows, key=lambda r: order.index(r.phase))
+    return FunctionTimeline(
+        function_id=function_id,
+        job_id=rows[0].job_id,
+        container_image_tag=rows[0].container_image_tag,
+        phases=[
+            PhaseTiming(
+                phase=r.phase,
+                started_at=r.started_at,
+                finished_at=r.finished_at,
+                duration_secs=duration(r.started_at, r.finished_at),
+            )
+            for r in rows
+        ],
+    )
+
+
+async def phase_percentiles(
+    db_session: AsyncSession, window_secs: int
+) -> list[PhasePercentiles]:
+    """p50, p95 and p99 duration of each phase finished within the window.
+
+    Computed by the database over the finished_at index, nothing is loaded.
+    """
+    secs = func.extract(
+        "epoch", BuildPhaseTiming.finished_at - BuildPhaseTiming.started_at
+    )
+    query = (
+        select(
+            BuildPhaseTiming.phase,
+            func.count(),
+            *(func.percentile_cont(q).within_group(secs) for q in (0.5, 0.95, 0.99)),
+        )
+        .where(
+            BuildPhaseTiming.finished_at >= utc_now() - timedelta(seconds=window_secs)
+        )
+        .group_by(BuildPhaseTiming.phase)
+    )
+    by_phase = {
+        phase: (count, p50, p95, p99)
+        for phase, count, p50, p95, p99 in await db_session.execute(query)
+    }
+
+    results = []
+    for phase in TimelinePhase:
+        if phase in by_phase:
+            count, p50, p95, p99 = by_phase[phase]
+            results.append(
+                PhasePercentiles(
+                    phase=phase,
+                    count=count,
+                    p50_secs=p50,
+                    p95_secs=p95,
+                    p99_secs=p99,
+                )
+            )
+    return results
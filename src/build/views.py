@@ -0,0 +1,62 @@
+import asyncio
+import logging
+
+from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import StreamingResponse
+
+from src.database import ReadSession, async_session_factory
+
+from .models import BuildJobResponse
+from .service import get, to_response
+
+log = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Interval between database polls of a streamed job
+EVENT_POLL_SECS = 1
+# Comment lines keep idle proxies from closing the stream
+KEEPALIVE_SECS = 15
+
+
+@router.get("/{job_id}", summary="Returns the status of a build job")
+async def get_job(job_id: str, db_session: ReadSession) -> BuildJobResponse:
+    job = await get(db_session, job_id)
+    if not job:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Not found")
+
+    return await to_response(db_session, job)
+
+
+@router.get("/{job_id}/events", summary="Streams build job phase transitions")
+async def stream_job_events(job_id: str, db_session: ReadSession) -> StreamingResponse:
+    """Server-Sent-Events stream with one `phase` event per transition"""
+    if not await get(db_session, job_id):
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Not found")
+
+    async def events():
+        last_phase = None
+        idle = 0.0
+        while True:
+            async with async_session_factory() as session:
+                job = await get(session, job_id)
+                response = await to_response(session, job)
+
+            if response.phase != last_phase:
+                last_phase = response.phase
+                idle = 0.0
+                yield f"event: phase\ndata: {response.model_dump_json()}\n\n"
+                if response.phase.is_terminal:
+                    return
+            elif idle >= KEEPALIVE_SECS:
+                idle = 0.0
+                yield ": keepalive\n\n"
+
+            await asyncio.sleep(EVENT_POLL_SECS)
+            idle += EVENT_POLL_SECS
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
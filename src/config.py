@@ -1,11 +1,27 @@
 import os
 from typing import Literal
 
-from kubernetes import client
-from kubernetes import config as k8s_config
+from pydantic import BaseModel
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+class BuildProfile(BaseModel):
+    """Kaniko options and builder pod resources of a language's builds"""
+
+    # Layer cache in the registry, see KANIKO_CACHE_REPO
+    cache: bool = True
+    cache_copy_layers: bool = True
+    cache_ttl: str = "336h"
+    snapshot_mode: Literal["full", "redo", "time"] = "redo"
+    compression: Literal["gzip", "zstd"] = "gzip"
+    compression_level: int | None = None
+    cpu_request: str = "500m"
+    memory_request: str = "1Gi"
+    cpu_limit: str | None = "2"
+    memory_limit: str | None = "4Gi"
+    timeout_secs: int = 180
+
+
 class Settings(BaseSettings):
     DATABASE_URL: str
     LOGGING_LEVEL: Literal["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
@@ -14,6 +30,22 @@ class Settings(BaseSettings):
     # K8s configuration
     IN_CLUSTER: bool = bool(os.getenv("KUBERNETES_SERVICE_HOST"))
     FUNCTION_NAMESPACE: str
+    # Shared API client connection pool and default request timeouts
+    K8S_POOL_MAXSIZE: int = 32
+    K8S_CONNECT_TIMEOUT_SECS: float = 5
+    K8S_REQUEST_TIMEOUT_SECS: float = 30
+    # Deadlines for a new Knative Service to become ready and pass its health check
+    KNATIVE_READY_TIMEOUT_SECS: float = 120
+    FUNCTION_HEALTH_TIMEOUT_SECS: float = 30
+    # Lines of builder pod logs kept when a build fails
+    BUILD_LOG_TAIL_LINES: int = 50
+    # Builder pods running at once across all API replicas, the rest wait in line
+    BUILD_MAX_CONCURRENT: int = 8
+    # Interval between build queue dispatches, and how long a replica's claim on
+    # its build jobs lasts without renewal, also the interval of the sweep that
+    # fails the jobs of replicas that died
+    BUILD_QUEUE_POLL_SECS: float = 1
+    BUILD_LEASE_SECS: float = 30
 
     # S3 configuration
     AWS_ACCESS_KEY_ID: str
@@ -21,28 +53,92 @@ class Settings(BaseSettings):
     S3_BUCKET: str
     S3_ENDPOINT_URL: str
     S3_REGION_NAME: str = "apac"
+    # Build contexts left behind, e.g. by a crashed replica, are swept after this
+    BUILD_CONTEXT_RETENTION_SECS: int = 24 * 3600
+    BUILD_CONTEXT_SWEEP_SECS: int = 3600
 
     # Container configuration
+    # Prebuilt image of templates/contexts/python; Python functions skip builds when set
+    PYTHON_RUNTIME_IMAGE: str | None = None
+    # Ready runtime services kept per language for instant deploys, 0 disables
+    WARM_POOL_SIZE: int = 0
+    WARM_POOL_REFILL_SECS: int = 30
+    # Interval between checks of the build context templates for changes
+    TEMPLATE_CACHE_CHECK_SECS: float = 30
     CONTAINER_REGISTRY: str
     CONTAINER_REGISTRY_API_URL: str
     CONTAINER_REGISTRY_USERNAME: str
     CONTAINER_REGISTRY_PASSWORD: str
+    # Registry API client: connections, timeouts, attempts per request and
+    # parallel deletes. Certificates are only verified with REGISTRY_VERIFY_TLS
+    REGISTRY_POOL_SIZE: int = 32
+    REGISTRY_TIMEOUT_SECS: float = 30
+    REGISTRY_CONNECT_TIMEOUT_SECS: float = 5
+    REGISTRY_ATTEMPTS: int = 4
+    REGISTRY_DELETE_CONCURRENCY: int = 16
+    REGISTRY_VERIFY_TLS: bool = False
+    # Repository for Kaniko's layer cache, defaults to CONTAINER_REGISTRY + "-cache"
+    KANIKO_CACHE_REPO: str | None = None
+    # Build profiles by language, "default" applies to languages without one
+    BUILD_PROFILES: dict[str, BuildProfile] = {"default": BuildProfile()}
+    # Pre-build each template's dependency layers into the cache at startup
+    BUILD_CACHE_WARM: bool = True
+
+    # Largest accepted handler source, runtime image handlers ship in a 1 MiB ConfigMap
+    FUNCTION_BODY_MAX_BYTES: int = 256 * 1024
+    # Timeout of the gofmt syntax check of Go handlers, skipped without gofmt
+    GO_SYNTAX_CHECK_TIMEOUT_SECS: float = 5
+
+    # Platform limits of per-function autoscaling and resource settings
+    FUNCTION_MIN_SCALE_LIMIT: int = 3
+    FUNCTION_MAX_SCALE_LIMIT: int = 20
+    FUNCTION_CONCURRENCY_LIMIT: int = 1000
+    FUNCTION_SCALE_DOWN_DELAY_LIMIT_SECS: int = 3600
+    FUNCTION_CPU_LIMIT: str = "2"
+    FUNCTION_MEMORY_LIMIT: str = "2Gi"
+
+    # In-process cache of function metadata for lookups by id
+    FUNCTION_CACHE_SECS: float = 30
+    FUNCTION_CACHE_SIZE: int = 10000
+    # Invocation gateway upstream timeouts and keep-alive pool of the shared
+    # HTTP session
+    INVOKE_CONNECT_TIMEOUT_SECS: float = 5
+    INVOKE_READ_TIMEOUT_SECS: float = 60
+    HTTP_POOL_SIZE: int = 200
+    HTTP_POOL_SIZE_PER_HOST: int = 50
+    HTTP_KEEPALIVE_SECS: float = 30
+
+    # Function health checks: per-probe timeout, probes in flight per request and
+    # ids per bulk request
+    HEALTH_PROBE_TIMEOUT_SECS: float = 5
+    HEALTH_PROBE_CONCURRENCY: int = 32
+    HEALTH_BULK_MAX_IDS: int = 500
 
     # Function lifespan
     FUNCTION_CLEANUP_SECS: int
+    # Interval for loading upcoming expiry deadlines from the database
+    FUNCTION_EXPIRY_SYNC_SECS: int = 60
+    # Expired function reaper: rows per page, parallel deletes and attempts per delete
+    REAPER_PAGE_SIZE: int = 100
+    REAPER_CONCURRENCY: int = 16
+    REAPER_ATTEMPTS: int = 3
 
-    model_config = SettingsConfigDict(env_file=".env")
+    # Orphan reconciler, see src/reconciler/service.py
+    RECONCILER_INTERVAL_SECS: int = 900
+    # Only log the orphans found, deleting nothing
+    RECONCILER_DRY_RUN: bool = False
+    # Younger resources may belong to a create still in progress
+    RECONCILER_GRACE_SECS: int = 3600
+    RECONCILER_PAGE_SIZE: int = 100
+    # Requests per second to the API server and registry, lists and deletes alike
+    RECONCILER_RATE_PER_SEC: float = 10
+    # Most deletes per resource kind and run
+    RECONCILER_MAX_DELETES: int = 500
 
-    def get_k8s_client(self) -> client.ApiClient:
-        """Get kubernetes client base on running environment"""
-        try:
-            if self.IN_CLUSTER:
-                k8s_config.load_incluster_config()
-            else:
-                k8s_config.load_config()
-            return client.ApiClient()
-        except Exception as e:
-            raise RuntimeError(f"Failed to load kubernetes configuration: {e}")
+    # Worker threads for blocking k8s/S3 calls made from the API event loop
+    BLOCKING_IO_WORKERS: int = 32
+
+    model_config = SettingsConfigDict(env_file=".env")
 
 
 config = Settings()
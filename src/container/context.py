@@ -0,0 +1,137 @@
+import gzip
+import hashlib
+import os
+import tarfile
+import threading
+import time
+from dataclasses import dataclass
+
+from .enums import HandlerFiles
+
+TEMPLATES_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "templates", "contexts"
+)
+
+# Two zero blocks mark the end of a tar archive
+END_OF_ARCHIVE = b"\0" * (2 * tarfile.BLOCKSIZE)
+
+# Bytecode written next to the templates, e.g. by test runs, depends on the
+# environment and is neither fingerprinted nor shipped
+IGNORED_DIRS = ("__pycache__",)
+IGNORED_SUFFIXES = (".pyc",)
+
+
+def get_template_dir(language: str) -> str:
+    """Returns the build context template directory for a language."""
+    return os.path.join(TEMPLATES_DIR, language)
+
+
+def tar_member(arcname: str, data: bytes, mode: int = 0o644) -> bytes:
+    """Serialises a single regular file as a tar header and padded data."""
+    info = tarfile.TarInfo(arcname)
+    info.size = len(data)
+    info.mode = mode
+    header = info.tobuf(tarfile.DEFAULT_FORMAT, tarfile.ENCODING, "surrogateescape")
+    return header + data + b"\0" * (-len(data) % tarfile.BLOCKSIZE)
+
+
+@dataclass(frozen=True)
+class TemplateArchive:
+    """Template files of a language, pre-assembled as a gzip member.
+
+    The archive has no end-of-archive marker so a per-request gzip member with
+    the handler can be appended. Concatenated gzip members form a valid stream.
+    """
+
+    language: str
+    signature: tuple
+    fingerprint: str
+    compressed: bytes
+
+    def with_handler(self, body: str) -> bytes:
+        """Returns the complete build context with the handler appended."""
+        handler = tar_member(f"src/{HandlerFiles[self.language]}", body.encode("utf-8"))
+        return self.compressed + gzip.compress(handler + END_OF_ARCHIVE)
+
+
+def template_signature(language: str) -> tuple:
+    """Paths, sizes and mtimes of a template tree, used to detect changes."""
+    template_dir = get_template_dir(language)
+    entries = []
+    for root, dirs, files in os.walk(template_dir):
+        dirs[:] = sorted(d for d in dirs if d not in IGNORED_DIRS)
+        for f in sorted(files):
+            if f.endswith(IGNORED_SUFFIXES):
+                continue
+            stat = os.stat(os.path.join(root, f))
+            entries.append((os.path.join(root, f), stat.st_size, stat.st_mtime_ns))
+    return tuple(entries)
+
+
+def build_template_archive(language: str) -> TemplateArchive:
+    """Reads and compresses the template tree of a language."""
+    template_dir = get_template_dir(language)
+    handler_file = HandlerFiles[language]
+    signature = template_signature(language)
+
+    members = []
+    for path, _, _ in signature:
+        arcname = os.path.relpath(path, template_dir)
+        # Avoid duplicating the handler file if present
+        if arcname == handler_file:
+            continue
+        with open(path, "rb") as f:
+            data = f.read()
+        members.append(tar_member(arcname, data, os.stat(path).st_mode & 0o777))
+
+    # Members carry no timestamps or owners, so the bytes only depend on content
+    raw = b"".join(members)
+    return TemplateArchive(
+        language=language,
+        signature=signature,
+        fingerprint=hashlib.sha256(raw).hexdigest(),
+        compressed=gzip.compress(raw),
+    )
+
+
+class TemplateArchiveCache:
+    """Keeps one template archive per language in memory.
+
+    The template tree is re-checked at most every `check_secs` and the
+    archive rebuilt when it changed.
+    """
+
+    def __init__(self, check_secs: float):
+        self.check_secs = check_secs
+        self._archives: dict[str, tuple[TemplateArchive, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, language: str) -> TemplateArchive:
+        cached = self._archives.get(language)
+        now = time.monotonic()
+        if cached and now - cached[1] < self.check_secs:
+            return cached[0]
+
+        with self._lock:
+            cached = self._archives.get(language)
+            if cached and now - cached[1] < self.check_secs:
+                return cached[0]
+
+            if cached and cached[0].signature == template_signature(language):
+                archive = cached[0]
+            else:
+                archive = build_template_archive(language)
+            self._archives[language] = (archive, now)
+            return archive
+
+    def warm(self, languages):
+        """Assembles the archives up front, e.g. at startup."""
+        for language in languages:
+            self.get(language)
+
+    def invalidate(self, language: str | None = None):
+        with self._lock:
+            if language is None:
+                self._archives.clear()
+            else:
+                self._archives.pop(language, None)
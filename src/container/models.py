@@ -16,6 +16,10 @@ class ContainerImage(TimestampMixin, Base):
     tag: Mapped[str] = mapped_column(primary_key=True)
     language: Mapped[LanguageTypes]
     registry: Mapped[str]
-    function: Mapped["Function"] = relationship(  # noqa: F821
-        "Function", back_populates="container_image", uselist=False
+    # Content address of the build inputs, used to reuse images across functions
+    digest: Mapped[str | None] = mapped_column(unique=True, index=True)
+    # Number of live functions referencing this image
+    ref_count: Mapped[int] = mapped_column(default=0, server_default="0")
+    functions: Mapped[list["Function"]] = relationship(  # noqa: F821
+        "Function", back_populates="container_image"
     )
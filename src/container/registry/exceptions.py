@@ -1,4 +1,11 @@
 class ContainerRegistryError(Exception):
     """Raised when container registry operations fail"""
 
-    pass
+    def __init__(self, message: str, status: int | None = None):
+        super().__init__(message)
+        self.status = status
+
+    @property
+    def is_retryable(self) -> bool:
+        # Throttling and server errors usually pass
+        return self.status == 429 or (self.status is not None and self.status >= 500)
@@ -1,36 +1,137 @@
+import asyncio
+import logging
 from urllib.parse import urljoin
 
 import aiohttp
 
+from src.retry import retry
+
 from .exceptions import ContainerRegistryError
 
+log = logging.getLogger(__name__)
+
+
+def is_retryable(e: Exception) -> bool:
+    if isinstance(e, ContainerRegistryError):
+        return e.is_retryable
+    # Connection failures and timeouts
+    return isinstance(e, (aiohttp.ClientError, asyncio.TimeoutError))
+
 
 class ContainerRegistry:
-    def __init__(self, url: str, username: str, password: str):
+    """Harbor REST API client with its own connection pool.
+
+    Requests time out, and throttled, failed or unanswered requests are retried
+    with jittered exponential backoff.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        username: str,
+        password: str,
+        pool_size: int = 32,
+        timeout: float = 30,
+        connect_timeout: float = 5,
+        attempts: int = 4,
+        verify_tls: bool = False,
+    ):
         self.url = url
         self.username = username
         self.password = password
+        self.pool_size = pool_size
+        self.attempts = attempts
+        self.verify_tls = verify_tls
         self._auth = aiohttp.BasicAuth(login=self.username, password=self.password)
+        self._timeout = aiohttp.ClientTimeout(
+            total=timeout, sock_connect=connect_timeout
+        )
+        self._session: aiohttp.ClientSession | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
 
-    async def delete_image(
-        self,
-        session: aiohttp.ClientSession,
-        project: str,
-        repository: str,
-        tag: str,
-    ) -> bool:
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Returns the pooled session, opened on first use in the running loop."""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._loop = loop
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.pool_size,
+                    limit_per_host=self.pool_size,
+                    ssl=None if self.verify_tls else False,
+                ),
+                auth=self._auth,
+                timeout=self._timeout,
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def _artifacts_url(self, project: str, repository: str) -> str:
+        path = f"/api/v2.0/projects/{project}/repositories/{repository}/artifacts"
+        return urljoin(self.url, path)
+
+    async def delete_image(self, project: str, repository: str, tag: str) -> bool:
         """Deletes container image by via REST API"""
-        path = f"/api/v2.0/projects/{project}/repositories/{repository}/artifacts/{tag}"
-        api_endpoint = urljoin(self.url, path)
-
-        async with session.delete(auth=self._auth, url=api_endpoint, ssl=False) as resp:
-            if resp.status == 200:
-                return True
-            elif resp.status == 404:
-                # Image already deleted or doesnt exist
-                return False
-            else:
-                error_msg = await resp.text()
-                raise ContainerRegistryError(
-                    f"Failed to delete image {tag}: HTTP {resp.status} - {error_msg}"
-                )
+        api_endpoint = f"{self._artifacts_url(project, repository)}/{tag}"
+
+        async def attempt() -> bool:
+            async with self._get_session().delete(api_endpoint) as resp:
+                if resp.status == 200:
+                    return True
+                elif resp.status == 404:
+                    # Image already deleted or doesnt exist
+                    return False
+                else:
+                    error_msg = await resp.text()
+                    raise ContainerRegistryError(
+                        f"Failed to delete image {tag}: HTTP {resp.status} - {error_msg}",
+                        resp.status,
+                    )
+
+        return await retry(attempt, attempts=self.attempts, retry_on=is_retryable)
+
+    async def delete_images(
+        self, project: str, repository: str, tags: list[str], concurrency: int = 16
+    ) -> dict[str, bool | Exception]:
+        """Deletes many images concurrently, at most `concurrency` at a time.
+
+        Returns the result of each tag, or the exception its delete ended with.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def bounded(tag: str) -> bool:
+            async with semaphore:
+                return await self.delete_image(project, repository, tag)
+
+        results = await asyncio.gather(
+            *(bounded(tag) for tag in tags), return_exceptions=True
+        )
+        return dict(zip(tags, results))
+
+    async def list_artifacts(
+        self, project: str, repository: str, page: int = 1, page_size: int = 100
+    ) -> list[dict]:
+        """Lists a page of the artifacts in a repository, with their tags"""
+        params = {"page": page, "page_size": page_size, "with_tag": "true"}
+
+        async def attempt() -> list[dict]:
+            async with self._get_session().get(
+                self._artifacts_url(project, repository), params=params
+            ) as resp:
+                if resp.status == 200:
+                    return await resp.json()
+                elif resp.status == 404:
+                    # Repository doesn't exist until the first push
+                    return []
+                else:
+                    error_msg = await resp.text()
+                    raise ContainerRegistryError(
+                        f"Failed to list {repository}: HTTP {resp.status} - {error_msg}",
+                        resp.status,
+                    )
+
+        return await retry(attempt, attempts=self.attempts, retry_on=is_retryable)
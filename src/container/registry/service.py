@@ -1,5 +1,3 @@
-from aiohttp import ClientSession as AsyncHttpSession
-
 from src.config import config
 
 from .registry import ContainerRegistry
@@ -8,11 +6,34 @@ registry_client = ContainerRegistry(
     username=config.CONTAINER_REGISTRY_USERNAME,
     password=config.CONTAINER_REGISTRY_PASSWORD,
     url=config.CONTAINER_REGISTRY_API_URL,
+    pool_size=config.REGISTRY_POOL_SIZE,
+    timeout=config.REGISTRY_TIMEOUT_SECS,
+    connect_timeout=config.REGISTRY_CONNECT_TIMEOUT_SECS,
+    attempts=config.REGISTRY_ATTEMPTS,
+    verify_tls=config.REGISTRY_VERIFY_TLS,
 )
 
 
-async def delete_container_image(
-    http_session: AsyncHttpSession, project: str, repository: str, tag: str
-) -> bool:
+async def delete_container_image(project: str, repository: str, tag: str) -> bool:
     """Delete container image from registry"""
-    return await registry_client.delete_image(http_session, project, repository, tag)
+    return await registry_client.delete_image(project, repository, tag)
+
+
+async def delete_container_images(
+    project: str, repository: str, tags: list[str]
+) -> dict[str, bool | Exception]:
+    """Delete many container images from registry, see `delete_images`"""
+    return await registry_client.delete_images(
+        project, repository, tags, config.REGISTRY_DELETE_CONCURRENCY
+    )
+
+
+async def list_container_images(
+    project: str, repository: str, page: int = 1, page_size: int = 100
+) -> list[dict]:
+    """List a page of container images in a registry repository"""
+    return await registry_client.list_artifacts(project, repository, page, page_size)
+
+
+async def close_registry_client():
+    await registry_client.close()
@@ -0,0 +1,43 @@
+import asyncio
+import datetime
+import logging
+
+from src.config import config
+from src.executor import run_sync
+from src.k8s.client import get_api_client
+from src.scheduler import leader_only, scheduler
+
+from .enums import LanguageTypes
+from .service import s3_client, sweep_build_contexts, warm_build_cache
+
+log = logging.getLogger(__name__)
+
+
+@leader_only("container_warm_build_cache")
+async def container_warm_build_cache():
+    """Fills the Kaniko layer cache for every language template, run at startup"""
+    results = await asyncio.gather(
+        *(warm_build_cache(get_api_client(), language) for language in LanguageTypes),
+        return_exceptions=True,
+    )
+    for language, result in zip(LanguageTypes, results):
+        if isinstance(result, Exception):
+            log.error(
+                "Build cache warming failed",
+                extra={"language": language, "error": repr(result)},
+            )
+
+
+@scheduler.scheduled_job(
+    "interval", seconds=config.BUILD_CONTEXT_SWEEP_SECS, misfire_grace_time=60
+)
+@leader_only("container_sweep_build_contexts", config.BUILD_CONTEXT_SWEEP_SECS)
+async def container_sweep_build_contexts():
+    """Deletes build contexts older than the retention, e.g. of crashed builds"""
+    older_than = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(
+        seconds=config.BUILD_CONTEXT_RETENTION_SECS
+    )
+    deleted = await run_sync(
+        sweep_build_contexts, s3_client, config.S3_BUCKET, older_than
+    )
+    log.info(f"Swept {deleted} stale build contexts", extra={"deleted": deleted})
@@ -1,26 +1,74 @@
+import hashlib
 import os
-import tarfile
+from contextlib import AbstractAsyncContextManager, nullcontext
+from datetime import datetime
 from io import BytesIO
-from typing import Any
+from typing import Any, Awaitable, Callable
 from uuid import uuid4
 
 import boto3
-import yaml
 import logging
-from aiohttp import ClientSession as AsyncHttpSession
 from botocore.exceptions import ClientError
 from kubernetes import utils
+from kubernetes.client.exceptions import ApiException
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.config import config
+from src.build.enums import BuildPhase, TimelinePhase
+from src.build.timeline import Timeline
+from src.config import BuildProfile, config
+from src.executor import run_sync
 from src.k8s import service as k8s_service
+from src.k8s.dependencies import k8s_core_client
+from src.manifests import ManifestTemplate
+from src.metrics import (
+    BUILD_CACHE_HITS,
+    BUILD_FAILURES,
+    BUILDS,
+    BUILDS_IN_FLIGHT,
+    PIPELINE_PHASE_SECONDS,
+)
 
-from .enums import HandlerFiles
+from .context import TemplateArchiveCache
+from .enums import LanguageTypes
 from .models import ContainerImage, ContainerImageCreate
-from .registry.service import delete_container_image
+from .registry.service import delete_container_image, delete_container_images
 
 log = logging.getLogger(__name__)
 
+# Template portion of build contexts, assembled once per language
+template_archives = TemplateArchiveCache(check_secs=config.TEMPLATE_CACHE_CHECK_SECS)
+
+builder_template = ManifestTemplate(
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "templates", "builder.yaml"
+    ),
+    placeholders=("tag", "registry", "context"),
+)
+
+# Matches the labels set in templates/builder.yaml
+BUILDER_LABEL_SELECTOR = "app=faas-builder"
+BUILDER_NAMESPACE = "kaniko"
+# Build context of a cache warming pod, to tell when a shared context is unused
+CONTEXT_LABEL = "faas.platform/context"
+
+# Build contexts are stored under this prefix, named after their image tag
+CONTEXT_PREFIX = "contexts/"
+# Most keys S3 accepts in one multi-object delete
+S3_DELETE_BATCH_SIZE = 1000
+
+# Minimal handlers built by the cache warming builds, only their layers are kept
+WARM_HANDLERS = {
+    LanguageTypes.python: "def handler(event, ctx):\n    return {}\n",
+    LanguageTypes.go: (
+        "package main\n\n"
+        "func Handle(event Event, ctx Context) (Result, error) {\n"
+        "\treturn Result{StatusCode: 200}, nil\n"
+        "}\n"
+    ),
+}
+
 s3_client = boto3.client(
     service_name="s3",
     endpoint_url=config.S3_ENDPOINT_URL,
@@ -30,41 +78,37 @@ s3_client = boto3.client(
 )
 
 
-def create_build_context(
-    s3_client: Any, container_image_in: ContainerImageCreate, tag: str, bucket: str
-) -> str:
-    """Create & upload build context in memory."""
+def build_digest(container_image_in: ContainerImageCreate) -> str:
+    """Content address of an image: language, template tree and handler body."""
+    language = container_image_in.language.value
+    digest = hashlib.sha256()
+    digest.update(language.encode("utf-8") + b"\0")
+    fingerprint = template_archives.get(language).fingerprint
+    digest.update(fingerprint.encode("utf-8") + b"\0")
+    digest.update(container_image_in.body.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def assemble_build_context(container_image_in: ContainerImageCreate) -> bytes:
+    """Build context archive of a handler, in memory."""
+    archive = template_archives.get(container_image_in.language)
+    return archive.with_handler(container_image_in.body)
+
+
+def context_key(name: str) -> str:
+    return f"{CONTEXT_PREFIX}{name}.tar.gz"
+
+
+def upload_build_context(s3_client: Any, data: bytes, name: str, bucket: str) -> str:
+    """Uploads a build context archive and returns its S3 URL.
+
+    Builds name contexts after their image tag, so each build owns its object
+    and concurrent builds of the same digest never delete each other's. Uploading
+    again refreshes its age for the retention sweep.
+    """
+    tar_key = context_key(name)
+    buf = BytesIO(data)
 
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    template_dir = os.path.join(
-        base_dir, "templates", "contexts", container_image_in.language
-    )
-    handler_file = HandlerFiles[container_image_in.language]
-    tar_key = f"{tag}.tar.gz"
-
-    buf = BytesIO()
-    with tarfile.open(fileobj=buf, mode="w:gz") as tar:
-        # Add user handler body
-        data = container_image_in.body.encode("utf-8")
-        h_info = tarfile.TarInfo(f"src/{handler_file}")
-        h_info.size = len(data)
-        tar.addfile(h_info, BytesIO(data))
-
-        # Add template files; avoid duplicating handler file if present
-        for entry in os.listdir(template_dir):
-            entry_path = os.path.join(template_dir, entry)
-            if entry == handler_file:
-                continue
-            if os.path.isdir(entry_path):
-                for root, _, files in os.walk(entry_path):
-                    for f in files:
-                        fp = os.path.join(root, f)
-                        arcname = os.path.relpath(fp, template_dir)
-                        tar.add(fp, arcname=arcname)
-            else:
-                tar.add(entry_path, arcname=entry)
-
-    buf.seek(0)
     try:
         s3_client.upload_fileobj(buf, bucket, tar_key)
     except ClientError as e:
@@ -76,67 +120,414 @@ def create_build_context(
     return f"s3://{bucket}/{tar_key}"
 
 
+def create_build_context(
+    s3_client: Any, container_image_in: ContainerImageCreate, name: str, bucket: str
+) -> str:
+    """Create & upload build context in memory."""
+    data = assemble_build_context(container_image_in)
+    return upload_build_context(s3_client, data, name, bucket)
+
+
+def delete_build_contexts(s3_client: Any, bucket: str, keys: list[str]) -> int:
+    """Deletes objects with multi-object deletes, returns the number deleted.
+
+    Missing keys count as deleted, failures are logged and left for the sweep.
+    """
+    deleted = 0
+    for i in range(0, len(keys), S3_DELETE_BATCH_SIZE):
+        batch = keys[i : i + S3_DELETE_BATCH_SIZE]
+        response = s3_client.delete_objects(
+            Bucket=bucket,
+            Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True},
+        )
+        errors = response.get("Errors", [])
+        for error in errors:
+            log.error(
+                "Failed to delete build context",
+                extra={"key": error.get("Key"), "error": error.get("Message")},
+            )
+        deleted += len(batch) - len(errors)
+    return deleted
+
+
+def stale_build_contexts(
+    s3_client: Any, bucket: str, older_than: datetime
+) -> list[str]:
+    """Keys of build contexts last uploaded before `older_than`.
+
+    Also covers contexts stored at the bucket root per image tag, as they were
+    before contexts moved under `CONTEXT_PREFIX`.
+    """
+    paginator = s3_client.get_paginator("list_objects_v2")
+    stale = []
+    for prefix, delimiter in ((CONTEXT_PREFIX, ""), ("", "/")):
+        for page in paginator.paginate(
+            Bucket=bucket, Prefix=prefix, Delimiter=delimiter
+        ):
+            stale += [
+                obj["Key"]
+                for obj in page.get("Contents", [])
+                if obj["Key"].endswith(".tar.gz") and obj["LastModified"] < older_than
+            ]
+    return stale
+
+
+def sweep_build_contexts(s3_client: Any, bucket: str, older_than: datetime) -> int:
+    """Deletes build contexts last uploaded before `older_than`."""
+    stale = stale_build_contexts(s3_client, bucket, older_than)
+    return delete_build_contexts(s3_client, bucket, stale)
+
+
+def context_label(name: str) -> str:
+    # Label values are limited to 63 characters
+    return name[:63]
+
+
+async def release_build_context(name: str, pod_name: str | None):
+    """Deletes the context of a finished warming pod unless another pod uses it.
+
+    Replicas warming the same template share the object, so it stays while a
+    builder pod with the same context label is still pending or running.
+    Never raises, anything left over is removed by the retention sweep.
+    """
+    try:
+        pods = await run_sync(
+            k8s_core_client().list_namespaced_pod,
+            BUILDER_NAMESPACE,
+            label_selector=f"{CONTEXT_LABEL}={context_label(name)}",
+        )
+        if any(
+            pod.metadata.name != pod_name and pod.status.phase in ("Pending", "Running")
+            for pod in pods.items
+        ):
+            return
+        await run_sync(
+            delete_build_contexts, s3_client, config.S3_BUCKET, [context_key(name)]
+        )
+    except Exception:
+        log.exception("Failed to release build context", extra={"context": name})
+
+
+def build_profile(language: str) -> BuildProfile:
+    """Returns the configured build profile of a language."""
+    profiles = config.BUILD_PROFILES
+    return profiles.get(language) or profiles.get("default") or BuildProfile()
+
+
+def max_build_timeout_secs() -> int:
+    """Longest build timeout of any configured profile."""
+    profiles = [BuildProfile(), *config.BUILD_PROFILES.values()]
+    return max(profile.timeout_secs for profile in profiles)
+
+
+def cache_repo() -> str:
+    return config.KANIKO_CACHE_REPO or f"{config.CONTAINER_REGISTRY}-cache"
+
+
+def kaniko_args(profile: BuildProfile) -> list[str]:
+    """Kaniko executor flags of a build profile."""
+    args = [f"--snapshot-mode={profile.snapshot_mode}"]
+    args.append(f"--compression={profile.compression}")
+    if profile.compression_level is not None:
+        args.append(f"--compression-level={profile.compression_level}")
+    if profile.cache:
+        repo = cache_repo()
+        args += [
+            "--cache=true",
+            f"--cache-repo={repo}",
+            f"--cache-ttl={profile.cache_ttl}",
+            # Same registry as the destination, which is not TLS verified either
+            f"--skip-tls-verify-registry={repo.split('/')[0]}",
+        ]
+        if profile.cache_copy_layers:
+            args.append("--cache-copy-layers")
+    return args
+
+
+def apply_build_profile(manifest: dict, profile: BuildProfile) -> dict:
+    """Adds the profile's Kaniko flags and resources to a builder pod manifest."""
+    container = manifest["spec"]["containers"][0]
+    container["args"] += kaniko_args(profile)
+
+    resources = {
+        "requests": {"cpu": profile.cpu_request, "memory": profile.memory_request}
+    }
+    limits = {"cpu": profile.cpu_limit, "memory": profile.memory_limit}
+    limits = {k: v for k, v in limits.items() if v is not None}
+    if limits:
+        resources["limits"] = limits
+    container["resources"] = resources
+    return manifest
+
+
 def build_kaniko_pod_manifest(
     container_image: ContainerImage, build_context: str
 ) -> dict:
     """Constructs the builder pod manifest."""
+    manifest = builder_template.render(
+        tag=container_image.tag,
+        registry=container_image.registry,
+        context=build_context,
+    )
+    return apply_build_profile(manifest, build_profile(container_image.language))
 
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    builder_path = os.path.join(base_dir, "templates", "builder.yaml")
 
-    with open(builder_path) as f:
-        manifest = yaml.safe_load(f)
+def build_cache_warm_pod_manifest(language: str, name: str, build_context: str):
+    """Constructs a builder pod that only fills the layer cache, pushing no image."""
+    manifest = builder_template.render(
+        tag=name, registry=config.CONTAINER_REGISTRY, context=build_context
+    )
+    manifest["metadata"]["labels"][CONTEXT_LABEL] = context_label(name)
+    container = manifest["spec"]["containers"][0]
+    container["args"] = [
+        arg for arg in container["args"] if not arg.startswith("--destination=")
+    ]
+    container["args"].append("--no-push")
+    return apply_build_profile(manifest, build_profile(language))
+
+
+async def warm_build_cache(k8s_api_client: Any, language: str) -> bool:
+    """Builds a language template once per template version to fill the cache.
+
+    Dependency installs come before the handler in the Dockerfiles, so their
+    layers are then cache hits for every function build. The pod is named
+    after the template fingerprint, so a version is warmed once per cluster.
+    Returns False when there was nothing to warm.
+    """
+    profile = build_profile(language)
+    if not profile.cache:
+        return False
+
+    fingerprint = template_archives.get(language).fingerprint
+    name = f"warm-{language}-{fingerprint[:16]}"
+    build_context = await run_sync(
+        create_build_context,
+        s3_client=s3_client,
+        container_image_in=ContainerImageCreate(
+            language=language, body=WARM_HANDLERS[language]
+        ),
+        name=name,
+        bucket=config.S3_BUCKET,
+    )
 
-    manifest["metadata"]["name"] = container_image.tag
+    builder = build_cache_warm_pod_manifest(language, name, build_context)
+    try:
+        await run_sync(utils.create_from_dict, k8s_api_client, builder)
+    except utils.FailToCreateError as e:
+        if all(
+            isinstance(c, ApiException) and c.status == 409 for c in e.api_exceptions
+        ):
+            log.info("Build cache already warmed", extra={"pod": name})
+            # The existing pod keeps the context while it still runs
+            await release_build_context(name, None)
+            return False
+        raise
 
-    build_args = manifest["spec"]["containers"][0]["args"]
-    build_args[1] = f"--context={build_context}"
-    build_args[2] = f"--destination={container_image.registry}:{container_image.tag}"
+    try:
+        await k8s_service.wait_for_succeeded(
+            name,
+            BUILDER_NAMESPACE,
+            profile.timeout_secs,
+            label_selector=BUILDER_LABEL_SELECTOR,
+        )
+    finally:
+        await release_build_context(name, name)
+    log.info("Build cache warmed", extra={"language": language, "pod": name})
+    return True
 
-    return manifest
 
+async def acquire_by_digest(
+    db_session: AsyncSession, digest: str
+) -> ContainerImage | None:
+    """Takes a reference on an existing image with a matching digest."""
+    query = (
+        select(ContainerImage).where(ContainerImage.digest == digest).with_for_update()
+    )
+    container = await db_session.scalar(query)
+    if container is None:
+        return None
 
-async def create(
+    container.ref_count += 1
+    await db_session.commit()
+    return container
+
+
+async def build_image(
     k8s_api_client: Any,
-    db_session: AsyncSession,
     container_image_in: ContainerImageCreate,
+    tag: str,
+    digest: str,
+    report: Callable[[BuildPhase], Awaitable[None]],
+    timeline: Timeline,
 ) -> ContainerImage:
-    """Creates a new container image."""
+    """Uploads the build context and runs Kaniko until the image is pushed.
 
+    The context is deleted again once the builder pod has finished.
+    """
     language = container_image_in.language.value
-    tag = f"{language}-{str(uuid4())}"
-
-    build_context = create_build_context(
-        s3_client=s3_client,
-        container_image_in=container_image_in,
-        tag=tag,
-        bucket=config.S3_BUCKET,
-    )
+    with PIPELINE_PHASE_SECONDS.labels("build_context").time():
+        with timeline.phase(TimelinePhase.context_assembly):
+            data = await run_sync(assemble_build_context, container_image_in)
+        with timeline.phase(TimelinePhase.context_upload):
+            build_context = await run_sync(
+                upload_build_context,
+                s3_client=s3_client,
+                data=data,
+                name=tag,
+                bucket=config.S3_BUCKET,
+            )
+    await report(BuildPhase.context_uploaded)
 
     container = ContainerImage(
         tag=tag,
         language=language,
         registry=config.CONTAINER_REGISTRY,
+        digest=digest,
+        ref_count=1,
     )
 
     builder = build_kaniko_pod_manifest(container, build_context)
-    utils.create_from_dict(k8s_api_client, builder, verbose=True)
-    k8s_service.wait_for_succeeded(f"{tag}", "kaniko", 180)
+    try:
+        with PIPELINE_PHASE_SECONDS.labels("builder_create").time():
+            await run_sync(
+                utils.create_from_dict, k8s_api_client, builder, verbose=True
+            )
+        await report(BuildPhase.builder_scheduled)
+        with PIPELINE_PHASE_SECONDS.labels("kaniko_wait").time():
+            pod = await k8s_service.wait_for_succeeded(
+                f"{tag}",
+                BUILDER_NAMESPACE,
+                build_profile(language).timeout_secs,
+                label_selector=BUILDER_LABEL_SELECTOR,
+            )
+    finally:
+        await drop_build_contexts([tag])
+    timeline.add_builder_pod(pod)
+    return container
 
-    db_session.add(container)
-    await db_session.commit()
 
-    return container
+async def create(
+    k8s_api_client: Any,
+    db_session: AsyncSession,
+    container_image_in: ContainerImageCreate,
+    progress: Callable[[BuildPhase], Awaitable[None]] | None = None,
+    admission: Callable[[], AbstractAsyncContextManager] | None = None,
+    timeline: Timeline | None = None,
+) -> ContainerImage:
+    """Creates a new container image, reusing a cached build when possible.
 
+    The returned image holds a reference for the caller, see `release`.
+    `progress` is awaited with each build phase as it completes, and builds
+    run inside `admission`, e.g. a build queue slot, recording their phases
+    in `timeline`. Cache hits skip all three.
+    """
 
-async def delete(
-    db_session: AsyncSession, http_session: AsyncHttpSession, container_image_id: str
-):
-    container = await db_session.get(ContainerImage, container_image_id)
+    async def report(phase: BuildPhase):
+        if progress:
+            await progress(phase)
 
-    await delete_container_image(http_session, "library", "functions", container.tag)
+    language = container_image_in.language.value
+    digest = build_digest(container_image_in)
+    container = await acquire_by_digest(db_session, digest)
+    if container:
+        log.info("Build cache hit", extra={"tag": container.tag, "digest": digest})
+        BUILD_CACHE_HITS.labels(language).inc()
+        await report(BuildPhase.image_pushed)
+        return container
 
-    await db_session.delete(container)
-    await db_session.commit()
+    tag = f"{language}-{str(uuid4())}"
+
+    async with admission() if admission else nullcontext():
+        BUILDS.labels(language).inc()
+        try:
+            with BUILDS_IN_FLIGHT.track_inprogress():
+                container = await build_image(
+                    k8s_api_client,
+                    container_image_in,
+                    tag,
+                    digest,
+                    report,
+                    timeline or Timeline(),
+                )
+        except Exception:
+            BUILD_FAILURES.labels(language).inc()
+            raise
 
-    return
+    db_session.add(container)
+    try:
+        await db_session.commit()
+    except IntegrityError:
+        # A concurrent build with the same digest finished first, use that one
+        await db_session.rollback()
+        log.warning("Discarding duplicate build", extra={"tag": tag, "digest": digest})
+        try:
+            await delete_container_image("library", "functions", tag)
+        except Exception:
+            # Left for the reconciler
+            log.exception("Failed to delete duplicate image", extra={"tag": tag})
+        container = await acquire_by_digest(db_session, digest)
+        if container is None:
+            raise
+
+    await report(BuildPhase.image_pushed)
+    return container
+
+
+async def drop_build_contexts(tags: list[str]):
+    """Deletes the contexts of builds, leaving failures to the retention sweep."""
+    if not tags:
+        return
+    try:
+        await run_sync(
+            delete_build_contexts,
+            s3_client,
+            config.S3_BUCKET,
+            [context_key(tag) for tag in tags],
+        )
+    except Exception:
+        log.exception("Failed to delete build contexts", extra={"count": len(tags)})
+
+
+async def release(db_session: AsyncSession, container_image_id: str):
+    """Drops a reference to an image, deleting it once no function uses it."""
+    await release_many(db_session, {container_image_id: 1})
+
+
+async def release_many(db_session: AsyncSession, counts: dict[str, int]) -> int:
+    """Drops references to many images at once, see `release`.
+
+    Unreferenced rows are deleted and committed before the registry artifacts,
+    so a registry failure leaves an orphaned artifact rather than a dangling row,
+    for the reconciler to remove. Returns the number of images deleted.
+    """
+    if not counts:
+        return 0
+
+    # Rows are locked in one order so concurrent releases can't deadlock
+    query = (
+        select(ContainerImage)
+        .where(ContainerImage.tag.in_(counts))
+        .order_by(ContainerImage.tag)
+        .with_for_update()
+    )
+    unreferenced = []
+    for container in await db_session.scalars(query):
+        container.ref_count -= counts[container.tag]
+        if container.ref_count <= 0:
+            unreferenced.append(container.tag)
+            await db_session.delete(container)
+    await db_session.commit()
+    if not unreferenced:
+        return 0
+
+    # Contexts a failed build pod cleanup left behind
+    await drop_build_contexts(unreferenced)
+    results = await delete_container_images("library", "functions", unreferenced)
+    for tag, result in results.items():
+        if isinstance(result, Exception):
+            log.error(
+                "Failed to delete image from registry",
+                extra={"tag": tag, "error": repr(result)},
+            )
+
+    return len(unreferenced)
@@ -1,7 +1,9 @@
 import importlib
 import json
 import os
+import sys
 import time
+import types
 import uuid
 import traceback
 from typing import Callable, Any
@@ -25,6 +27,8 @@ from runtime_models import (
 HANDLER_MODULE = os.getenv("FAAS_HANDLER_MODULE", "handler")
 HANDLER_SYMBOL = os.getenv("FAAS_HANDLER_SYMBOL", "handler")
 FUNCTION_ID = os.getenv("FAAS_FUNCTION_ID", "unknown")
+# One-time token for loading the handler at runtime, set on warm pool instances
+ADMIN_TOKEN = os.getenv("FAAS_ADMIN_TOKEN")
 
 
 def _load_handler() -> Callable[[Event, Context], Any]:
@@ -40,6 +44,18 @@ def _load_handler() -> Callable[[Event, Context], Any]:
 handler = _load_handler()
 
 
+def _replace_handler(source: bytes) -> Callable[[Event, Context], Any]:
+    mod = types.ModuleType(HANDLER_MODULE)
+    exec(compile(source, f"{HANDLER_MODULE}.py", "exec"), mod.__dict__)
+    fn = getattr(mod, HANDLER_SYMBOL, None)
+    if not callable(fn):
+        raise RuntimeError(
+            f"Handler symbol '{HANDLER_SYMBOL}' not callable in module '{HANDLER_MODULE}'"
+        )
+    sys.modules[HANDLER_MODULE] = mod
+    return fn
+
+
 async def invoke(request: Request) -> StarletteResponse:
     started = time.perf_counter()
     request_id = str(uuid.uuid4())
@@ -92,6 +108,22 @@ async def invoke(request: Request) -> StarletteResponse:
         return JSONResponse({"error": "internal"}, status_code=500)
 
 
+async def load_handler(request: Request) -> StarletteResponse:
+    global handler, ADMIN_TOKEN
+    auth = request.headers.get("authorization")
+    if not ADMIN_TOKEN or auth != f"Bearer {ADMIN_TOKEN}":
+        return PlainTextResponse("Unauthorized", status_code=401)
+    try:
+        handler = _replace_handler(await request.body())
+    except Exception as exc:  # noqa: BLE001
+        traceback.print_exc()
+        return JSONResponse({"error": repr(exc)}, status_code=422)
+    # The loaded handler can read the environment, so the token is single use
+    ADMIN_TOKEN = None
+    print(json.dumps({"level": "info", "msg": "handler_loaded"}), flush=True)
+    return PlainTextResponse("OK", status_code=200)
+
+
 async def health(_: Request) -> StarletteResponse:
     return PlainTextResponse("OK", status_code=200)
 
@@ -105,6 +137,7 @@ routes = [
     Route("/", invoke, methods=["GET", "POST", "PUT", "DELETE", "PATCH"]),
     Route("/healthz", health, methods=["GET"]),
     Route("/readyz", ready, methods=["GET"]),
+    Route("/_faas/handler", load_handler, methods=["PUT"]),
 ]
 
 app = Starlette(debug=False, routes=routes)
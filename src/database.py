@@ -1,4 +1,7 @@
+import hashlib
+from contextlib import asynccontextmanager
 from typing import AsyncIterator, Annotated
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.exc import SQLAlchemyError
 from fastapi import Depends
@@ -19,5 +22,41 @@ async def get_db_session() -> AsyncIterator[AsyncSession]:
             raise
 
 
+async def get_read_session() -> AsyncIterator[AsyncSession]:
+    """Session for read-only requests, closed without a commit."""
+    async with async_session_factory() as session:
+        yield session
+
+
 # Annotation to keep depedency injection DRY
 DbSession = Annotated[AsyncSession, Depends(get_db_session)]
+ReadSession = Annotated[AsyncSession, Depends(get_read_session)]
+
+
+def lock_key(name: str) -> int:
+    """Maps a lock name to a signed 64-bit PostgreSQL advisory lock key."""
+    digest = hashlib.sha256(name.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big", signed=True)
+
+
+@asynccontextmanager
+async def advisory_lock(name: str) -> AsyncIterator[bool]:
+    """Tries to take a session advisory lock shared by all API replicas.
+
+    Yields whether the lock was acquired. The lock is held on a dedicated
+    connection until the block exits, or until the connection drops.
+    """
+    key = lock_key(name)
+    async with engine.connect() as conn:
+        acquired = await conn.scalar(
+            text("SELECT pg_try_advisory_lock(:key)"), {"key": key}
+        )
+        await conn.commit()
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                await conn.execute(
+                    text("SELECT pg_advisory_unlock(:key)"), {"key": key}
+                )
+                await conn.commit()
@@ -0,0 +1,26 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from src.config import config
+
+T = TypeVar("T")
+
+# Bounded pool for blocking client calls (kubernetes, boto3) made from async code
+executor = ThreadPoolExecutor(
+    max_workers=config.BLOCKING_IO_WORKERS, thread_name_prefix="blocking-io"
+)
+
+
+async def run_sync(func: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+    """Runs a blocking callable in the shared executor without blocking the loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        executor, functools.partial(func, *args, **kwargs)
+    )
+
+
+def shutdown():
+    """Waits for in-flight blocking calls and stops the executor."""
+    executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,61 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Generic, TypeVar
+
+from src.config import config
+
+V = TypeVar("V")
+
+
+@dataclass(frozen=True)
+class FunctionMetadata:
+    """Immutable columns of a function, safe to share between requests"""
+
+    id: str
+    url: str
+    container_image_tag: str | None
+    expire_at: datetime
+    created_at: datetime
+
+
+class TTLCache(Generic[V]):
+    """Values by key, kept in memory for `ttl_secs`.
+
+    Writes on this replica invalidate their entry; other replicas serve a
+    stale entry for at most `ttl_secs`. The least recently used entries go
+    past `max_entries`.
+    """
+
+    def __init__(self, ttl_secs: float, max_entries: int):
+        self.ttl_secs = ttl_secs
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[V, float]] = OrderedDict()
+
+    def get(self, key: str) -> V | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: V):
+        self._entries[key] = (value, time.monotonic() + self.ttl_secs)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, *keys: str):
+        for key in keys:
+            self._entries.pop(key, None)
+
+
+function_cache: TTLCache[FunctionMetadata] = TTLCache(
+    ttl_secs=config.FUNCTION_CACHE_SECS,
+    max_entries=config.FUNCTION_CACHE_SIZE,
+)
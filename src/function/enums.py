@@ -5,3 +5,16 @@ class FunctionEndpoints(StrEnum):
     """Default endpoints for functions"""
 
     HEALTH = "/healthz"
+    HANDLER = "/_faas/handler"
+
+
+class HealthStatus(StrEnum):
+    """Outcome of a function health check"""
+
+    healthy = "healthy"
+    unhealthy = "unhealthy"
+    timeout = "timeout"
+    unreachable = "unreachable"
+    # Knative reports the service Ready, with no pod running
+    scaled_to_zero = "scaled_to_zero"
+    not_found = "not_found"
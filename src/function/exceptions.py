@@ -0,0 +1,12 @@
+class FunctionNotHealthyError(Exception):
+    """Raised when a function does not pass its health check in time"""
+
+    pass
+
+
+class HandlerValidationError(Exception):
+    """Raised when a handler is rejected before any resources are created"""
+
+    def __init__(self, message: str, line: int | None = None):
+        super().__init__(message)
+        self.line = line
@@ -0,0 +1,103 @@
+import asyncio
+import heapq
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable
+
+log = logging.getLogger(__name__)
+
+# Delay before due functions are handed to `on_expired` again after a skip
+RETRY_SECS = 2.0
+
+
+class ExpiryTimer:
+    """In-process min-heap of function expiry deadlines.
+
+    A background task sleeps until the earliest deadline and then calls
+    `on_expired` once for every function due by then. `on_expired` returns
+    None when it didn't run, e.g. while another replica holds the reaper
+    lock, and the due functions are then retried after RETRY_SECS. Cancelled
+    or rescheduled entries are dropped lazily when they reach the top.
+    """
+
+    def __init__(self):
+        self._heap: list[tuple[datetime, str]] = []
+        self._deadlines: dict[str, datetime] = {}
+        self._changed = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def schedule(self, function_id: str, expire_at: datetime):
+        """Adds or moves the deadline of a function."""
+        if self._deadlines.get(function_id) == expire_at:
+            return
+        self._deadlines[function_id] = expire_at
+        heapq.heappush(self._heap, (expire_at, function_id))
+        if self._heap[0] == (expire_at, function_id):
+            # New earliest deadline, wake the timer task to re-arm
+            self._changed.set()
+
+    def cancel(self, *function_ids: str):
+        for function_id in function_ids:
+            self._deadlines.pop(function_id, None)
+
+    def next_deadline(self) -> datetime | None:
+        while self._heap:
+            expire_at, function_id = self._heap[0]
+            if self._deadlines.get(function_id) == expire_at:
+                return expire_at
+            heapq.heappop(self._heap)
+        return None
+
+    def pop_due(self, now: datetime) -> list[str]:
+        """Removes and returns the functions whose deadline has passed."""
+        due = []
+        while (deadline := self.next_deadline()) is not None and deadline <= now:
+            _, function_id = heapq.heappop(self._heap)
+            del self._deadlines[function_id]
+            due.append(function_id)
+        return due
+
+    def start(self, on_expired: Callable[[], Awaitable[Any]]):
+        self._task = asyncio.create_task(self._run(on_expired))
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self, on_expired: Callable[[], Awaitable[Any]]):
+        while True:
+            self._changed.clear()
+            deadline = self.next_deadline()
+            timeout = None
+            if deadline is not None:
+                now = datetime.now(timezone.utc)
+                timeout = max((deadline - now).total_seconds(), 0)
+
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+                continue
+            except asyncio.TimeoutError:
+                pass
+
+            due = self.pop_due(datetime.now(timezone.utc))
+            if not due:
+                continue
+            log.debug("Functions expired", extra={"count": len(due)})
+            try:
+                result = await on_expired()
+            except Exception:
+                # Missed functions are picked up again by the next sync
+                log.exception("Expiry handler failed")
+                continue
+            if result is None:
+                retry_at = datetime.now(timezone.utc) + timedelta(seconds=RETRY_SECS)
+                for function_id in due:
+                    self.schedule(function_id, retry_at)
+
+
+expiry_timer = ExpiryTimer()
@@ -0,0 +1,121 @@
+import logging
+import time
+from typing import AsyncIterator
+
+from aiohttp import ClientError, ClientResponse, ClientTimeout
+from aiohttp import ClientSession as AsyncHttpSession
+from fastapi import HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+from src.config import config
+from src.database import async_session_factory
+from src.metrics import FUNCTION_INVOKE_FIRST_BYTE_SECONDS, FUNCTION_INVOKE_SECONDS
+
+from .service import get_metadata
+
+log = logging.getLogger(__name__)
+
+# Connection-level headers, plus those aiohttp sets itself
+HOP_BY_HOP_HEADERS = {
+    "connection",
+    "keep-alive",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "te",
+    "trailer",
+    "transfer-encoding",
+    "upgrade",
+    "host",
+}
+# aiohttp decompresses response bodies, so their encoding and length don't apply
+DECODED_RESPONSE_HEADERS = {"content-encoding", "content-length"}
+
+invoke_timeout = ClientTimeout(
+    total=None,
+    sock_connect=config.INVOKE_CONNECT_TIMEOUT_SECS,
+    sock_read=config.INVOKE_READ_TIMEOUT_SECS,
+)
+
+
+async def resolve_url(function_id: str) -> str | None:
+    """Returns the URL of a function, from the cache when possible."""
+    async with async_session_factory() as db_session:
+        metadata = await get_metadata(db_session, function_id)
+    return metadata.url if metadata else None
+
+
+def forward_headers(headers, excluded: set[str]) -> dict[str, str]:
+    return {k: v for k, v in headers.items() if k.lower() not in excluded}
+
+
+async def invoke(
+    http_session: AsyncHttpSession, function_id: str, request: Request
+) -> StreamingResponse:
+    """Forwards a request to a function, streaming both bodies."""
+    url = await resolve_url(function_id)
+    if url is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Not found")
+
+    method = request.method
+    started = time.perf_counter()
+    has_body = "content-length" in request.headers or (
+        "transfer-encoding" in request.headers
+    )
+    try:
+        upstream = await http_session.request(
+            method,
+            url,
+            # Repeated keys, e.g. ?a=1&a=2, are all forwarded
+            params=request.query_params.multi_items(),
+            headers=forward_headers(request.headers, HOP_BY_HOP_HEADERS),
+            data=request.stream() if has_body else None,
+            timeout=invoke_timeout,
+            allow_redirects=False,
+        )
+    except TimeoutError:
+        FUNCTION_INVOKE_SECONDS.labels(method, "504").observe(
+            time.perf_counter() - started
+        )
+        raise HTTPException(status.HTTP_504_GATEWAY_TIMEOUT, "Function timed out")
+    except ClientError as e:
+        FUNCTION_INVOKE_SECONDS.labels(method, "502").observe(
+            time.perf_counter() - started
+        )
+        log.warning(
+            "Function unreachable", extra={"function_id": function_id, "error": str(e)}
+        )
+        raise HTTPException(status.HTTP_502_BAD_GATEWAY, "Function unreachable")
+
+    FUNCTION_INVOKE_FIRST_BYTE_SECONDS.labels(method).observe(
+        time.perf_counter() - started
+    )
+
+    return StreamingResponse(
+        stream_body(upstream, method, started),
+        status_code=upstream.status,
+        headers=forward_headers(
+            upstream.headers, HOP_BY_HOP_HEADERS | DECODED_RESPONSE_HEADERS
+        ),
+        # Also runs when the client went away before the body was streamed
+        background=BackgroundTask(release_upstream, upstream),
+    )
+
+
+async def release_upstream(upstream: ClientResponse):
+    """Returns the upstream connection to the pool, if still held."""
+    upstream.release()
+
+
+async def stream_body(
+    upstream: ClientResponse, method: str, started: float
+) -> AsyncIterator[bytes]:
+    """Relays the upstream body as it arrives and records the invocation."""
+    try:
+        async for chunk in upstream.content.iter_any():
+            yield chunk
+    finally:
+        upstream.release()
+        FUNCTION_INVOKE_SECONDS.labels(method, str(upstream.status)).observe(
+            time.perf_counter() - started
+        )
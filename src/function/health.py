@@ -0,0 +1,102 @@
+import asyncio
+import logging
+
+from aiohttp import ClientError, ClientTimeout
+from aiohttp import ClientSession as AsyncHttpSession
+from kubernetes import client
+
+from src.config import config
+from src.executor import run_sync
+from src.k8s.service import get_condition
+
+from .enums import FunctionEndpoints, HealthStatus
+from .models import FunctionHealth
+
+log = logging.getLogger(__name__)
+
+
+async def probe(
+    http_session: AsyncHttpSession,
+    url: str,
+    timeout: float = config.HEALTH_PROBE_TIMEOUT_SECS,
+) -> FunctionHealth:
+    """Requests the health endpoint of a function, never raising."""
+    try:
+        async with http_session.get(
+            f"{url}{FunctionEndpoints.HEALTH}", timeout=ClientTimeout(total=timeout)
+        ) as response:
+            code = response.status
+    except asyncio.TimeoutError:
+        return FunctionHealth(status=HealthStatus.timeout)
+    except ClientError as e:
+        return FunctionHealth(status=HealthStatus.unreachable, detail=repr(e))
+
+    status = HealthStatus.healthy if code == 200 else HealthStatus.unhealthy
+    return FunctionHealth(status=status, http_status=code)
+
+
+async def probe_many(
+    http_session: AsyncHttpSession,
+    urls: dict[str, str],
+    concurrency: int = config.HEALTH_PROBE_CONCURRENCY,
+) -> dict[str, FunctionHealth]:
+    """Probes functions by id concurrently, at most `concurrency` at a time."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(url: str) -> FunctionHealth:
+        async with semaphore:
+            return await probe(http_session, url)
+
+    results = await asyncio.gather(*(bounded(url) for url in urls.values()))
+    return dict(zip(urls, results))
+
+
+def readiness(service: dict | None, revision: dict | None) -> FunctionHealth:
+    """Health of a function from its Knative service and latest ready revision."""
+    if service is None:
+        return FunctionHealth(status=HealthStatus.not_found)
+
+    ready = get_condition(service, "Ready") or {}
+    if ready.get("status") != "True":
+        return FunctionHealth(
+            status=HealthStatus.unhealthy, detail=ready.get("message")
+        )
+    if revision is not None and revision.get("status", {}).get("actualReplicas") == 0:
+        return FunctionHealth(status=HealthStatus.scaled_to_zero)
+    return FunctionHealth(status=HealthStatus.healthy)
+
+
+async def knative_readiness(
+    custom_client: client.CustomObjectsApi, function_ids: list[str]
+) -> dict[str, FunctionHealth]:
+    """Reads readiness from Knative, without sending functions any traffic.
+
+    Lists the namespace's services and revisions once rather than fetching
+    each function's objects.
+    """
+
+    async def list_all(plural: str) -> list[dict]:
+        response = await run_sync(
+            custom_client.list_namespaced_custom_object,
+            group="serving.knative.dev",
+            version="v1",
+            namespace=config.FUNCTION_NAMESPACE,
+            plural=plural,
+        )
+        return response["items"]
+
+    services, revisions = await asyncio.gather(
+        list_all("services"), list_all("revisions")
+    )
+    services = {s["metadata"]["name"]: s for s in services}
+    revisions = {r["metadata"]["name"]: r for r in revisions}
+
+    results = {}
+    for function_id in function_ids:
+        service = services.get(function_id)
+        revision = None
+        if service is not None:
+            latest = service.get("status", {}).get("latestReadyRevisionName")
+            revision = revisions.get(latest)
+        results[function_id] = readiness(service, revision)
+    return results
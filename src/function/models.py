@@ -1,17 +1,89 @@
 from datetime import datetime
 
-from pydantic import BaseModel
+from kubernetes.utils import parse_quantity
+from pydantic import BaseModel, Field, field_validator, model_validator
 from sqlalchemy import ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.types import TIMESTAMP
 
+from src.config import config
 from src.models import Base, TimestampMixin
 
+from .enums import HealthStatus
+
 
 # Pydantic Models
-class FunctionCreate(BaseModel):
+class FunctionScaling(BaseModel):
+    """Knative autoscaling and resources of a function, within platform limits"""
+
+    min_scale: int | None = Field(
+        default=None, ge=0, le=config.FUNCTION_MIN_SCALE_LIMIT
+    )
+    max_scale: int | None = Field(
+        default=None, ge=1, le=config.FUNCTION_MAX_SCALE_LIMIT
+    )
+    # Soft target of in-flight requests per pod the autoscaler aims for
+    target_concurrency: int | None = Field(
+        default=None, ge=1, le=config.FUNCTION_CONCURRENCY_LIMIT
+    )
+    # Hard limit of in-flight requests per pod, 0 means unlimited
+    container_concurrency: int | None = Field(
+        default=None, ge=0, le=config.FUNCTION_CONCURRENCY_LIMIT
+    )
+    # Seconds to keep pods after traffic drops before scaling down
+    scale_down_delay: int | None = Field(
+        default=None, ge=0, le=config.FUNCTION_SCALE_DOWN_DELAY_LIMIT_SECS
+    )
+    cpu_request: str | None = None
+    cpu_limit: str | None = None
+    memory_request: str | None = None
+    memory_limit: str | None = None
+
+    @field_validator("cpu_request", "cpu_limit")
+    @classmethod
+    def check_cpu(cls, value: str | None) -> str | None:
+        return check_quantity(value, config.FUNCTION_CPU_LIMIT)
+
+    @field_validator("memory_request", "memory_limit")
+    @classmethod
+    def check_memory(cls, value: str | None) -> str | None:
+        return check_quantity(value, config.FUNCTION_MEMORY_LIMIT)
+
+    @model_validator(mode="after")
+    def check_ranges(self):
+        pairs = (
+            ("min_scale", "max_scale"),
+            ("cpu_request", "cpu_limit"),
+            ("memory_request", "memory_limit"),
+        )
+        for low, high in pairs:
+            low_value, high_value = getattr(self, low), getattr(self, high)
+            if low_value is None or high_value is None:
+                continue
+            if parse_quantity(low_value) > parse_quantity(high_value):
+                raise ValueError(f"{low} must not exceed {high}")
+        return self
+
+
+def check_quantity(value: str | None, limit: str) -> str | None:
+    """Validates a kubernetes resource quantity against a platform limit."""
+    if value is None:
+        return None
+    try:
+        quantity = parse_quantity(value)
+    except ValueError:
+        raise ValueError(f"'{value}' is not a resource quantity")
+    if quantity <= 0 or quantity > parse_quantity(limit):
+        raise ValueError(f"must be above 0 and at most {limit}")
+    return value
+
+
+class FunctionCreate(FunctionScaling):
     language: str
     body: str
+    # Builds are shared fairly between tenants, higher priorities go first
+    tenant: str = "default"
+    priority: int = Field(default=0, ge=0, le=9)
 
 
 class FunctionResponse(BaseModel):
@@ -21,17 +93,36 @@ class FunctionResponse(BaseModel):
     created_at: datetime
 
 
+class FunctionHealthQuery(BaseModel):
+    ids: list[str] = Field(max_length=config.HEALTH_BULK_MAX_IDS)
+    # Read readiness from Knative instead of probing, so idle functions stay
+    # scaled to zero
+    knative: bool = False
+
+
+class FunctionHealth(BaseModel):
+    status: HealthStatus
+    # Status code of the health endpoint, when probed
+    http_status: int | None = None
+    # Probe error or Knative condition message
+    detail: str | None = None
+
+
 # SQLAlchemy Models
 class Function(TimestampMixin, Base):
-    id: Mapped[str] = mapped_column(ForeignKey("container_image.tag"), primary_key=True)
+    id: Mapped[str] = mapped_column(primary_key=True)
+    # Not set for functions deployed on a prebuilt runtime image
+    container_image_tag: Mapped[str | None] = mapped_column(
+        ForeignKey("container_image.tag"), index=True
+    )
     url: Mapped[str]
     expire_at: Mapped[datetime] = mapped_column(
-        TIMESTAMP(timezone=True), nullable=False
+        TIMESTAMP(timezone=True), nullable=False, index=True
     )
 
-    container_image: Mapped["ContainerImage"] = relationship(  # noqa: F821
+    # Never loaded implicitly, lookups only need container_image_tag
+    container_image: Mapped["ContainerImage | None"] = relationship(  # noqa: F821
         "ContainerImage",
-        back_populates="function",
-        uselist=False,
-        lazy="selectin",
+        back_populates="functions",
+        lazy="raise",
     )
@@ -0,0 +1,275 @@
+import asyncio
+import logging
+import random
+import secrets
+from dataclasses import dataclass
+from typing import Any
+
+from aiohttp import ClientError, ClientTimeout
+from aiohttp import ClientSession as AsyncHttpSession
+from kubernetes import client
+from kubernetes.client.exceptions import ApiException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import config
+from src.executor import run_sync
+from src.k8s.service import get_condition
+from src.metrics import WARM_POOL_CLAIMS, WARM_POOL_INSTANCES
+
+from .enums import FunctionEndpoints
+from .models import Function, FunctionScaling
+from .service import (
+    MANAGED_BY,
+    MANAGED_BY_LABEL,
+    apply_runtime_service,
+    build_handler_config_map_manifest,
+    build_runtime_service_manifest,
+    delete_knative_service,
+    new_function_id,
+    record,
+    runtime_image,
+)
+
+log = logging.getLogger(__name__)
+
+POOL_LABEL = "faas.platform/pool"
+STATE_LABEL = "faas.platform/pool-state"
+TOKEN_ANNOTATION = "faas.platform/admin-token"
+MIN_SCALE_ANNOTATION = "autoscaling.knative.dev/min-scale"
+
+# Stub handler served by idle instances until one is claimed
+IDLE_HANDLER = """\
+def handler(event, ctx):
+    return {"error": "function not deployed"}, 503
+"""
+
+
+@dataclass
+class PoolStats:
+    """Warm pool instances, and the claim hits and misses of this replica"""
+
+    ready: int = 0
+    warming: int = 0
+    hits: int = 0
+    misses: int = 0
+
+
+def is_enabled(language: str) -> bool:
+    return config.WARM_POOL_SIZE > 0 and runtime_image(language) is not None
+
+
+def is_ready(service: dict) -> bool:
+    ready = get_condition(service, "Ready")
+    return bool(ready and ready.get("status") == "True")
+
+
+class WarmPool:
+    """Idle, already Ready runtime services of one language.
+
+    Pool instances are Knative services labelled with their pool state, so
+    every API replica shares the same pool. A claim flips the state label
+    with a resourceVersion precondition, so two replicas can't take the same
+    instance, and then pushes the handler into the running instance with the
+    instance's single use admin token.
+    """
+
+    def __init__(self, language: str):
+        self.language = language
+        self.hits = 0
+        self.misses = 0
+
+    def _selector(self, state: str) -> str:
+        return f"{POOL_LABEL}={self.language},{STATE_LABEL}={state}"
+
+    async def list_instances(
+        self, custom_client: client.CustomObjectsApi, state: str
+    ) -> list:
+        response = await run_sync(
+            custom_client.list_namespaced_custom_object,
+            group="serving.knative.dev",
+            version="v1",
+            namespace=config.FUNCTION_NAMESPACE,
+            plural="services",
+            label_selector=self._selector(state),
+        )
+        return response["items"]
+
+    async def claim(
+        self,
+        k8s_api_client: Any,
+        db_session: AsyncSession,
+        http_session: AsyncHttpSession,
+        body: str,
+        scaling: FunctionScaling | None = None,
+    ) -> Function | None:
+        """Deploys the handler on an idle instance, None when the pool is empty."""
+        custom_client = client.CustomObjectsApi(k8s_api_client)
+        candidates = [
+            s for s in await self.list_instances(custom_client, "idle") if is_ready(s)
+        ]
+        # Spread concurrent claims over the pool to reduce conflicts
+        random.shuffle(candidates)
+
+        for service in candidates:
+            name = service["metadata"]["name"]
+            try:
+                await run_sync(
+                    custom_client.patch_namespaced_custom_object,
+                    group="serving.knative.dev",
+                    version="v1",
+                    namespace=config.FUNCTION_NAMESPACE,
+                    plural="services",
+                    name=name,
+                    body={
+                        "metadata": {
+                            "resourceVersion": service["metadata"]["resourceVersion"],
+                            "labels": {STATE_LABEL: "claimed"},
+                        }
+                    },
+                )
+            except ApiException as e:
+                if e.status in (404, 409):
+                    # Claimed by another request or replica
+                    continue
+                raise
+
+            url = service["status"]["url"]
+            try:
+                await self._inject(k8s_api_client, http_session, service, body, scaling)
+            except Exception:
+                log.exception("Failed to inject handler", extra={"function_id": name})
+                try:
+                    await delete_knative_service(custom_client, name)
+                except Exception:
+                    # Left for the reconciler, the create still falls back
+                    log.exception("Cleanup failed", extra={"function_id": name})
+                break
+
+            self.hits += 1
+            WARM_POOL_CLAIMS.labels(self.language, "hit").inc()
+            return await record(db_session, name, url)
+
+        self.misses += 1
+        WARM_POOL_CLAIMS.labels(self.language, "miss").inc()
+        return None
+
+    async def _inject(
+        self,
+        k8s_api_client: Any,
+        http_session: AsyncHttpSession,
+        service: dict,
+        body: str,
+        scaling: FunctionScaling | None,
+    ):
+        name = service["metadata"]["name"]
+        token = service["metadata"]["annotations"][TOKEN_ANNOTATION]
+        core_client = client.CoreV1Api(k8s_api_client)
+        config_map = build_handler_config_map_manifest(name, self.language, body)
+        await run_sync(
+            core_client.patch_namespaced_config_map,
+            name,
+            config.FUNCTION_NAMESPACE,
+            {"data": config_map["data"]},
+        )
+
+        # The running instance serves the handler right away
+        async with http_session.put(
+            f"{service['status']['url']}{FunctionEndpoints.HANDLER}",
+            data=body.encode("utf-8"),
+            headers={"Authorization": f"Bearer {token}"},
+            timeout=ClientTimeout(total=config.FUNCTION_HEALTH_TIMEOUT_SECS),
+        ) as response:
+            if response.status != 200:
+                raise ClientError(
+                    f"Handler load failed: HTTP {response.status} {await response.text()}"
+                )
+
+        # A plain revision takes over once ready: it loads the handler from the
+        # ConfigMap, scales like any other function and has no admin token
+        template = build_runtime_service_manifest(
+            name, runtime_image(self.language), scaling
+        )
+        template = template["spec"]["template"]
+        annotations = template.setdefault("metadata", {}).setdefault("annotations", {})
+        annotations.setdefault(MIN_SCALE_ANNOTATION, None)
+        await run_sync(
+            client.CustomObjectsApi(k8s_api_client).patch_namespaced_custom_object,
+            group="serving.knative.dev",
+            version="v1",
+            namespace=config.FUNCTION_NAMESPACE,
+            plural="services",
+            name=name,
+            body={
+                "metadata": {
+                    "labels": {POOL_LABEL: None},
+                    "annotations": {TOKEN_ANNOTATION: None},
+                },
+                "spec": {"template": template},
+            },
+        )
+
+    def _count(self, idle: list) -> tuple[int, int]:
+        """Ready and warming instances, also exported as gauges."""
+        ready = sum(1 for s in idle if is_ready(s))
+        WARM_POOL_INSTANCES.labels(self.language, "ready").set(ready)
+        WARM_POOL_INSTANCES.labels(self.language, "warming").set(len(idle) - ready)
+        return ready, len(idle) - ready
+
+    async def stats(self, custom_client: client.CustomObjectsApi) -> PoolStats:
+        idle = await self.list_instances(custom_client, "idle")
+        return PoolStats(*self._count(idle), self.hits, self.misses)
+
+    async def refill(self, k8s_api_client: Any, size: int):
+        """Creates instances until `size` are ready or warming up, concurrently."""
+        custom_client = client.CustomObjectsApi(k8s_api_client)
+        idle = await self.list_instances(custom_client, "idle")
+        self._count(idle)
+        missing = size - len(idle)
+        if missing <= 0:
+            return
+
+        results = await asyncio.gather(
+            *(self._create_instance(k8s_api_client) for _ in range(missing)),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                log.error(
+                    "Failed to create pool instance",
+                    extra={"language": self.language, "error": repr(result)},
+                )
+
+    async def _create_instance(self, k8s_api_client: Any):
+        function_id = new_function_id(self.language)
+        token = secrets.token_urlsafe(32)
+        env = build_runtime_service_manifest(function_id, runtime_image(self.language))
+        env = env["spec"]["template"]["spec"]["containers"][0]["env"]
+        await apply_runtime_service(
+            k8s_api_client,
+            function_id,
+            self.language,
+            IDLE_HANDLER,
+            patches={
+                "metadata.labels": {
+                    MANAGED_BY_LABEL: MANAGED_BY,
+                    POOL_LABEL: self.language,
+                    STATE_LABEL: "idle",
+                },
+                "metadata.annotations": {TOKEN_ANNOTATION: token},
+                # Keep an instance running so claims skip the cold start
+                "spec.template.metadata.annotations": {MIN_SCALE_ANNOTATION: "1"},
+                "spec.template.spec.containers.0.env": [
+                    *env,
+                    {"name": "FAAS_ADMIN_TOKEN", "value": token},
+                ],
+            },
+        )
+
+
+warm_pools: dict[str, WarmPool] = {}
+
+
+def get_warm_pool(language: str) -> WarmPool:
+    if language not in warm_pools:
+        warm_pools[language] = WarmPool(language)
+    return warm_pools[language]
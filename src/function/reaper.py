@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from kubernetes import client
+from kubernetes.client.exceptions import ApiException
+from sqlalchemy import delete, select
+
+from src.config import config
+from src.container import service as container_service
+from src.database import async_session_factory
+from src.retry import retry
+
+from .cache import function_cache
+from .expiry import expiry_timer
+from .models import Function
+from .service import delete_knative_service
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class ReapResult:
+    """Counts and timings of one reaper run"""
+
+    selected: int = 0
+    deleted: int = 0
+    failed: int = 0
+    images_deleted: int = 0
+    pages: int = 0
+    knative_secs: float = 0.0
+    db_secs: float = 0.0
+    total_secs: float = 0.0
+    # How long past its expiry the most overdue function was, deleted or failed
+    max_lag_secs: float = 0.0
+    failed_ids: list[str] = field(default_factory=list)
+
+
+def _is_retryable(e: Exception) -> bool:
+    # Client errors other than conflicts won't succeed on retry
+    return not (
+        isinstance(e, ApiException) and 400 <= e.status < 500 and e.status != 409
+    )
+
+
+async def _delete_service(
+    k8s_client: client.CustomObjectsApi, semaphore: asyncio.Semaphore, name: str
+):
+    async with semaphore:
+        try:
+            await retry(
+                lambda: delete_knative_service(k8s_client, name),
+                attempts=config.REAPER_ATTEMPTS,
+                retry_on=_is_retryable,
+            )
+        except ApiException as e:
+            # Already gone, e.g. removed by hand or a previous partial run
+            if e.status != 404:
+                raise
+
+
+async def reap_expired(
+    k8s_client: client.CustomObjectsApi,
+    now: datetime,
+    page_size: int = config.REAPER_PAGE_SIZE,
+    concurrency: int = config.REAPER_CONCURRENCY,
+) -> ReapResult:
+    """Deletes functions that expired before `now`, a page at a time.
+
+    Rows are locked with FOR UPDATE SKIP LOCKED so concurrent reapers never
+    work on the same function. Knative services are deleted concurrently and
+    only the rows whose service is gone are removed, in one statement per page.
+    Functions that still fail after retries are left for the next run.
+    """
+    result = ReapResult()
+    semaphore = asyncio.Semaphore(concurrency)
+    started = time.perf_counter()
+
+    while True:
+        async with async_session_factory() as db_session:
+            query = (
+                select(Function.id, Function.container_image_tag, Function.expire_at)
+                .where(Function.expire_at <= now)
+                .order_by(Function.expire_at)
+                .limit(page_size)
+                .with_for_update(skip_locked=True)
+            )
+            if result.failed_ids:
+                query = query.where(Function.id.not_in(result.failed_ids))
+            rows = (await db_session.execute(query)).all()
+            if not rows:
+                break
+
+            result.pages += 1
+            result.selected += len(rows)
+
+            t_knative = time.perf_counter()
+            outcomes = await asyncio.gather(
+                *(_delete_service(k8s_client, semaphore, row.id) for row in rows),
+                return_exceptions=True,
+            )
+            result.knative_secs += time.perf_counter() - t_knative
+
+            deleted = []
+            for row, outcome in zip(rows, outcomes):
+                if isinstance(outcome, Exception):
+                    log.error(
+                        "Failed to delete expired function",
+                        extra={"function_id": row.id, "error": repr(outcome)},
+                    )
+                    result.failed_ids.append(row.id)
+                else:
+                    deleted.append(row)
+
+            t_db = time.perf_counter()
+            if deleted:
+                await db_session.execute(
+                    delete(Function).where(Function.id.in_([row.id for row in deleted]))
+                )
+            result.images_deleted += await container_service.release_many(
+                db_session,
+                Counter(
+                    row.container_image_tag
+                    for row in deleted
+                    if row.container_image_tag
+                ),
+            )
+            await db_session.commit()
+            result.db_secs += time.perf_counter() - t_db
+            result.deleted += len(deleted)
+            # Failed functions count too, they are still overdue
+            oldest = min(row.expire_at for row in rows)
+            lag = (now - oldest).total_seconds()
+            result.max_lag_secs = max(result.max_lag_secs, lag)
+            expiry_timer.cancel(*(row.id for row in deleted))
+            function_cache.invalidate(*(row.id for row in deleted))
+
+    result.failed = len(result.failed_ids)
+    result.total_secs = time.perf_counter() - started
+    return result
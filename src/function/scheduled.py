@@ -1,31 +1,81 @@
+import asyncio
 import datetime
-import aiohttp
 import logging
 
-from sqlalchemy import select
+from sqlalchemy import func, select
 
 from src.database import async_session_factory
-from src.scheduler import scheduler
+from src.scheduler import leader_only, scheduler
 from src.config import config
+from src.container.enums import LanguageTypes
+from src.k8s.client import get_api_client
+from src.k8s.dependencies import k8s_custom_objects_client
+from src.metrics import FUNCTION_EXPIRY_LAG_SECONDS, FUNCTIONS_LIVE
 
+from .expiry import expiry_timer
 from .models import Function
-from .service import delete
+from .pool import get_warm_pool, is_enabled
+from .reaper import ReapResult, reap_expired
 
 log = logging.getLogger(__name__)
 
 
+@leader_only("function_delete_expired")
+async def function_delete_expired() -> ReapResult:
+    """Reaps expired functions, triggered by the expiry timer"""
+    utc_now = datetime.datetime.now(datetime.timezone.utc)
+
+    result = await reap_expired(k8s_custom_objects_client(), utc_now)
+    FUNCTION_EXPIRY_LAG_SECONDS.set(result.max_lag_secs)
+
+    log.info(
+        f"Deleted {result.deleted}/{result.selected} expired functions",
+        extra={
+            "deleted": result.deleted,
+            "failed": result.failed,
+            "images_deleted": result.images_deleted,
+            "pages": result.pages,
+            "knative_secs": round(result.knative_secs, 3),
+            "db_secs": round(result.db_secs, 3),
+            "total_secs": round(result.total_secs, 3),
+            "max_lag_secs": round(result.max_lag_secs, 3),
+        },
+    )
+    return result
+
+
 @scheduler.scheduled_job(
-    "interval", seconds=config.FUNCTION_CLEANUP_SECS, misfire_grace_time=10
+    "interval", seconds=config.FUNCTION_EXPIRY_SYNC_SECS, misfire_grace_time=10
 )
-async def function_delete_expired():
+async def function_expiry_sync():
+    """Loads deadlines due before the next sync into the expiry timer.
+
+    Picks up functions created on other replicas and functions a failed reap
+    left behind, and refreshes the live functions gauge. Uses the expire_at
+    index, so idle runs are a cheap range scan.
+    """
     utc_now = datetime.datetime.now(datetime.timezone.utc)
+    horizon = utc_now + datetime.timedelta(seconds=2 * config.FUNCTION_EXPIRY_SYNC_SECS)
 
     async with async_session_factory() as session:
-        query = select(Function).where(Function.expire_at <= utc_now)
-        result = await session.scalars(query)
-        expired_functions = result.all()
-
-        for function in expired_functions:
-            async with async_session_factory() as delete_db_session, aiohttp.ClientSession() as delete_http_session:
-                await delete(delete_db_session, delete_http_session, function.id)
-                log.info(f"Deleted {function.id}")
+        query = select(Function.id, Function.expire_at).where(
+            Function.expire_at <= horizon
+        )
+        for row in await session.execute(query):
+            expiry_timer.schedule(row.id, row.expire_at)
+        FUNCTIONS_LIVE.set(await session.scalar(select(func.count(Function.id))))
+
+
+@scheduler.scheduled_job(
+    "interval", seconds=config.WARM_POOL_REFILL_SECS, misfire_grace_time=10
+)
+@leader_only("function_warm_pool_refill", config.WARM_POOL_REFILL_SECS)
+async def function_warm_pool_refill():
+    """Tops up the warm pool of each language with a runtime image, concurrently"""
+    await asyncio.gather(
+        *(
+            get_warm_pool(language).refill(get_api_client(), config.WARM_POOL_SIZE)
+            for language in LanguageTypes
+            if is_enabled(language)
+        )
+    )
@@ -1,112 +1,434 @@
+import asyncio
 import logging
 import os
 import time
 from datetime import datetime, timedelta, timezone
 from typing import Any
+from uuid import uuid4
 
-import yaml
+from aiohttp import ClientError, ClientTimeout
 from aiohttp import ClientSession as AsyncHttpSession
 from kubernetes import client, utils
+from kubernetes.client.exceptions import ApiException
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.config import config
 from src.container import service as container_service
+from src.container.enums import HandlerFiles, LanguageTypes
 from src.container.models import ContainerImage
-from src.k8s.service import get_knative_route
+from src.executor import run_sync
+from src.k8s.dependencies import k8s_custom_objects_client
+from src.k8s.service import wait_for_knative_ready
+from src.manifests import ManifestTemplate, set_path
+from src.metrics import PIPELINE_PHASE_SECONDS
 
-from .models import Function
+from .cache import FunctionMetadata, function_cache
+from .enums import FunctionEndpoints
+from .exceptions import FunctionNotHealthyError
+from .expiry import expiry_timer
+from .models import Function, FunctionScaling
 
 log = logging.getLogger(__name__)
 
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
 
-def build_kn_service_manifest(container_image: ContainerImage) -> dict:
+# Ownership label of the Knative services this platform creates, as set in
+# templates/service.yaml and templates/runtime_service.yaml
+MANAGED_BY_LABEL = "app.kubernetes.io/managed-by"
+MANAGED_BY = "faas-platform"
+MANAGED_SELECTOR = f"{MANAGED_BY_LABEL}={MANAGED_BY}"
+
+service_template = ManifestTemplate(
+    os.path.join(TEMPLATES_DIR, "service.yaml"),
+    placeholders=("name", "registry", "tag"),
+)
+runtime_service_template = ManifestTemplate(
+    os.path.join(TEMPLATES_DIR, "runtime_service.yaml"),
+    placeholders=("name", "image"),
+)
+handler_config_map_template = ManifestTemplate(
+    os.path.join(TEMPLATES_DIR, "handler_configmap.yaml"),
+    placeholders=("name", "filename", "body"),
+)
+
+
+def scaling_patches(scaling: FunctionScaling | None) -> dict[str, Any]:
+    """Manifest patches for the autoscaling and resource settings of a function"""
+    if scaling is None:
+        return {}
+
+    annotations = {
+        f"autoscaling.knative.dev/{key}": str(value)
+        for key, value in (
+            ("min-scale", scaling.min_scale),
+            ("max-scale", scaling.max_scale),
+            ("target", scaling.target_concurrency),
+        )
+        if value is not None
+    }
+    if scaling.scale_down_delay is not None:
+        annotations["autoscaling.knative.dev/scale-down-delay"] = (
+            f"{scaling.scale_down_delay}s"
+        )
+
+    resources = {}
+    for kind, values in (
+        ("requests", {"cpu": scaling.cpu_request, "memory": scaling.memory_request}),
+        ("limits", {"cpu": scaling.cpu_limit, "memory": scaling.memory_limit}),
+    ):
+        values = {k: v for k, v in values.items() if v is not None}
+        if values:
+            resources[kind] = values
+
+    patches = {}
+    if annotations:
+        patches["spec.template.metadata.annotations"] = annotations
+    if scaling.container_concurrency is not None:
+        patches["spec.template.spec.containerConcurrency"] = (
+            scaling.container_concurrency
+        )
+    if resources:
+        patches["spec.template.spec.containers.0.resources"] = resources
+    return patches
+
+
+def apply_patches(manifest: dict, patches: dict[str, Any]) -> dict:
+    for path, value in patches.items():
+        set_path(manifest, path, value)
+    return manifest
+
+
+def build_kn_service_manifest(
+    function_id: str,
+    container_image: ContainerImage,
+    scaling: FunctionScaling | None = None,
+) -> dict:
     """Constructs knative service manifest"""
+    manifest = service_template.render(
+        name=function_id,
+        registry=container_image.registry,
+        tag=container_image.tag,
+    )
+    return apply_patches(manifest, scaling_patches(scaling))
+
+
+def runtime_image(language: str) -> str | None:
+    """Returns the prebuilt runtime image of a language, if it deploys without builds"""
+    if language == LanguageTypes.python:
+        return config.PYTHON_RUNTIME_IMAGE
+    return None
+
 
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    service_path = os.path.join(base_dir, "templates", "service.yaml")
+def build_runtime_service_manifest(
+    function_id: str, image: str, scaling: FunctionScaling | None = None
+) -> dict:
+    """Constructs knative service manifest for a prebuilt runtime image"""
+    manifest = runtime_service_template.render(name=function_id, image=image)
+    return apply_patches(manifest, scaling_patches(scaling))
 
-    with open(service_path) as f:
-        manifest = yaml.safe_load(f)
 
-    manifest["metadata"]["name"] = container_image.tag
-    manifest["spec"]["template"]["spec"]["containers"][0]["image"] = (
-        f"{container_image.registry}:{container_image.tag}"
+def build_handler_config_map_manifest(
+    function_id: str, language: str, body: str
+) -> dict:
+    """Constructs the ConfigMap delivering handler source to a runtime image"""
+    return handler_config_map_template.render(
+        name=function_id, filename=HandlerFiles[language], body=body
     )
 
-    return manifest
+
+def new_function_id(language: str) -> str:
+    return f"{language}-{str(uuid4())}"
 
 
 async def create(
-    k8s_api_client: Any, db_session: AsyncSession, container_image: ContainerImage
+    k8s_api_client: Any,
+    db_session: AsyncSession,
+    container_image: ContainerImage,
+    scaling: FunctionScaling | None = None,
 ) -> Function:
     """Creates the knative service"""
-    service = build_kn_service_manifest(container_image)
+    function_id = new_function_id(container_image.language)
+    service = build_kn_service_manifest(function_id, container_image, scaling)
 
-    utils.create_from_dict(
+    return await deploy(
         k8s_api_client,
+        db_session,
+        function_id,
         service,
-        verbose=True,
-        namespace=config.FUNCTION_NAMESPACE,
-        apply=True,
+        container_image_tag=container_image.tag,
     )
 
-    # Wait for route to come up
-    time.sleep(1)
-    route = get_knative_route(container_image.tag, config.FUNCTION_NAMESPACE)
-    url = route["status"]["url"]
 
+async def create_from_source(
+    k8s_api_client: Any,
+    db_session: AsyncSession,
+    language: str,
+    body: str,
+    scaling: FunctionScaling | None = None,
+) -> Function:
+    """Creates the knative service on the prebuilt runtime image, without a build."""
+    function_id = new_function_id(language)
+    ready_service = await apply_runtime_service(
+        k8s_api_client, function_id, language, body, scaling
+    )
+    return await record(db_session, function_id, ready_service["status"]["url"])
+
+
+async def apply_runtime_service(
+    k8s_api_client: Any,
+    function_id: str,
+    language: str,
+    body: str,
+    scaling: FunctionScaling | None = None,
+    patches: dict[str, Any] | None = None,
+) -> dict:
+    """Applies a runtime image service with its handler and waits until it is ready.
+
+    The handler source is delivered in a ConfigMap owned by the service, so
+    deleting the service also removes it.
+    """
+    core_client = client.CoreV1Api(k8s_api_client)
+
+    await run_sync(
+        core_client.create_namespaced_config_map,
+        config.FUNCTION_NAMESPACE,
+        build_handler_config_map_manifest(function_id, language, body),
+    )
+    try:
+        service = build_runtime_service_manifest(
+            function_id, runtime_image(language), scaling
+        )
+        apply_patches(service, patches or {})
+        ready_service = await apply_service(k8s_api_client, function_id, service)
+    except Exception:
+        try:
+            await run_sync(
+                core_client.delete_namespaced_config_map,
+                function_id,
+                config.FUNCTION_NAMESPACE,
+            )
+        except ApiException:
+            log.exception("Cleanup failed", extra={"function_id": function_id})
+        raise
+
+    # Garbage collected by kubernetes together with the service
+    owner = {
+        "apiVersion": ready_service["apiVersion"],
+        "kind": ready_service["kind"],
+        "name": function_id,
+        "uid": ready_service["metadata"]["uid"],
+    }
+    await run_sync(
+        core_client.patch_namespaced_config_map,
+        function_id,
+        config.FUNCTION_NAMESPACE,
+        {"metadata": {"ownerReferences": [owner]}},
+    )
+    return ready_service
+
+
+async def deploy(
+    k8s_api_client: Any,
+    db_session: AsyncSession,
+    function_id: str,
+    service: dict,
+    container_image_tag: str | None = None,
+) -> Function:
+    """Applies a knative service, waits until it is ready and records the function"""
+    ready_service = await apply_service(k8s_api_client, function_id, service)
+    return await record(
+        db_session, function_id, ready_service["status"]["url"], container_image_tag
+    )
+
+
+async def apply_service(k8s_api_client: Any, function_id: str, service: dict) -> dict:
+    """Applies a knative service and returns it once Ready, deleting it on failure"""
+    with PIPELINE_PHASE_SECONDS.labels("knative_apply").time():
+        await run_sync(
+            utils.create_from_dict,
+            k8s_api_client,
+            service,
+            verbose=True,
+            namespace=config.FUNCTION_NAMESPACE,
+            apply=True,
+        )
+
+    try:
+        # Ready includes the route, so this covers URL resolution too
+        with PIPELINE_PHASE_SECONDS.labels("knative_ready").time():
+            return await wait_for_knative_ready(
+                function_id,
+                config.FUNCTION_NAMESPACE,
+                config.KNATIVE_READY_TIMEOUT_SECS,
+            )
+    except Exception:
+        # Don't leave a failed revision behind
+        try:
+            await delete_knative_service(k8s_custom_objects_client(), function_id)
+        except ApiException:
+            log.exception("Cleanup failed", extra={"function_id": function_id})
+        raise
+
+
+async def record(
+    db_session: AsyncSession,
+    function_id: str,
+    url: str,
+    container_image_tag: str | None = None,
+) -> Function:
+    """Persists a deployed function and schedules its expiry"""
     expire_at = datetime.now(timezone.utc) + timedelta(
         seconds=config.FUNCTION_CLEANUP_SECS
     )
-    function = Function(id=container_image.tag, url=url, expire_at=expire_at)
+    function = Function(
+        id=function_id,
+        container_image_tag=container_image_tag,
+        url=url,
+        expire_at=expire_at,
+    )
 
     db_session.add(function)
     await db_session.commit()
+    expiry_timer.schedule(function.id, function.expire_at)
+    function_cache.invalidate(function.id)
 
     return function
 
 
+async def delete_knative_service(k8s_client: client.CustomObjectsApi, name: str):
+    """Deletes the knative service of a function"""
+    await run_sync(
+        k8s_client.delete_namespaced_custom_object,
+        group="serving.knative.dev",
+        version="v1",
+        namespace=config.FUNCTION_NAMESPACE,
+        name=name,
+        plural="services",
+    )
+
+
 async def get(db_session: AsyncSession, function_id: str) -> Function | None:
     """Returns a function based on the given id."""
     return await db_session.get(Function, function_id)
 
 
+METADATA_COLUMNS = (
+    Function.id,
+    Function.url,
+    Function.container_image_tag,
+    Function.expire_at,
+    Function.created_at,
+)
+
+
+async def get_metadata(
+    db_session: AsyncSession, function_id: str
+) -> FunctionMetadata | None:
+    """Returns the metadata of a function, from the cache when possible.
+
+    Misses select the columns only, no ORM identity or relationships, and
+    missing functions aren't cached so new ones are visible right away.
+    """
+    metadata = function_cache.get(function_id)
+    if metadata is not None:
+        return metadata
+
+    query = select(*METADATA_COLUMNS).where(Function.id == function_id)
+    row = (await db_session.execute(query)).first()
+    if row is None:
+        return None
+
+    metadata = FunctionMetadata(**row._mapping)
+    function_cache.put(function_id, metadata)
+    return metadata
+
+
+async def get_many_metadata(
+    db_session: AsyncSession, function_ids: list[str]
+) -> dict[str, FunctionMetadata]:
+    """Returns the metadata of existing functions, with one query for all misses."""
+    found = {}
+    missing = []
+    for function_id in function_ids:
+        metadata = function_cache.get(function_id)
+        if metadata is None:
+            missing.append(function_id)
+        else:
+            found[function_id] = metadata
+
+    if missing:
+        query = select(*METADATA_COLUMNS).where(Function.id.in_(missing))
+        for row in await db_session.execute(query):
+            metadata = FunctionMetadata(**row._mapping)
+            function_cache.put(metadata.id, metadata)
+            found[metadata.id] = metadata
+    return found
+
+
 async def delete(
-    k8s_client: client.CustomObjectsApi,
-    db_session: AsyncSession,
-    http_session: AsyncHttpSession,
-    function_id: str,
+    k8s_client: client.CustomObjectsApi, db_session: AsyncSession, function_id: str
 ):
     """Deletes existing function"""
     function = await db_session.get(Function, function_id)
 
-    container_image = function.container_image
-
     if not function:
         log.warning("Could not find function", extra={"function_id": function_id})
         return
 
+    container_image_tag = function.container_image_tag
+
     # Delete function from knative
-    k8s_client.delete_namespaced_custom_object(
-        group="serving.knative.dev",
-        version="v1",
-        namespace=config.FUNCTION_NAMESPACE,
-        name=function.id,
-        plural="services",
-    )
+    await delete_knative_service(k8s_client, function.id)
 
     await db_session.delete(function)
     await db_session.commit()
+    expiry_timer.cancel(function.id)
+    function_cache.invalidate(function.id)
 
-    # Delete container from registry and db
-    await container_service.delete(
-        db_session,
-        http_session,
-        container_image.tag,
-    )
+    # Release the image, it is deleted once no other function uses it
+    if container_image_tag:
+        await container_service.release(db_session, container_image_tag)
 
 
-async def fetch_status(session: AsyncHttpSession, url: str) -> int:
+async def fetch_status(
+    session: AsyncHttpSession, url: str, timeout: float | None = None
+) -> int:
     """Returns HTTP status of endpoint"""
-    async with session.get(url) as response:
+    async with session.get(url, timeout=ClientTimeout(total=timeout)) as response:
         return response.status
+
+
+async def wait_for_healthy(
+    session: AsyncHttpSession,
+    url: str,
+    timeout: float = config.FUNCTION_HEALTH_TIMEOUT_SECS,
+):
+    """Confirms the function health endpoint responds with 200.
+
+    Called once Knative reports the service Ready, so this normally succeeds
+    on the first probe. Retries with backoff until `timeout`.
+    """
+    deadline = time.monotonic() + timeout
+    delay = 0.25
+    last_error = None
+
+    while True:
+        remaining = deadline - time.monotonic()
+        try:
+            status = await fetch_status(
+                session, f"{url}{FunctionEndpoints.HEALTH}", timeout=remaining
+            )
+            if status == 200:
+                return
+            last_error = f"HTTP {status}"
+        except (ClientError, asyncio.TimeoutError) as e:
+            last_error = repr(e)
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise FunctionNotHealthyError(
+                f"{url} not healthy in {timeout}s: {last_error}"
+            )
+        await asyncio.sleep(min(delay, remaining))
+        delay = min(delay * 2, 2)
@@ -0,0 +1,122 @@
+import ast
+import asyncio
+import logging
+import re
+import shutil
+
+from src.config import config
+from src.container.enums import LanguageTypes
+
+from .exceptions import HandlerValidationError
+
+log = logging.getLogger(__name__)
+
+# Entry points the runtimes call, see templates/contexts/<language>
+PYTHON_HANDLER_SYMBOL = "handler"
+GO_HANDLER_SYMBOL = "Handle"
+# Python version of the runtime image
+PYTHON_FEATURE_VERSION = (3, 11)
+
+GO_PACKAGE_RE = re.compile(r"^\s*package\s+main\b", re.MULTILINE)
+GO_HANDLER_RE = re.compile(rf"^\s*func\s+{GO_HANDLER_SYMBOL}\s*\(", re.MULTILINE)
+# gofmt reports errors as <file>:<line>:<column>: <message>
+GOFMT_ERROR_RE = re.compile(r"^[^:]*:(\d+):\d+: (.*)$")
+
+
+def validate_python(body: str):
+    """Parses the handler and checks it defines a callable entry point."""
+    try:
+        tree = ast.parse(body, "handler.py", feature_version=PYTHON_FEATURE_VERSION)
+    except SyntaxError as e:
+        raise HandlerValidationError(f"Syntax error: {e.msg}", e.lineno)
+
+    defined = None
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names = [node.name]
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            names = [(a.asname or a.name).split(".")[0] for a in node.names]
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            names = [t.id for t in targets if isinstance(t, ast.Name)]
+        else:
+            continue
+        if PYTHON_HANDLER_SYMBOL in names:
+            defined = node
+
+    if defined is None:
+        raise HandlerValidationError(
+            f"No top-level '{PYTHON_HANDLER_SYMBOL}' defined", len(body.splitlines())
+        )
+    if isinstance(defined, ast.AsyncFunctionDef):
+        raise HandlerValidationError(
+            f"'{PYTHON_HANDLER_SYMBOL}' must be a regular function, not async",
+            defined.lineno,
+        )
+    if isinstance(defined, ast.FunctionDef):
+        args = defined.args
+        positional = len(args.posonlyargs) + len(args.args)
+        required = positional - len(args.defaults)
+        if required > 2 or (positional < 2 and args.vararg is None):
+            raise HandlerValidationError(
+                f"'{PYTHON_HANDLER_SYMBOL}' must accept (event, ctx)", defined.lineno
+            )
+
+
+async def validate_go(body: str):
+    """Checks the package and entry point, and the syntax if gofmt is available."""
+    if not GO_PACKAGE_RE.search(body):
+        raise HandlerValidationError("Handler must be in 'package main'", 1)
+    if not GO_HANDLER_RE.search(body):
+        raise HandlerValidationError(
+            f"No 'func {GO_HANDLER_SYMBOL}(event Event, ctx Context)' defined"
+        )
+
+    gofmt = shutil.which("gofmt")
+    if gofmt is None:
+        return
+
+    process = await asyncio.create_subprocess_exec(
+        gofmt,
+        "-e",
+        "-l",
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        _, stderr = await asyncio.wait_for(
+            process.communicate(body.encode("utf-8")),
+            config.GO_SYNTAX_CHECK_TIMEOUT_SECS,
+        )
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        log.warning("gofmt timed out, skipping the Go syntax check")
+        return
+
+    if process.returncode != 0:
+        first = stderr.decode("utf-8", "replace").strip().splitlines()[0]
+        match = GOFMT_ERROR_RE.match(first)
+        if match:
+            raise HandlerValidationError(
+                f"Syntax error: {match.group(2)}", int(match.group(1))
+            )
+        raise HandlerValidationError(f"Syntax error: {first}")
+
+
+async def validate_handler(language: str, body: str):
+    """Rejects handlers that can't build or load, before any resources are used."""
+    if language not in LanguageTypes.__members__:
+        raise HandlerValidationError(f"Unsupported language '{language}'")
+
+    size = len(body.encode("utf-8"))
+    if size > config.FUNCTION_BODY_MAX_BYTES:
+        raise HandlerValidationError(
+            f"Handler is {size} bytes, the limit is {config.FUNCTION_BODY_MAX_BYTES}"
+        )
+
+    if language == LanguageTypes.python:
+        validate_python(body)
+    elif language == LanguageTypes.go:
+        await validate_go(body)
@@ -1,52 +1,88 @@
 import logging
-from fastapi import APIRouter, HTTPException, status
-
-from src.container import service as containers_service
-from src.container.models import ContainerImageCreate
-from src.database import DbSession
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+
+from src.build import service as build_service
+from src.build.models import BuildJobResponse, FunctionTimeline, PhasePercentiles
+from src.build.timeline import get_function_timeline, phase_percentiles
+from src.container.enums import LanguageTypes
+from src.database import DbSession, ReadSession
 from src.dependencies import HttpSession
 from src.k8s.dependencies import K8sCustomObjectsClient, K8sApiClient
 
-from .enums import FunctionEndpoints
-from .models import FunctionCreate, FunctionResponse
-from .service import create, delete, fetch_status, get
+from .enums import HealthStatus
+from .exceptions import HandlerValidationError
+from .gateway import invoke
+from .health import knative_readiness, probe, probe_many
+from .models import FunctionCreate, FunctionHealth, FunctionHealthQuery
+from .pool import PoolStats, get_warm_pool, is_enabled
+from .service import delete, get_many_metadata, get_metadata
+from .validation import validate_handler
 
 log = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
-@router.post("", summary="Creates a single function")
+@router.post(
+    "",
+    summary="Starts building a single function",
+    status_code=status.HTTP_202_ACCEPTED,
+)
 async def create_function(
     function_in: FunctionCreate,
     db_session: DbSession,
     k8s_api_client: K8sApiClient,
     http_session: HttpSession,
-) -> FunctionResponse:
-    container_image_in = ContainerImageCreate(
-        language=function_in.language, body=function_in.body
-    )
-    container = await containers_service.create(
-        k8s_api_client, db_session, container_image_in
-    )
-
-    function = await create(k8s_api_client, db_session, container)
-
-    # Wait for healthy
-    healthy = False
-    while not healthy:
-        status = await fetch_status(
-            http_session, f"{function.url}{FunctionEndpoints.HEALTH}"
-        )
-        if status == 200:
-            healthy = True
+) -> BuildJobResponse:
+    """Queues the build and returns the job, see `/functions/jobs/{job_id}`"""
+    try:
+        await validate_handler(function_in.language, function_in.body)
+    except HandlerValidationError as e:
+        # Same shape as FastAPI's request validation errors
+        error = {"loc": ["body", "body"], "msg": str(e), "type": "handler_invalid"}
+        if e.line is not None:
+            error["line"] = e.line
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, [error])
+
+    job = await build_service.create(db_session, function_in)
+    build_service.start(job.id, function_in, k8s_api_client, http_session)
+
+    return await build_service.to_response(db_session, job)
+
+
+@router.get("/pool", summary="Shows the warm pool of each language")
+async def warm_pool_stats(
+    k8s_custom_obj_client: K8sCustomObjectsClient,
+) -> dict[str, PoolStats]:
+    """Instances are counted cluster wide, hits and misses per API replica"""
+    return {
+        language: await get_warm_pool(language).stats(k8s_custom_obj_client)
+        for language in LanguageTypes
+        if is_enabled(language)
+    }
+
+
+@router.get(
+    "/timeline/percentiles", summary="Reports create phase duration percentiles"
+)
+async def timeline_percentiles(
+    db_session: ReadSession,
+    window_secs: int = Query(default=3600, ge=60, le=30 * 24 * 3600),
+) -> list[PhasePercentiles]:
+    """p50/p95/p99 of each create phase finished in the last `window_secs`"""
+    return await phase_percentiles(db_session, window_secs)
+
+
+@router.get("/{function_id}/timeline", summary="Shows how long each create phase took")
+async def function_timeline(
+    function_id: str, db_session: ReadSession
+) -> FunctionTimeline:
+    timeline = await get_function_timeline(db_session, function_id)
+    if not timeline:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Not found")
 
-    return FunctionResponse(
-        id=function.id,
-        language=container.language,
-        url=function.url,
-        created_at=function.created_at,
-    )
+    return timeline
 
 
 @router.delete("/{function_id}", summary="Deletes a single function")
@@ -54,10 +90,9 @@ async def delete_function(
     function_id: str,
     db_session: DbSession,
     k8s_custom_obj_client: K8sCustomObjectsClient,
-    http_session: HttpSession,
 ):
     try:
-        await delete(k8s_custom_obj_client, db_session, http_session, function_id)
+        await delete(k8s_custom_obj_client, db_session, function_id)
     except Exception as e:
         log.exception(e, extra={"function_id": function_id})
         raise HTTPException(
@@ -70,18 +105,49 @@ async def delete_function(
 @router.get("/{function_id}/health", summary="Checks function health endpoint")
 async def function_health(
     function_id: str,
-    db_session: DbSession,
+    db_session: ReadSession,
     http_session: HttpSession,
 ) -> bool | None:
     """Checks function health endpoint and returns bool to indicate health"""
-    function = await get(db_session, function_id)
+    function = await get_metadata(db_session, function_id)
     if not function:
         log.warning("Function not found", extra={"function_id": function_id})
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Not found")
 
-    function_status = await fetch_status(
-        http_session, f"{function.url}{FunctionEndpoints.HEALTH}"
-    )
-
-    if function_status == status.HTTP_200_OK:
+    result = await probe(http_session, function.url)
+    if result.status == HealthStatus.healthy:
         return True
+
+
+@router.post("/health", summary="Checks the health of many functions")
+async def functions_health(
+    query: FunctionHealthQuery,
+    db_session: ReadSession,
+    http_session: HttpSession,
+    k8s_custom_obj_client: K8sCustomObjectsClient,
+) -> dict[str, FunctionHealth]:
+    """Probes functions concurrently, or with `knative` reads Knative readiness
+    instead, which doesn't wake functions scaled to zero"""
+    ids = list(dict.fromkeys(query.ids))
+    functions = await get_many_metadata(db_session, ids)
+
+    if query.knative:
+        results = await knative_readiness(k8s_custom_obj_client, list(functions))
+    else:
+        urls = {function_id: f.url for function_id, f in functions.items()}
+        results = await probe_many(http_session, urls)
+
+    not_found = FunctionHealth(status=HealthStatus.not_found)
+    return {function_id: results.get(function_id, not_found) for function_id in ids}
+
+
+@router.api_route(
+    "/{function_id}/invoke",
+    methods=["GET", "POST"],
+    summary="Invokes a function through the platform",
+)
+async def invoke_function(
+    function_id: str, request: Request, http_session: HttpSession
+) -> StreamingResponse:
+    """Forwards the request to the function and streams its response back"""
+    return await invoke(http_session, function_id, request)
@@ -0,0 +1,85 @@
+import logging
+import socket
+import threading
+
+from kubernetes import client
+from kubernetes import config as k8s_config
+from urllib3.connection import HTTPConnection
+
+from src.config import config
+
+log = logging.getLogger(__name__)
+
+# Detect dead connections held in the pool, e.g. after an API server restart
+SOCKET_OPTIONS = HTTPConnection.default_socket_options + [
+    (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+]
+
+
+class PooledApiClient(client.ApiClient):
+    """ApiClient applying a default timeout to requests that don't set one
+
+    Its connections are opened with TCP keep-alive, which the generated client
+    has no configuration option for.
+    """
+
+    def __init__(self, configuration: client.Configuration, request_timeout: tuple):
+        super().__init__(configuration)
+        self.request_timeout = request_timeout
+        self.rest_client.pool_manager.connection_pool_kw["socket_options"] = (
+            SOCKET_OPTIONS
+        )
+
+    def request(self, *args, _request_timeout=None, **kwargs):
+        return super().request(
+            *args, _request_timeout=_request_timeout or self.request_timeout, **kwargs
+        )
+
+
+def build_configuration() -> client.Configuration:
+    """Loads credentials for the running environment into a new configuration.
+
+    In-cluster service account tokens are re-read when they rotate.
+    """
+    configuration = client.Configuration()
+    try:
+        if config.IN_CLUSTER:
+            k8s_config.load_incluster_config(
+                client_configuration=configuration, try_refresh_token=True
+            )
+        else:
+            k8s_config.load_kube_config(client_configuration=configuration)
+    except k8s_config.ConfigException as e:
+        raise RuntimeError(f"Failed to load kubernetes configuration: {e}")
+
+    configuration.connection_pool_maxsize = config.K8S_POOL_MAXSIZE
+    return configuration
+
+
+_api_client: PooledApiClient | None = None
+_lock = threading.Lock()
+
+
+def get_api_client() -> client.ApiClient:
+    """Returns the process wide ApiClient, creating it on first use."""
+    global _api_client
+    if _api_client is None:
+        with _lock:
+            if _api_client is None:
+                _api_client = PooledApiClient(
+                    build_configuration(),
+                    request_timeout=(
+                        config.K8S_CONNECT_TIMEOUT_SECS,
+                        config.K8S_REQUEST_TIMEOUT_SECS,
+                    ),
+                )
+    return _api_client
+
+
+def close_api_client():
+    """Closes the shared ApiClient and its connection pool."""
+    global _api_client
+    with _lock:
+        if _api_client is not None:
+            _api_client.close()
+            _api_client = None
@@ -1,13 +1,14 @@
 from kubernetes import client
 from typing import Annotated
-from src.config import config
 
 from fastapi import Depends
 
+from .client import get_api_client
+
 
 def k8s_custom_objects_client() -> client.CustomObjectsApi:
-    """Get the CustomObjectsApi client with proper config"""
-    return client.CustomObjectsApi(config.get_k8s_client())
+    """Get the CustomObjectsApi client on the shared ApiClient"""
+    return client.CustomObjectsApi(get_api_client())
 
 
 K8sCustomObjectsClient = Annotated[
@@ -16,17 +17,16 @@ K8sCustomObjectsClient = Annotated[
 
 
 def k8s_core_client() -> client.CoreV1Api:
-    """Get the CoreV1Api client with proper config"""
-    return client.CoreV1Api(config.get_k8s_client())
+    """Get the CoreV1Api client on the shared ApiClient"""
+    return client.CoreV1Api(get_api_client())
 
 
 K8sCoreClient = Annotated[client.CoreV1Api, Depends(k8s_core_client)]
 
 
 def k8s_api_client() -> client.ApiClient:
-    """Get the ApiClient with the proper config"""
-    # TODO: update the client configuration
-    return client.ApiClient()
+    """Get the shared ApiClient"""
+    return get_api_client()
 
 
 K8sApiClient = Annotated[client.ApiClient, Depends(k8s_api_client)]
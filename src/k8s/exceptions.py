@@ -2,3 +2,21 @@ class PodTimeoutError(Exception):
     """Raised when a Pod does not reach the desired status in time"""
 
     pass
+
+
+class PodFailedError(Exception):
+    """Raised when a Pod reaches a failed or unrecoverable state"""
+
+    pass
+
+
+class KnativeServiceFailedError(Exception):
+    """Raised when a Knative Service reports it cannot become ready"""
+
+    pass
+
+
+class KnativeServiceTimeoutError(Exception):
+    """Raised when a Knative Service does not become ready in time"""
+
+    pass
@@ -1,16 +1,29 @@
+import asyncio
 import time
 import logging
 
-from .exceptions import PodTimeoutError
+from kubernetes.client.exceptions import ApiException
+
+from src.config import config
+from src.executor import run_sync
+
+from .exceptions import (
+    KnativeServiceFailedError,
+    KnativeServiceTimeoutError,
+    PodFailedError,
+    PodTimeoutError,
+)
 from .dependencies import k8s_custom_objects_client, k8s_core_client
+from .watcher import get_pod_watcher, terminal_state
 
 log = logging.getLogger(__name__)
 
 
-def get_knative_route(name: str, namespace: str):
+async def get_knative_route(name: str, namespace: str):
     """Get the endpoint of an knative service"""
     client = k8s_custom_objects_client()
-    return client.get_namespaced_custom_object(
+    return await run_sync(
+        client.get_namespaced_custom_object,
         group="serving.knative.dev",
         version="v1",
         namespace=namespace,
@@ -19,26 +32,107 @@ def get_knative_route(name: str, namespace: str):
     )
 
 
-def wait_for_succeeded(name: str, namespace: str, timeout: int):
-    """Waits for 'Succeeded' status from pod. Raises on timeout with logs"""
-    client = k8s_core_client()
-    # Could early exit on Error status
-    t_start = time.perf_counter()
+def get_condition(resource: dict, condition_type: str) -> dict | None:
+    """Returns a status condition of a Knative resource by type"""
+    for condition in resource.get("status", {}).get("conditions", []):
+        if condition.get("type") == condition_type:
+            return condition
+    return None
+
+
+async def wait_for_knative_ready(name: str, namespace: str, timeout: float) -> dict:
+    """Waits for the Ready condition of a Knative Service and returns the service.
+
+    Polls with exponential backoff and raises as soon as the service reports
+    Ready=False, e.g. when its revision fails, or once `timeout` expires.
+    """
+    client = k8s_custom_objects_client()
+    deadline = time.monotonic() + timeout
+    delay = 0.5
 
     while True:
-        resp = client.read_namespaced_pod_status(name, namespace)
-        phase = resp.status.phase or ""
+        service = await run_sync(
+            client.get_namespaced_custom_object,
+            group="serving.knative.dev",
+            version="v1",
+            namespace=namespace,
+            name=name,
+            plural="services",
+        )
 
-        if phase == "Succeeded":
-            elapsed = round(time.perf_counter() - t_start)
-            log.info(f"Succeeded in {elapsed}")
-            return
+        status = service.get("status", {})
+        # Conditions from a previous generation say nothing about this spec
+        current = status.get("observedGeneration") == service["metadata"].get(
+            "generation"
+        )
+        ready = get_condition(service, "Ready") if current else None
 
-        if time.perf_counter() - t_start >= timeout:
-            logs = client.read_namespaced_pod_log(name, namespace)
+        if ready and ready.get("status") == "True":
+            return service
+        if ready and ready.get("status") == "False":
+            raise KnativeServiceFailedError(
+                f"Service {name} failed: {ready.get('reason')}: {ready.get('message')}"
+            )
 
-            raise PodTimeoutError(
-                f"Pod {name} did not succeed in {timeout}s.\n" f"Logs:\n {logs}"
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            reason = ready.get("reason") if ready else "no status"
+            raise KnativeServiceTimeoutError(
+                f"Service {name} not ready in {timeout}s ({reason})"
             )
 
-        time.sleep(3)
+        await asyncio.sleep(min(delay, remaining))
+        delay = min(delay * 2, 5)
+
+
+async def read_pod_log_tail(name: str, namespace: str) -> str:
+    """Reads the last lines of a pod's logs, empty if none are available"""
+    client = k8s_core_client()
+    try:
+        return await run_sync(
+            client.read_namespaced_pod_log,
+            name,
+            namespace,
+            tail_lines=config.BUILD_LOG_TAIL_LINES,
+        )
+    except ApiException as e:
+        log.warning("Could not read pod logs", extra={"pod": name, "status": e.status})
+        return ""
+
+
+async def wait_for_succeeded(
+    name: str, namespace: str, timeout: int, label_selector: str | None = None
+):
+    """Waits for 'Succeeded' status from pod and returns the finished pod.
+
+    Raises on failure or timeout with logs.
+    """
+    client = k8s_core_client()
+    watcher = get_pod_watcher(namespace, label_selector)
+    t_start = time.perf_counter()
+
+    future = watcher.register(name)
+    try:
+        # The pod may have finished before the shared watch picked it up
+        pod = await run_sync(client.read_namespaced_pod_status, name, namespace)
+        watcher.dispatch(pod)
+        succeeded, reason = await asyncio.wait_for(future, timeout)
+    except asyncio.TimeoutError:
+        logs = await read_pod_log_tail(name, namespace)
+        raise PodTimeoutError(
+            f"Pod {name} did not succeed in {timeout}s.\nLogs:\n {logs}"
+        )
+    finally:
+        watcher.unregister(name, future)
+
+    if not succeeded:
+        logs = await read_pod_log_tail(name, namespace)
+        raise PodFailedError(f"Pod {name} failed: {reason}.\nLogs:\n {logs}")
+
+    elapsed = round(time.perf_counter() - t_start)
+    log.info(f"Succeeded in {elapsed}")
+
+    if terminal_state(pod) is None:
+        # Finished after the first read, fetch the final status
+        pod = await run_sync(client.read_namespaced_pod_status, name, namespace)
+    return pod
@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any
+
+from kubernetes import watch
+
+from .dependencies import k8s_core_client
+
+log = logging.getLogger(__name__)
+
+# Container waiting reasons that will not resolve without intervention
+FAILED_WAITING_REASONS = frozenset(
+    {
+        "ErrImagePull",
+        "ImagePullBackOff",
+        "InvalidImageName",
+        "CreateContainerConfigError",
+        "CreateContainerError",
+        "CrashLoopBackOff",
+    }
+)
+
+
+def terminal_state(pod: Any) -> tuple[bool, str] | None:
+    """Returns (succeeded, reason) once a pod is done, None while it is running."""
+    status = pod.status
+    phase = status.phase or ""
+
+    if phase == "Succeeded":
+        return True, phase
+    if phase == "Failed":
+        return False, status.reason or phase
+
+    for container_status in status.container_statuses or []:
+        waiting = container_status.state and container_status.state.waiting
+        if waiting and waiting.reason in FAILED_WAITING_REASONS:
+            message = f"{waiting.reason}: {waiting.message}"
+            return False, message if waiting.message else waiting.reason
+
+    return None
+
+
+class PodPhaseWatcher:
+    """Resolves waiters on pods in a namespace from a single shared watch stream.
+
+    The stream runs in a background thread only while there are waiters and
+    hands results back to each waiter's event loop.
+    """
+
+    def __init__(
+        self, namespace: str, label_selector: str | None = None, timeout: int = 60
+    ):
+        self.namespace = namespace
+        self.label_selector = label_selector
+        self.timeout = timeout
+        self._waiters: dict[str, list[asyncio.Future]] = {}
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._watch: watch.Watch | None = None
+        self._stopped = False
+
+    def register(self, name: str) -> asyncio.Future:
+        """Returns a future resolved when the named pod reaches a terminal state."""
+        future = asyncio.get_running_loop().create_future()
+        with self._lock:
+            self._waiters.setdefault(name, []).append(future)
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped = False
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name=f"pod-watch-{self.namespace}",
+                    daemon=True,
+                )
+                self._thread.start()
+        return future
+
+    def unregister(self, name: str, future: asyncio.Future):
+        with self._lock:
+            futures = self._waiters.get(name, [])
+            if future in futures:
+                futures.remove(future)
+            if not futures:
+                self._waiters.pop(name, None)
+
+    def dispatch(self, pod: Any):
+        """Resolves the waiters of a pod if it has reached a terminal state."""
+        state = terminal_state(pod)
+        if state is None:
+            return
+
+        with self._lock:
+            futures = self._waiters.pop(pod.metadata.name, [])
+
+        succeeded, reason = state
+        for future in futures:
+            future.get_loop().call_soon_threadsafe(_resolve, future, succeeded, reason)
+
+    def stop(self):
+        self._stopped = True
+        if self._watch:
+            self._watch.stop()
+
+    def _has_waiters(self) -> bool:
+        with self._lock:
+            return bool(self._waiters)
+
+    def _run(self):
+        client = None
+        backoff = 1
+
+        while not self._stopped and self._has_waiters():
+            self._watch = watch.Watch()
+            # The read timeout must outlast the server side watch timeout
+            kwargs = {
+                "timeout_seconds": self.timeout,
+                "_request_timeout": (10, self.timeout + 10),
+            }
+            if self.label_selector:
+                kwargs["label_selector"] = self.label_selector
+            try:
+                client = client or k8s_core_client()
+                for event in self._watch.stream(
+                    client.list_namespaced_pod, self.namespace, **kwargs
+                ):
+                    self.dispatch(event["object"])
+                    if not self._has_waiters():
+                        self._watch.stop()
+                backoff = 1
+            except Exception:
+                log.exception(
+                    "Pod watch failed, retrying", extra={"namespace": self.namespace}
+                )
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+
+        with self._lock:
+            self._thread = None
+            # A waiter may have registered while the thread was exiting
+            if self._waiters and not self._stopped:
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name=f"pod-watch-{self.namespace}",
+                    daemon=True,
+                )
+                self._thread.start()
+
+
+def _resolve(future: asyncio.Future, succeeded: bool, reason: str):
+    if not future.done():
+        future.set_result((succeeded, reason))
+
+
+_watchers: dict[tuple[str, str | None], PodPhaseWatcher] = {}
+
+
+def get_pod_watcher(
+    namespace: str, label_selector: str | None = None
+) -> PodPhaseWatcher:
+    """Returns the shared watcher for a namespace and label selector."""
+    key = (namespace, label_selector)
+    if key not in _watchers:
+        _watchers[key] = PodPhaseWatcher(namespace, label_selector)
+    return _watchers[key]
+
+
+def stop_pod_watchers():
+    for watcher in _watchers.values():
+        watcher.stop()
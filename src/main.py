@@ -2,13 +2,29 @@ import logging
 from contextlib import asynccontextmanager
 
 from aiohttp import ClientSession as AsyncHttpSession
+from aiohttp import TCPConnector
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from prometheus_client import make_asgi_app
 
+from src.build import service as build_service
+from src.build.scheduled import build_fail_abandoned  # noqa: F401 registers the job
+from src.build.queue import build_queue
+from src.build.views import router as build_router
+from src.config import config
+from src.container.enums import LanguageTypes
+from src.container.registry.service import close_registry_client
+from src.container.scheduled import container_warm_build_cache
+from src.container.service import template_archives
+from src.function.expiry import expiry_timer
+from src.function.scheduled import function_delete_expired, function_expiry_sync
 from src.function.views import router as function_router
+from src.k8s.client import close_api_client, get_api_client
+from src.k8s.watcher import stop_pod_watchers
+from src.reconciler.scheduled import reconcile_orphans  # noqa: F401 registers the job
 
-from .config import config
+from . import executor
 from .scheduler import scheduler
 from .logging import configure_logging
 
@@ -17,18 +33,41 @@ log = logging.getLogger(__name__)
 configure_logging()
 
 
-k8s_client = config.get_k8s_client()
-
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Shared kubernetes API client for all requests and background work
+    get_api_client()
+    # Assemble build context templates before the first create
+    template_archives.warm(LanguageTypes)
+    # Rehydrate upcoming function expiry deadlines
+    await function_expiry_sync()
+    expiry_timer.start(function_delete_expired)
+    build_queue.start()
     # Load APScheduler
     scheduler.start()
-    app.state.http_session = AsyncHttpSession()
+    if config.BUILD_CACHE_WARM:
+        # One-off job, so startup doesn't wait for the builds
+        scheduler.add_job(container_warm_build_cache)
+    # Shared by health checks, the registry client and the invocation gateway
+    app.state.http_session = AsyncHttpSession(
+        connector=TCPConnector(
+            limit=config.HTTP_POOL_SIZE,
+            limit_per_host=config.HTTP_POOL_SIZE_PER_HOST,
+            keepalive_timeout=config.HTTP_KEEPALIVE_SECS,
+            ttl_dns_cache=300,
+        )
+    )
     yield
     # Cleanup APScheduler
     scheduler.shutdown()
+    await expiry_timer.stop()
+    await build_service.cancel_running()
+    await build_queue.stop()
     await app.state.http_session.close()
+    await close_registry_client()
+    stop_pod_watchers()
+    executor.shutdown()
+    close_api_client()
 
 
 app = FastAPI(root_path="/api", lifespan=lifespan)
@@ -43,7 +82,11 @@ app.add_middleware(
 )
 
 
+app.include_router(build_router, prefix="/functions/jobs")
 app.include_router(function_router, prefix="/functions")
 
+# Prometheus metrics of this replica
+app.mount("/metrics", make_asgi_app())
+
 # The SPA frontend files must be the last thing in the routing, it'll match any path.
 app.mount("/", StaticFiles(directory="src/static/dist", html=True))
@@ -0,0 +1,101 @@
+import re
+from typing import Any, Iterable
+
+import yaml
+
+# Placeholders are upper case names prefixed with REPLACE_, e.g. REPLACE_TAG
+PLACEHOLDER_RE = re.compile(r"REPLACE_[A-Z0-9_]+")
+
+
+class ManifestTemplateError(Exception):
+    """Raised when a manifest template or its render values are invalid"""
+
+    pass
+
+
+def find_placeholders(value: Any) -> set[str]:
+    """Returns every placeholder used in a parsed manifest"""
+    if isinstance(value, dict):
+        return set().union(*map(find_placeholders, value.items()), set())
+    if isinstance(value, (list, tuple)):
+        return set().union(*map(find_placeholders, value), set())
+    if isinstance(value, str):
+        return set(PLACEHOLDER_RE.findall(value))
+    return set()
+
+
+def _substitute(value: Any, replacements: dict[str, str]) -> Any:
+    # Rebuilds containers while walking, so the cached manifest is never shared
+    if isinstance(value, dict):
+        return {
+            _substitute(k, replacements): _substitute(v, replacements)
+            for k, v in value.items()
+        }
+    if isinstance(value, list):
+        return [_substitute(v, replacements) for v in value]
+    if isinstance(value, str):
+        return PLACEHOLDER_RE.sub(lambda m: replacements[m.group(0)], value)
+    return value
+
+
+def set_path(manifest: dict, path: str, value: Any):
+    """Sets a value by dotted path, e.g. `spec.containers.0.resources`.
+
+    Missing mappings along the path are created, list items are addressed by
+    index and existing mappings are merged with mapping values.
+    """
+    *parents, last = path.split(".")
+    node = manifest
+    for key in parents:
+        if isinstance(node, list):
+            node = node[int(key)]
+        else:
+            node = node.setdefault(key, {})
+
+    if isinstance(node, list):
+        node[int(last)] = value
+    elif isinstance(value, dict) and isinstance(node.get(last), dict):
+        node[last].update(value)
+    else:
+        node[last] = value
+
+
+class ManifestTemplate:
+    """YAML manifest parsed once and rendered by named substitutions.
+
+    Declared placeholders are checked against the template on load, so a
+    template and its code can't drift apart unnoticed.
+    """
+
+    def __init__(self, path: str, placeholders: Iterable[str]):
+        self.path = path
+        self.placeholders = frozenset(
+            f"REPLACE_{name.upper()}" for name in placeholders
+        )
+
+        with open(path) as f:
+            self._manifest = yaml.safe_load(f)
+
+        found = find_placeholders(self._manifest)
+        if found != self.placeholders:
+            raise ManifestTemplateError(
+                f"{path}: missing placeholders {sorted(self.placeholders - found)}, "
+                f"undeclared placeholders {sorted(found - self.placeholders)}"
+            )
+
+    def render(self, patches: dict[str, Any] | None = None, **values: Any) -> dict:
+        """Returns a new manifest with placeholders replaced by `values`.
+
+        `patches` maps dotted paths to values applied after substitution.
+        """
+        replacements = {f"REPLACE_{name.upper()}": str(v) for name, v in values.items()}
+        if replacements.keys() != self.placeholders:
+            raise ManifestTemplateError(
+                f"{self.path}: expected values for {sorted(self.placeholders)}, "
+                f"got {sorted(replacements)}"
+            )
+
+        manifest = _substitute(self._manifest, replacements)
+        for path, value in (patches or {}).items():
+            set_path(manifest, path, value)
+        return manifest
@@ -0,0 +1,62 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+# Buckets from fast warm invocations up to cold starts
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+FUNCTION_INVOKE_SECONDS = Histogram(
+    "faas_function_invoke_seconds",
+    "Invocations through the gateway, until the last response byte",
+    ["method", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+FUNCTION_INVOKE_FIRST_BYTE_SECONDS = Histogram(
+    "faas_function_invoke_first_byte_seconds",
+    "Invocations through the gateway, until the response headers",
+    ["method"],
+    buckets=LATENCY_BUCKETS,
+)
+
+# Build and deploy pipeline
+PIPELINE_PHASE_SECONDS = Histogram(
+    "faas_pipeline_phase_seconds",
+    "Duration of each build and deploy step of a function create",
+    ["phase"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 180, 300),
+)
+BUILDS = Counter(
+    "faas_builds_total", "Kaniko builds started, after cache misses", ["language"]
+)
+BUILD_FAILURES = Counter(
+    "faas_build_failures_total", "Kaniko builds that failed", ["language"]
+)
+BUILD_CACHE_HITS = Counter(
+    "faas_build_cache_hits_total",
+    "Creates that reused an existing image instead of building",
+    ["language"],
+)
+BUILD_JOBS = Counter(
+    "faas_build_jobs_total", "Finished create jobs by outcome", ["outcome"]
+)
+BUILDS_IN_FLIGHT = Gauge(
+    "faas_builds_in_flight", "Kaniko builds running on this replica"
+)
+FUNCTIONS_LIVE = Gauge(
+    "faas_functions_live", "Functions in the database, as of the last expiry sync"
+)
+FUNCTION_EXPIRY_LAG_SECONDS = Gauge(
+    "faas_function_expiry_lag_seconds",
+    "Longest time past its expiry of the overdue functions seen by the last reap, "
+    "failed deletes included",
+)
+
+# Warm pool
+WARM_POOL_INSTANCES = Gauge(
+    "faas_warm_pool_instances",
+    "Idle warm pool instances, as of the last refill or stats request",
+    ["language", "state"],
+)
+WARM_POOL_CLAIMS = Counter(
+    "faas_warm_pool_claims_total",
+    "Warm pool claims on this replica, hits deployed on an idle instance",
+    ["language", "outcome"],
+)
@@ -2,6 +2,7 @@ import re
 from datetime import datetime
 from sqlalchemy.orm import DeclarativeBase, declared_attr, Mapped, mapped_column
 from sqlalchemy import func
+from sqlalchemy.types import TIMESTAMP
 
 
 def resolve_table_name(name):
@@ -21,3 +22,10 @@ class Base(DeclarativeBase):
 class TimestampMixin:
     created_at: Mapped[datetime] = mapped_column(server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(onupdate=func.now(), nullable=True)
+
+
+class ScheduledJobRun(Base):
+    """Last start of a scheduled job on any replica, see src/scheduler.py"""
+
+    name: Mapped[str] = mapped_column(primary_key=True)
+    last_run_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True))
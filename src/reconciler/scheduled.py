@@ -0,0 +1,21 @@
+import dataclasses
+import logging
+
+from src.config import config
+from src.k8s.client import get_api_client
+from src.scheduler import leader_only, scheduler
+
+from .service import Reconciler
+
+log = logging.getLogger(__name__)
+
+
+@scheduler.scheduled_job(
+    "interval", seconds=config.RECONCILER_INTERVAL_SECS, misfire_grace_time=60
+)
+@leader_only("reconcile_orphans", config.RECONCILER_INTERVAL_SECS)
+async def reconcile_orphans():
+    """Deletes resources left behind by failed creates, see `Reconciler`"""
+    result = await Reconciler().run(get_api_client())
+
+    log.info("Reconciled orphaned resources", extra=dataclasses.asdict(result))
@@ -0,0 +1,359 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable
+
+from kubernetes import client
+from kubernetes.client.exceptions import ApiException
+from sqlalchemy import select
+
+from src.config import config
+from src.container import service as container_service
+from src.container.models import ContainerImage
+from src.container.registry.service import (
+    delete_container_image,
+    list_container_images,
+)
+from src.database import async_session_factory
+from src.executor import run_sync
+from src.function.models import Function
+from src.function.pool import POOL_LABEL
+from src.function.service import MANAGED_SELECTOR, delete_knative_service
+
+log = logging.getLogger(__name__)
+
+# Repository function images are pushed to, as in src/container/service.py
+REGISTRY_PROJECT = "library"
+REGISTRY_REPOSITORY = "functions"
+# Builder pods of the cache warming builds, their names mark a template as warmed
+WARM_POD_PREFIX = "warm-"
+# Pod phases of builds that have finished
+FINISHED_POD_PHASES = ("Succeeded", "Failed")
+
+
+class RateLimiter:
+    """Spaces out calls to at most `rate` per second across all callers."""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate
+        self._next = 0.0
+
+    async def wait(self):
+        now = time.monotonic()
+        delay = self._next - now
+        self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+@dataclass
+class OrphanCounts:
+    found: int = 0
+    deleted: int = 0
+    failed: int = 0
+
+
+@dataclass
+class ReconcileResult:
+    """Orphans found and deleted by one reconciler run, per resource kind"""
+
+    dry_run: bool
+    knative_services: OrphanCounts = field(default_factory=OrphanCounts)
+    builder_pods: OrphanCounts = field(default_factory=OrphanCounts)
+    registry_artifacts: OrphanCounts = field(default_factory=OrphanCounts)
+    build_contexts: OrphanCounts = field(default_factory=OrphanCounts)
+    total_secs: float = 0.0
+
+
+def parse_timestamp(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def last_modified(metadata: dict) -> datetime:
+    """Latest write to a Kubernetes object, e.g. a warm pool claim."""
+    times = [metadata["creationTimestamp"]]
+    times += [f["time"] for f in metadata.get("managedFields") or [] if f.get("time")]
+    return max(parse_timestamp(t) for t in times)
+
+
+def runtime_image_tags() -> set[str]:
+    """Tags of runtime images configured from the functions repository."""
+    prefix = f"{config.CONTAINER_REGISTRY}:"
+    image = config.PYTHON_RUNTIME_IMAGE
+    return {image.removeprefix(prefix)} if image and image.startswith(prefix) else set()
+
+
+async def existing(column: Any, values: list[str]) -> set[str]:
+    """Values of a key column that have a row, in one query."""
+    async with async_session_factory() as db_session:
+        return set(await db_session.scalars(select(column).where(column.in_(values))))
+
+
+class Reconciler:
+    """Finds resources no database row accounts for and deletes them.
+
+    Creates that fail partway leave Knative services, builder pods, registry
+    artifacts and S3 build contexts behind. Resources younger than the grace
+    period are never touched, as they may belong to a create in progress, and
+    every API server and registry request waits its turn on one rate limit.
+    """
+
+    def __init__(
+        self,
+        dry_run: bool = config.RECONCILER_DRY_RUN,
+        grace_secs: float = config.RECONCILER_GRACE_SECS,
+        page_size: int = config.RECONCILER_PAGE_SIZE,
+        rate_per_sec: float = config.RECONCILER_RATE_PER_SEC,
+        max_deletes: int = config.RECONCILER_MAX_DELETES,
+    ):
+        self.dry_run = dry_run
+        self.cutoff = datetime.now(timezone.utc) - timedelta(seconds=grace_secs)
+        self.page_size = page_size
+        self.limiter = RateLimiter(rate_per_sec)
+        self.max_deletes = max_deletes
+
+    async def run(self, k8s_api_client: Any) -> ReconcileResult:
+        """Reconciles each resource kind in turn."""
+        result = ReconcileResult(dry_run=self.dry_run)
+        started = time.perf_counter()
+        custom_client = client.CustomObjectsApi(k8s_api_client)
+        core_client = client.CoreV1Api(k8s_api_client)
+        passes = {
+            "knative_services": lambda: self.reconcile_knative_services(
+                custom_client, result.knative_services
+            ),
+            "builder_pods": lambda: self.reconcile_builder_pods(
+                core_client, result.builder_pods
+            ),
+            "registry_artifacts": lambda: self.reconcile_registry(
+                result.registry_artifacts
+            ),
+            "build_contexts": lambda: self.reconcile_build_contexts(
+                result.build_contexts
+            ),
+        }
+        # One kind failing, e.g. an unreachable registry, doesn't stop the others
+        for kind, reconcile in passes.items():
+            try:
+                await reconcile()
+            except Exception:
+                log.exception("Reconciling failed", extra={"kind": kind})
+        result.total_secs = time.perf_counter() - started
+        return result
+
+    async def remove(
+        self,
+        kind: str,
+        names: list[str],
+        delete: Callable[[str], Awaitable[Any]],
+        counts: OrphanCounts,
+    ):
+        """Deletes orphans concurrently, paced by the rate limit."""
+        if not names:
+            return
+        counts.found += len(names)
+        log.info(
+            "Orphans found",
+            extra={"kind": kind, "names": names, "dry_run": self.dry_run},
+        )
+        if self.dry_run:
+            return
+
+        budget = self.max_deletes - counts.deleted - counts.failed
+        names = names[: max(budget, 0)]
+
+        async def paced(name: str):
+            await self.limiter.wait()
+            try:
+                await delete(name)
+            except ApiException as e:
+                # Already gone
+                if e.status != 404:
+                    raise
+
+        outcomes = await asyncio.gather(
+            *(paced(name) for name in names), return_exceptions=True
+        )
+        for name, outcome in zip(names, outcomes):
+            if isinstance(outcome, Exception):
+                counts.failed += 1
+                log.error(
+                    "Failed to delete orphan",
+                    extra={"kind": kind, "orphan": name, "error": repr(outcome)},
+                )
+            else:
+                counts.deleted += 1
+
+    async def reconcile_knative_services(
+        self, custom_client: client.CustomObjectsApi, counts: OrphanCounts
+    ):
+        """Deletes Knative services without a function row.
+
+        Only services labelled as created by this platform are considered, and
+        every one except warm pool instances is taken for a function. Age counts from the last write rather than creation, as
+        a pool claim records its function only after taking the service out of
+        the pool.
+        """
+        token = None
+        while True:
+            await self.limiter.wait()
+            page = await run_sync(
+                custom_client.list_namespaced_custom_object,
+                group="serving.knative.dev",
+                version="v1",
+                namespace=config.FUNCTION_NAMESPACE,
+                plural="services",
+                label_selector=f"{MANAGED_SELECTOR},!{POOL_LABEL}",
+                limit=self.page_size,
+                _continue=token,
+            )
+            candidates = [
+                s["metadata"]["name"]
+                for s in page["items"]
+                if last_modified(s["metadata"]) < self.cutoff
+            ]
+            if candidates:
+                known = await existing(Function.id, candidates)
+                orphans = [name for name in candidates if name not in known]
+                await self.remove(
+                    "knative_service",
+                    orphans,
+                    lambda name: delete_knative_service(custom_client, name),
+                    counts,
+                )
+
+            token = page["metadata"].get("continue")
+            if not token:
+                return
+
+    async def reconcile_builder_pods(
+        self, core_client: client.CoreV1Api, counts: OrphanCounts
+    ):
+        """Deletes builder pods older than the grace period.
+
+        A builder pod has served its purpose once its build finished, whether
+        the image was recorded or not. Pods still pending or running are only
+        deleted once they have also outlived the longest build timeout, so a
+        slow build is never killed mid-build. Cache warming pods stay.
+        """
+        unfinished_cutoff = self.cutoff - timedelta(
+            seconds=container_service.max_build_timeout_secs()
+        )
+        token = None
+        while True:
+            await self.limiter.wait()
+            page = await run_sync(
+                core_client.list_namespaced_pod,
+                container_service.BUILDER_NAMESPACE,
+                label_selector=container_service.BUILDER_LABEL_SELECTOR,
+                limit=self.page_size,
+                _continue=token,
+            )
+            orphans = [
+                pod.metadata.name
+                for pod in page.items
+                if not pod.metadata.name.startswith(WARM_POD_PREFIX)
+                and pod.metadata.creation_timestamp
+                < (
+                    self.cutoff
+                    if pod.status.phase in FINISHED_POD_PHASES
+                    else unfinished_cutoff
+                )
+            ]
+            await self.remove(
+                "builder_pod",
+                orphans,
+                lambda name: run_sync(
+                    core_client.delete_namespaced_pod,
+                    name,
+                    container_service.BUILDER_NAMESPACE,
+                ),
+                counts,
+            )
+
+            token = page.metadata._continue
+            if not token:
+                return
+
+    async def reconcile_registry(self, counts: OrphanCounts):
+        """Deletes function images without a container_image row.
+
+        Registry pages are numbered, so all pages are read before deleting
+        anything to not shift artifacts between pages.
+        """
+        orphans = []
+        protected = runtime_image_tags()
+        page_number = 1
+        while True:
+            await self.limiter.wait()
+            page = await list_container_images(
+                REGISTRY_PROJECT,
+                REGISTRY_REPOSITORY,
+                page_number,
+                self.page_size,
+            )
+            candidates = {}
+            for artifact in page:
+                if parse_timestamp(artifact["push_time"]) >= self.cutoff:
+                    continue
+                tags = [tag["name"] for tag in artifact.get("tags") or []]
+                if protected.intersection(tags):
+                    continue
+                # Untagged artifacts are deleted by digest
+                candidates[tags[0] if tags else artifact["digest"]] = tags
+
+            tags = [
+                tag for artifact_tags in candidates.values() for tag in artifact_tags
+            ]
+            known = await existing(ContainerImage.tag, tags) if tags else set()
+            orphans += [
+                reference
+                for reference, artifact_tags in candidates.items()
+                if not known.intersection(artifact_tags)
+            ]
+
+            if len(page) < self.page_size:
+                break
+            page_number += 1
+
+        await self.remove(
+            "registry_artifact",
+            orphans,
+            lambda reference: delete_container_image(
+                REGISTRY_PROJECT, REGISTRY_REPOSITORY, reference
+            ),
+            counts,
+        )
+
+    async def reconcile_build_contexts(self, counts: OrphanCounts):
+        """Deletes build contexts older than the grace period.
+
+        Builds release their context when the builder pod finishes, so anything
+        older belongs to a build that was interrupted.
+        """
+        keys = await run_sync(
+            container_service.stale_build_contexts,
+            container_service.s3_client,
+            config.S3_BUCKET,
+            self.cutoff,
+        )
+        counts.found += len(keys)
+        if keys:
+            log.info(
+                "Orphans found",
+                extra={"kind": "build_context", "names": keys, "dry_run": self.dry_run},
+            )
+        if self.dry_run or not keys:
+            return
+
+        keys = keys[: self.max_deletes]
+        deleted = await run_sync(
+            container_service.delete_build_contexts,
+            container_service.s3_client,
+            config.S3_BUCKET,
+            keys,
+        )
+        counts.deleted += deleted
+        counts.failed += len(keys) - deleted
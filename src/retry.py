@@ -0,0 +1,39 @@
+import asyncio
+import logging
+import random
+from typing import Awaitable, Callable, TypeVar
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """Exponential backoff with full jitter for a zero-based attempt number."""
+    return random.uniform(0, min(max_delay, base_delay * 2**attempt))
+
+
+async def retry(
+    func: Callable[[], Awaitable[T]],
+    attempts: int = 3,
+    base_delay: float = 0.5,
+    max_delay: float = 10,
+    retry_on: Callable[[Exception], bool] = lambda e: True,
+) -> T:
+    """Awaits `func` until it succeeds, retrying failures accepted by `retry_on`."""
+    for attempt in range(attempts):
+        try:
+            return await func()
+        except Exception as e:
+            if attempt == attempts - 1 or not retry_on(e):
+                raise
+            delay = backoff_delay(attempt, base_delay, max_delay)
+            log.warning(
+                "Retrying after error",
+                extra={
+                    "attempt": attempt + 1,
+                    "delay": round(delay, 2),
+                    "error": repr(e),
+                },
+            )
+            await asyncio.sleep(delay)
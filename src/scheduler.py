@@ -1,4 +1,74 @@
+import functools
+import logging
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from datetime import timezone
+from datetime import timedelta, timezone
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import Insert, insert
+
+from src.database import advisory_lock, async_session_factory
+from src.models import ScheduledJobRun
+
+log = logging.getLogger(__name__)
 
 scheduler = AsyncIOScheduler(timezone=timezone.utc)
+
+# Share of its interval that has to pass before any replica runs a job again,
+# below 1 so a replica's own next tick isn't skipped for arriving a bit early
+MIN_SPACING = 0.9
+
+
+def claim_run_query(name: str, interval_secs: float) -> Insert:
+    """Records a run of a job unless one started within the interval.
+
+    Returns the job name only if the run was recorded, in one statement
+    evaluated on the database clock.
+    """
+    spacing = timedelta(seconds=interval_secs * MIN_SPACING)
+    return (
+        insert(ScheduledJobRun)
+        .values(name=name, last_run_at=func.now())
+        .on_conflict_do_update(
+            index_elements=[ScheduledJobRun.name],
+            set_={"last_run_at": func.now()},
+            where=ScheduledJobRun.last_run_at <= func.now() - spacing,
+        )
+        .returning(ScheduledJobRun.name)
+    )
+
+
+async def claim_run(name: str, interval_secs: float) -> bool:
+    async with async_session_factory() as db_session:
+        claimed = await db_session.scalar(claim_run_query(name, interval_secs))
+        await db_session.commit()
+    return claimed is not None
+
+
+def leader_only(lock_name: str, interval_secs: float | None = None):
+    """Runs a scheduled job on a single API replica per tick.
+
+    Every replica schedules the job, the one that takes the advisory lock runs
+    it and the others skip the tick, returning None. Interval ticks aren't
+    aligned across replicas, so with `interval_secs` the job also skips ticks
+    within that interval of a run on any replica, and runs once per interval.
+    """
+
+    def decorator(job):
+        @functools.wraps(job)
+        async def wrapper(*args, **kwargs):
+            async with advisory_lock(lock_name) as acquired:
+                if not acquired:
+                    log.debug(
+                        "Job running on another replica", extra={"job": lock_name}
+                    )
+                    return None
+                if interval_secs and not await claim_run(lock_name, interval_secs):
+                    log.debug(
+                        "Job ran recently on another replica", extra={"job": lock_name}
+                    )
+                    return None
+                return await job(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -1,5 +1,33 @@
 import type { FunctionData } from './App';
 
+interface BuildJob {
+  id: string;
+  phase: string;
+  error: string | null;
+  function: FunctionData | null;
+}
+
+// Resolves once the build job reports a healthy function, using the job's event stream
+function waitForFunction(jobId: string): Promise<FunctionData> {
+  return new Promise((resolve, reject) => {
+    const events = new EventSource(`/api/functions/jobs/${jobId}/events`);
+    events.addEventListener('phase', (e) => {
+      const job: BuildJob = JSON.parse((e as MessageEvent).data);
+      if (job.phase === 'healthy' && job.function) {
+        events.close();
+        resolve(job.function);
+      } else if (job.phase === 'failed') {
+        events.close();
+        reject(new Error(job.error ?? 'Failed to create function'));
+      }
+    });
+    events.onerror = () => {
+      events.close();
+      reject(new Error('Lost connection to build job'));
+    };
+  });
+}
+
 export async function createFunction(language: string, body: string): Promise<FunctionData> {
   const res = await fetch('/api/functions', {
     method: 'POST',
@@ -9,5 +37,6 @@ export async function createFunction(language: string, body: string): Promise<Fu
   if (!res.ok) {
     throw new Error('Failed to create function');
   }
-  return res.json();
-} 
\ No newline at end of file
+  const job: BuildJob = await res.json();
+  return waitForFunction(job.id);
+}
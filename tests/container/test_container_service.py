@@ -1,9 +1,15 @@
+import asyncio
 import boto3
 import tarfile
 import io
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
 
 from moto import mock_aws
 from src.container import models
+from src.function import models as function_models  # noqa: F401 registers Function mapper
 
 
 @mock_aws
@@ -24,7 +30,7 @@ def test_create_build_context():
     obj = create_build_context(
         s3_client=s3_client,
         container_image_in=container_image_in,
-        tag="unittest",
+        name="unittest",
         bucket=bucket,
     )
     obj_bucket, obj_key = obj.strip("s3://").split("/", 1)
@@ -36,7 +42,124 @@ def test_create_build_context():
         assert "src/handler.py" in tar.getnames()
 
 
+def _bucket(name: str):
+    s3_client = boto3.client(service_name="s3", region_name="us-east-1")
+    s3_client.create_bucket(Bucket=name)
+    return s3_client
+
+
+@mock_aws
+def test_delete_build_contexts_batches(monkeypatch):
+    from src.container import service
+
+    s3_client = _bucket("unittest")
+    keys = [service.context_key(f"ctx-{i}") for i in range(5)]
+    for key in keys:
+        s3_client.put_object(Bucket="unittest", Key=key, Body=b"")
+
+    calls = []
+    delete_objects = s3_client.delete_objects
+
+    def counting_delete_objects(**kwargs):
+        calls.append(len(kwargs["Delete"]["Objects"]))
+        return delete_objects(**kwargs)
+
+    monkeypatch.setattr(service, "S3_DELETE_BATCH_SIZE", 2)
+    monkeypatch.setattr(s3_client, "delete_objects", counting_delete_objects)
+
+    assert service.delete_build_contexts(s3_client, "unittest", keys) == 5
+    assert calls == [2, 2, 1]
+    assert s3_client.list_objects_v2(Bucket="unittest")["KeyCount"] == 0
+
+
+@mock_aws
+def test_sweep_build_contexts():
+    from src.container.service import context_key, sweep_build_contexts
+
+    s3_client = _bucket("unittest")
+    for key in (context_key("digest"), "legacy-tag.tar.gz", "other/data.tar.gz"):
+        s3_client.put_object(Bucket="unittest", Key=key, Body=b"")
+
+    past = datetime.now(timezone.utc) - timedelta(hours=1)
+    assert sweep_build_contexts(s3_client, "unittest", past) == 0
+
+    # Contexts under the prefix and at the root go, other objects stay
+    future = datetime.now(timezone.utc) + timedelta(hours=1)
+    assert sweep_build_contexts(s3_client, "unittest", future) == 2
+    remaining = s3_client.list_objects_v2(Bucket="unittest")["Contents"]
+    assert [obj["Key"] for obj in remaining] == ["other/data.tar.gz"]
+
+
+def test_build_context_contents():
+    from src.container.context import build_template_archive
+
+    archive = build_template_archive("python")
+    context = archive.with_handler("unittest")
+
+    with tarfile.open(fileobj=io.BytesIO(context), mode="r:gz") as tar:
+        names = tar.getnames()
+        handler = tar.extractfile("src/handler.py").read()
+
+    # Template files and the handler are all present in one archive
+    assert "Dockerfile" in names
+    assert "requirements.txt" in names
+    assert "src/main.py" in names
+    assert handler == b"unittest"
+
+
+def test_template_ignores_bytecode(tmp_path, monkeypatch):
+    from src.container import context
+
+    template = tmp_path / "python"
+    (template / "src" / "__pycache__").mkdir(parents=True)
+    (template / "Dockerfile").write_text("FROM python")
+    (template / "src" / "main.py").write_text("print()")
+    monkeypatch.setattr(context, "TEMPLATES_DIR", str(tmp_path))
+    before = context.build_template_archive("python")
+
+    # Bytecode from running tests or tools doesn't change the fingerprint
+    (template / "src" / "__pycache__" / "main.cpython-313.pyc").write_bytes(b"\0")
+    (template / "src" / "stray.pyc").write_bytes(b"\0")
+    after = context.build_template_archive("python")
+
+    assert after.fingerprint == before.fingerprint
+    assert [path for path, _, _ in after.signature] == [
+        str(template / "Dockerfile"),
+        str(template / "src" / "main.py"),
+    ]
+
+
+def test_template_archive_cache_reuses_archive(monkeypatch):
+    from src.container import context
+
+    builds = []
+
+    def build_template_archive(language):
+        builds.append(language)
+        return context.TemplateArchive(language, (), "fingerprint", b"")
+
+    monkeypatch.setattr(context, "build_template_archive", build_template_archive)
+    monkeypatch.setattr(context, "template_signature", lambda language: ())
+    archives = context.TemplateArchiveCache(check_secs=60)
+    archives.warm(["python"])
+
+    # Every context is assembled from the one archive built at warm up
+    archive = archives.get("python")
+    assert all(archives.get("python") is archive for _ in range(200))
+    assert builds == ["python"]
+
+    # Once re-checked, an unchanged tree keeps its archive
+    archives.check_secs = 0
+    assert archives.get("python") is archive
+    assert builds == ["python"]
+
+    archives.invalidate("python")
+    assert archives.get("python") is not archive
+    assert builds == ["python", "python"]
+
+
 def test_build_kaniko_pod_manifest():
+    from src.container import service
     from src.container.service import build_kaniko_pod_manifest
 
     # Setup test values
@@ -56,3 +179,329 @@ def test_build_kaniko_pod_manifest():
     # Check the build arguments have been updated
     assert build_args[1] == f"--context={build_context}"
     assert build_args[2] == f"--destination={container.registry}:{container.tag}"
+
+    # Contexts of function builds aren't shared, only warming pods label theirs
+    container.digest = "a" * 64
+    manifest = build_kaniko_pod_manifest(container, build_context)
+    assert service.CONTEXT_LABEL not in manifest["metadata"]["labels"]
+
+
+def test_build_profiles(monkeypatch):
+    from src.config import BuildProfile, config
+    from src.container.service import (
+        build_cache_warm_pod_manifest,
+        build_kaniko_pod_manifest,
+    )
+
+    monkeypatch.setattr(config, "KANIKO_CACHE_REPO", "registry.local/cache")
+    monkeypatch.setattr(
+        config,
+        "BUILD_PROFILES",
+        {
+            "default": BuildProfile(),
+            "go": BuildProfile(cache=False, snapshot_mode="time", memory_limit=None),
+        },
+    )
+    container = models.ContainerImage(language="python", tag="tag", registry="r")
+
+    # The default profile caches layers in the cache repository
+    python = build_kaniko_pod_manifest(container, "s3://unittest/c.tar.gz")
+    python = python["spec"]["containers"][0]
+    assert "--cache=true" in python["args"]
+    assert "--cache-repo=registry.local/cache" in python["args"]
+    assert "--cache-copy-layers" in python["args"]
+    assert python["resources"]["limits"] == {"cpu": "2", "memory": "4Gi"}
+
+    # Languages can override it
+    container.language = "go"
+    go = build_kaniko_pod_manifest(container, "s3://unittest/c.tar.gz")
+    go = go["spec"]["containers"][0]
+    assert not any(arg.startswith("--cache") for arg in go["args"])
+    assert "--snapshot-mode=time" in go["args"]
+    assert go["resources"]["limits"] == {"cpu": "2"}
+
+    # Cache warming builds push no image
+    warm = build_cache_warm_pod_manifest("python", "warm", "s3://unittest/c.tar.gz")
+    warm_args = warm["spec"]["containers"][0]["args"]
+    assert "--no-push" in warm_args
+    assert not any(arg.startswith("--destination") for arg in warm_args)
+
+
+def test_build_digest():
+    from src.container.service import build_digest
+
+    python_in = models.ContainerImageCreate(language="python", body="unittest")
+
+    # Same inputs map to the same image
+    assert build_digest(python_in) == build_digest(
+        models.ContainerImageCreate(language="python", body="unittest")
+    )
+
+    # Any change to the body or language produces a new image
+    assert build_digest(python_in) != build_digest(
+        models.ContainerImageCreate(language="python", body="unittest2")
+    )
+    assert build_digest(python_in) != build_digest(
+        models.ContainerImageCreate(language="go", body="unittest")
+    )
+
+
+BLOCKING_CALL_SECS = 0.2
+
+
+class _BlockingCalls:
+    """Blocking stand-in calls in progress, and the most seen at once"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.most_in_flight = 0
+
+    def call(self):
+        with self._lock:
+            self.in_flight += 1
+            self.most_in_flight = max(self.most_in_flight, self.in_flight)
+        time.sleep(BLOCKING_CALL_SECS)
+        with self._lock:
+            self.in_flight -= 1
+
+
+class _StandInWatch:
+    """Pod watch stream without events, pod status is read directly."""
+
+    def stream(self, func, *args, **kwargs):
+        time.sleep(BLOCKING_CALL_SECS)
+        return iter(())
+
+    def stop(self):
+        pass
+
+
+class _StandInDbSession:
+    """Minimal async session: no cached images, commits are no-ops."""
+
+    async def scalar(self, query):
+        return None
+
+    def add(self, instance):
+        pass
+
+    async def commit(self):
+        pass
+
+
+class _StandInCoreClient:
+    """Kaniko pod that takes a blocking round-trip and then succeeds."""
+
+    calls = _BlockingCalls()
+
+    def read_namespaced_pod_status(self, name, namespace):
+        self.calls.call()
+        return SimpleNamespace(
+            metadata=SimpleNamespace(name=name),
+            status=SimpleNamespace(
+                phase="Succeeded", conditions=None, container_statuses=None
+            ),
+        )
+
+    def list_namespaced_pod(self, namespace, **kwargs):
+        return SimpleNamespace(items=[])
+
+
+def _stand_in_cluster(monkeypatch) -> _BlockingCalls:
+    from src.container import service
+    from src.k8s import service as k8s_service
+    from src.k8s import watcher
+
+    calls = _BlockingCalls()
+    monkeypatch.setattr(_StandInCoreClient, "calls", calls)
+
+    def blocking_upload(**kwargs):
+        calls.call()
+        return "s3://unittest/unittest.tar.gz"
+
+    def blocking_create_from_dict(*args, **kwargs):
+        calls.call()
+
+    # Stand-ins for S3, the API server and the Kaniko pod, all blocking
+    monkeypatch.setattr(service, "upload_build_context", blocking_upload)
+    monkeypatch.setattr(service.utils, "create_from_dict", blocking_create_from_dict)
+    monkeypatch.setattr(k8s_service, "k8s_core_client", _StandInCoreClient)
+    monkeypatch.setattr(watcher, "k8s_core_client", _StandInCoreClient)
+    monkeypatch.setattr(watcher.watch, "Watch", _StandInWatch)
+    monkeypatch.setattr(service, "k8s_core_client", _StandInCoreClient)
+    monkeypatch.setattr(service, "delete_build_contexts", lambda *args: 1)
+    return calls
+
+
+def test_concurrent_creates_overlap(monkeypatch):
+    from src.container import service
+
+    calls = _stand_in_cluster(monkeypatch)
+
+    async def create_many(n: int):
+        await asyncio.gather(
+            *(
+                service.create(
+                    None,
+                    _StandInDbSession(),
+                    models.ContainerImageCreate(language="python", body=f"bench-{i}"),
+                )
+                for i in range(n)
+            )
+        )
+
+    asyncio.run(create_many(8))
+
+    # Blocking S3 and API server calls of different creates ran side by side,
+    # serialised on the event loop there would only ever be one at a time
+    assert calls.most_in_flight > 1
+    assert calls.in_flight == 0
+
+
+def test_create_records_metrics(monkeypatch):
+    from prometheus_client import REGISTRY
+
+    from src.container import service
+
+    _stand_in_cluster(monkeypatch)
+
+    def sample(name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    builds = sample("faas_builds_total", language="go")
+    kaniko_waits = sample("faas_pipeline_phase_seconds_count", phase="kaniko_wait")
+    kaniko_secs = sample("faas_pipeline_phase_seconds_sum", phase="kaniko_wait")
+
+    asyncio.run(
+        service.create(
+            None,
+            _StandInDbSession(),
+            models.ContainerImageCreate(language="go", body="metrics"),
+        )
+    )
+
+    assert sample("faas_builds_total", language="go") == builds + 1
+    assert sample("faas_build_failures_total", language="go") == 0
+    assert sample("faas_builds_in_flight") == 0
+    for phase in ("build_context", "builder_create", "kaniko_wait"):
+        assert sample("faas_pipeline_phase_seconds_count", phase=phase) >= 1
+    assert sample("faas_pipeline_phase_seconds_count", phase="kaniko_wait") == (
+        kaniko_waits + 1
+    )
+    assert (
+        sample("faas_pipeline_phase_seconds_sum", phase="kaniko_wait") - kaniko_secs
+        >= BLOCKING_CALL_SECS
+    )
+
+
+def test_release_build_context_skips_shared(monkeypatch):
+    from src.container import service
+
+    deleted = []
+    pods = []
+
+    class _Client:
+        def list_namespaced_pod(self, namespace, label_selector):
+            return SimpleNamespace(items=pods)
+
+    def pod(name, phase):
+        return SimpleNamespace(
+            metadata=SimpleNamespace(name=name), status=SimpleNamespace(phase=phase)
+        )
+
+    monkeypatch.setattr(service, "k8s_core_client", _Client)
+    monkeypatch.setattr(
+        service, "delete_build_contexts", lambda s3, bucket, keys: deleted.extend(keys)
+    )
+
+    # An identical build on another replica still needs the context
+    pods[:] = [pod("own", "Succeeded"), pod("other", "Running")]
+    asyncio.run(service.release_build_context("digest", "own"))
+    assert deleted == []
+
+    pods[:] = [pod("own", "Succeeded"), pod("other", "Failed")]
+    asyncio.run(service.release_build_context("digest", "own"))
+    assert deleted == [service.context_key("digest")]
+
+
+def test_identical_builds_own_their_contexts(monkeypatch):
+    from src.container import service
+
+    _stand_in_cluster(monkeypatch)
+    uploaded = []
+    deleted = []
+
+    def upload_build_context(s3_client, data, name, bucket):
+        uploaded.append(name)
+        return f"s3://{bucket}/{service.context_key(name)}"
+
+    monkeypatch.setattr(service, "upload_build_context", upload_build_context)
+    monkeypatch.setattr(
+        service, "delete_build_contexts", lambda s3, bucket, keys: deleted.extend(keys)
+    )
+
+    async def create_twice():
+        await asyncio.gather(
+            *(
+                service.create(
+                    None,
+                    _StandInDbSession(),
+                    models.ContainerImageCreate(language="python", body="same"),
+                )
+                for _ in range(2)
+            )
+        )
+
+    asyncio.run(create_twice())
+
+    # Each build uploads its own context and only deletes that one, so the
+    # first to finish can't pull the context from under the other
+    assert len(set(uploaded)) == 2
+    assert sorted(deleted) == sorted(service.context_key(tag) for tag in uploaded)
+
+
+def test_duplicate_build_deletes_its_image(monkeypatch):
+    from sqlalchemy.exc import IntegrityError
+
+    from src.container import service
+
+    _stand_in_cluster(monkeypatch)
+    winner = models.ContainerImage(tag="python-winner", ref_count=1)
+
+    class _RacingDbSession(_StandInDbSession):
+        """A concurrent build with the same digest commits its row first"""
+
+        def __init__(self):
+            self.committed = False
+
+        async def scalar(self, query):
+            return winner if self.committed else None
+
+        async def commit(self):
+            if not self.committed:
+                self.committed = True
+                raise IntegrityError("INSERT", {}, Exception("duplicate digest"))
+
+        async def rollback(self):
+            pass
+
+    deleted = []
+
+    async def delete_container_image(project, repository, tag):
+        deleted.append(tag)
+
+    monkeypatch.setattr(service, "delete_container_image", delete_container_image)
+
+    container = asyncio.run(
+        service.create(
+            None,
+            _RacingDbSession(),
+            models.ContainerImageCreate(language="python", body="duplicate"),
+        )
+    )
+
+    # The winner's image is reused and the loser's pushed image deleted
+    assert container is winner and winner.ref_count == 2
+    assert len(deleted) == 1 and deleted[0].startswith("python-")
+    assert deleted[0] != winner.tag
@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+from src.container.registry.exceptions import ContainerRegistryError
+from src.container.registry.registry import ContainerRegistry
+
+
+class _Response:
+    def __init__(self, status: int):
+        self.status = status
+
+    async def text(self):
+        return "error"
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+
+class _StandInSession:
+    """Answers deletes with the given statuses in turn, then with 200"""
+
+    def __init__(self, statuses: list[int] = ()):
+        self.statuses = list(statuses)
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def delete(self, url):
+        self.calls += 1
+        status = self.statuses.pop(0) if self.statuses else 200
+        session = self
+
+        class _Tracked(_Response):
+            async def __aenter__(self):
+                session.in_flight += 1
+                session.max_in_flight = max(session.max_in_flight, session.in_flight)
+                await asyncio.sleep(0.01)
+                return self
+
+            async def __aexit__(self, *args):
+                session.in_flight -= 1
+
+        return _Tracked(status)
+
+
+def _registry(monkeypatch, session: _StandInSession) -> ContainerRegistry:
+    monkeypatch.setattr("src.retry.backoff_delay", lambda *args: 0)
+    registry = ContainerRegistry("https://registry", "user", "password", attempts=3)
+    monkeypatch.setattr(registry, "_get_session", lambda: session)
+    return registry
+
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_delete_retries_throttled_and_failed(monkeypatch, status):
+    session = _StandInSession([status, status])
+    registry = _registry(monkeypatch, session)
+
+    assert asyncio.run(registry.delete_image("library", "functions", "tag"))
+    assert session.calls == 3
+
+
+def test_delete_gives_up_after_attempts(monkeypatch):
+    session = _StandInSession([500, 500, 500])
+    registry = _registry(monkeypatch, session)
+
+    with pytest.raises(ContainerRegistryError) as e:
+        asyncio.run(registry.delete_image("library", "functions", "tag"))
+    assert e.value.status == 500
+    assert session.calls == 3
+
+
+def test_delete_does_not_retry_client_errors(monkeypatch):
+    session = _StandInSession([403])
+    registry = _registry(monkeypatch, session)
+
+    with pytest.raises(ContainerRegistryError):
+        asyncio.run(registry.delete_image("library", "functions", "tag"))
+    assert session.calls == 1
+
+
+def test_delete_images_bounded(monkeypatch):
+    session = _StandInSession([404, 403])
+    registry = _registry(monkeypatch, session)
+    tags = [f"tag{i}" for i in range(10)]
+
+    results = asyncio.run(
+        registry.delete_images("library", "functions", tags, concurrency=3)
+    )
+
+    assert results["tag0"] is False
+    assert isinstance(results["tag1"], ContainerRegistryError)
+    assert all(results[tag] is True for tag in tags[2:])
+    assert session.max_in_flight == 3
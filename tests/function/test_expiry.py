@@ -0,0 +1,70 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from src.function.expiry import ExpiryTimer
+
+
+def test_pop_due():
+    timer = ExpiryTimer()
+    now = datetime.now(timezone.utc)
+
+    timer.schedule("late", now + timedelta(seconds=60))
+    timer.schedule("early", now - timedelta(seconds=5))
+    timer.schedule("cancelled", now - timedelta(seconds=10))
+    timer.schedule("moved", now - timedelta(seconds=1))
+    timer.cancel("cancelled")
+    timer.schedule("moved", now + timedelta(seconds=30))
+
+    assert timer.pop_due(now) == ["early"]
+    assert timer.next_deadline() == now + timedelta(seconds=30)
+    assert len(timer) == 2
+
+
+def test_timer_fires_at_deadline():
+    async def run():
+        timer = ExpiryTimer()
+        fired = asyncio.Event()
+
+        async def on_expired():
+            fired.set()
+            return True
+
+        timer.start(on_expired)
+        timer.schedule("unittest", datetime.now(timezone.utc) + timedelta(hours=1))
+        # An earlier deadline re-arms the sleeping timer
+        timer.schedule("soon", datetime.now(timezone.utc) + timedelta(milliseconds=50))
+        await asyncio.wait_for(fired.wait(), 1)
+        await timer.stop()
+        return len(timer)
+
+    assert asyncio.run(run()) == 1
+
+
+def test_timer_retries_skipped_runs(monkeypatch):
+    from src.function import expiry
+
+    monkeypatch.setattr(expiry, "RETRY_SECS", 0.05)
+
+    async def run():
+        timer = ExpiryTimer()
+        results = [None, "reaped"]
+        calls = []
+        done = asyncio.Event()
+
+        async def on_expired():
+            calls.append(len(timer))
+            if len(calls) == len(results):
+                done.set()
+            return results[len(calls) - 1]
+
+        timer.start(on_expired)
+        timer.schedule("due", datetime.now(timezone.utc))
+        await asyncio.wait_for(done.wait(), 1)
+        await asyncio.sleep(0.1)
+        await timer.stop()
+        return calls, len(timer)
+
+    # Skipped while another replica held the lock, then run again shortly after
+    calls, remaining = asyncio.run(run())
+    assert calls == [0, 0]
+    assert remaining == 0
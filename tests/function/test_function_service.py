@@ -0,0 +1,143 @@
+from src.container import models
+from src.function import models as function_models  # noqa: F401 registers Function mapper
+
+
+def test_build_kn_service_manifest():
+    from src.function.service import build_kn_service_manifest
+
+    # Setup test values
+    container = models.ContainerImage(
+        language="python", tag="kaniko-unittest-tag", registry="docker.io"
+    )
+
+    # Call function to test
+    manifest = build_kn_service_manifest("function-unittest-id", container)
+
+    # Check the service is named after the function and runs its image
+    assert manifest["metadata"]["name"] == "function-unittest-id"
+    container_spec = manifest["spec"]["template"]["spec"]["containers"][0]
+    assert container_spec["image"] == f"{container.registry}:{container.tag}"
+    # Labelled as ours, so the reconciler may delete it once orphaned
+    labels = manifest["metadata"]["labels"]
+    assert labels["app.kubernetes.io/managed-by"] == "faas-platform"
+
+
+def test_build_runtime_manifests():
+    from src.function.service import (
+        build_handler_config_map_manifest,
+        build_runtime_service_manifest,
+    )
+
+    body = "def handler(event, ctx):\n    return 'REPLACE_ME'\n"
+
+    config_map = build_handler_config_map_manifest(
+        "function-unittest-id", "python", body
+    )
+    service = build_runtime_service_manifest(
+        "function-unittest-id", "docker.io/runtime"
+    )
+
+    # The handler source is delivered verbatim under the runtime's module name
+    assert config_map["metadata"]["name"] == "function-unittest-id"
+    assert config_map["data"] == {"handler.py": body}
+
+    # The service mounts it from the ConfigMap into the prebuilt image
+    spec = service["spec"]["template"]["spec"]
+    assert spec["containers"][0]["image"] == "docker.io/runtime"
+    assert spec["volumes"][0]["configMap"]["name"] == "function-unittest-id"
+    labels = service["metadata"]["labels"]
+    assert labels["app.kubernetes.io/managed-by"] == "faas-platform"
+
+
+def test_scaling_manifest():
+    from src.function.models import FunctionScaling
+    from src.function.service import build_runtime_service_manifest
+
+    scaling = FunctionScaling(
+        min_scale=1,
+        max_scale=5,
+        target_concurrency=20,
+        container_concurrency=50,
+        scale_down_delay=300,
+        cpu_request="250m",
+        memory_limit="512Mi",
+    )
+    service = build_runtime_service_manifest("function-unittest-id", "img", scaling)
+    template = service["spec"]["template"]
+
+    assert template["metadata"]["annotations"] == {
+        "autoscaling.knative.dev/min-scale": "1",
+        "autoscaling.knative.dev/max-scale": "5",
+        "autoscaling.knative.dev/target": "20",
+        "autoscaling.knative.dev/scale-down-delay": "300s",
+    }
+    assert template["spec"]["containerConcurrency"] == 50
+    assert template["spec"]["containers"][0]["resources"] == {
+        "requests": {"cpu": "250m"},
+        "limits": {"memory": "512Mi"},
+    }
+
+    # Unset values keep the Knative defaults
+    plain = build_runtime_service_manifest("function-unittest-id", "img")
+    assert "metadata" not in plain["spec"]["template"]
+
+
+def test_scaling_limits():
+    import pytest
+    from pydantic import ValidationError
+
+    from src.config import config
+    from src.function.models import FunctionScaling
+
+    for invalid in (
+        {"max_scale": config.FUNCTION_MAX_SCALE_LIMIT + 1},
+        {"min_scale": 3, "max_scale": 2},
+        {"cpu_request": "lots"},
+        {"memory_limit": "64Gi"},
+        {"cpu_request": "2", "cpu_limit": "500m"},
+    ):
+        with pytest.raises(ValidationError):
+            FunctionScaling(**invalid)
+
+
+def test_get_metadata_cached():
+    import asyncio
+    from datetime import datetime, timezone
+    from types import SimpleNamespace
+
+    from src.function.cache import function_cache
+    from src.function.service import get_metadata
+
+    now = datetime.now(timezone.utc)
+    rows = {
+        "function-unittest-id": {
+            "id": "function-unittest-id",
+            "url": "http://function.example",
+            "container_image_tag": None,
+            "expire_at": now,
+            "created_at": now,
+        }
+    }
+
+    class _StandInSession:
+        queries = 0
+
+        async def execute(self, query):
+            self.queries += 1
+            row = rows.get(query.whereclause.right.value)
+            found = [SimpleNamespace(_mapping=row)] if row else []
+            return SimpleNamespace(first=lambda: found[0] if found else None)
+
+    session = _StandInSession()
+    try:
+        for _ in range(3):
+            metadata = asyncio.run(get_metadata(session, "function-unittest-id"))
+            assert metadata.url == "http://function.example"
+        # Missing functions aren't cached, they may be created any moment
+        assert asyncio.run(get_metadata(session, "unknown")) is None
+        assert asyncio.run(get_metadata(session, "unknown")) is None
+    finally:
+        function_cache.invalidate("function-unittest-id")
+
+    # One query for the cached function, one per miss
+    assert session.queries == 3
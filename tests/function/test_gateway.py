@@ -0,0 +1,147 @@
+import asyncio
+import threading
+import time
+from datetime import datetime, timezone
+from contextlib import asynccontextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from aiohttp import ClientSession as AsyncHttpSession
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from src.function.cache import FunctionMetadata, TTLCache, function_cache
+from src.function.gateway import invoke
+
+
+class _EchoHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.send_response(201)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("X-Query", self.path)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _SlowHandler(BaseHTTPRequestHandler):
+    """Sends the first half of its body and stalls"""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.send_response(200)
+        self.send_header("Content-Length", "10")
+        self.end_headers()
+        self.wfile.write(b"12345")
+        self.wfile.flush()
+        time.sleep(5)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_cache_expiry_and_eviction():
+    cache = TTLCache(ttl_secs=0.05, max_entries=2)
+    cache.put("a", "http://a")
+    cache.put("b", "http://b")
+    assert cache.get("a") == "http://a"
+
+    # "b" is least recently used
+    cache.put("c", "http://c")
+    assert cache.get("b") is None
+
+    time.sleep(0.06)
+    assert cache.get("a") is None
+
+
+def test_invoke_forwards_request_and_response():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _EchoHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    now = datetime.now(timezone.utc)
+    function_cache.put(
+        "function-unittest-id",
+        FunctionMetadata(
+            "function-unittest-id",
+            f"http://127.0.0.1:{server.server_port}",
+            None,
+            now,
+            now,
+        ),
+    )
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        app.state.http_session = AsyncHttpSession()
+        yield
+        await app.state.http_session.close()
+
+    app = FastAPI(lifespan=lifespan)
+
+    @app.post("/{function_id}/invoke")
+    async def route(function_id: str, request: Request):
+        return await invoke(request.app.state.http_session, function_id, request)
+
+    def invocations() -> float:
+        labels = {"method": "POST", "status": "201"}
+        return REGISTRY.get_sample_value("faas_function_invoke_seconds_count", labels)
+
+    try:
+        with TestClient(app) as client:
+            before = invocations() or 0
+            response = client.post(
+                "/function-unittest-id/invoke?x=1&x=2&y=3", content=b"payload"
+            )
+    finally:
+        server.shutdown()
+        function_cache.invalidate("function-unittest-id")
+
+    assert response.status_code == 201
+    assert response.content == b"payload"
+    assert response.headers["x-query"] == "/?x=1&x=2&y=3"
+    assert invocations() == before + 1
+
+
+def test_invoke_releases_unstreamed_response():
+    from aiohttp import TCPConnector
+    from starlette.requests import Request as StarletteRequest
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _SlowHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    now = datetime.now(timezone.utc)
+    url = f"http://127.0.0.1:{server.server_port}"
+    function_cache.put(
+        "function-unittest-id",
+        FunctionMetadata("function-unittest-id", url, None, now, now),
+    )
+
+    def request() -> StarletteRequest:
+        async def receive():
+            return {"type": "http.request", "body": b"payload", "more_body": False}
+
+        scope = {
+            "type": "http",
+            "method": "POST",
+            "path": "/",
+            "query_string": b"",
+            "headers": [(b"content-length", b"7")],
+        }
+        return StarletteRequest(scope, receive)
+
+    async def run():
+        # A single pooled connection, held until a response is released
+        async with AsyncHttpSession(connector=TCPConnector(limit=1)) as session:
+            for _ in range(2):
+                response = await asyncio.wait_for(
+                    invoke(session, "function-unittest-id", request()), 2
+                )
+                # The client disconnected before the body was streamed
+                await response.background()
+
+    try:
+        asyncio.run(run())
+    finally:
+        server.shutdown()
+        function_cache.invalidate("function-unittest-id")
@@ -0,0 +1,64 @@
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+from aiohttp import ClientConnectionError
+
+from src.function.enums import HealthStatus
+from src.function.health import probe_many, readiness
+
+
+class _StandInHttpSession:
+    """Answers health probes by host and records the probes in flight"""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @asynccontextmanager
+    async def get(self, url, timeout):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            if "down" in url:
+                raise ClientConnectionError("connection refused")
+            if "slow" in url:
+                raise asyncio.TimeoutError()
+            yield SimpleNamespace(status=503 if "sick" in url else 200)
+        finally:
+            self.in_flight -= 1
+
+
+def test_probe_many_bounded():
+    session = _StandInHttpSession()
+    urls = {f"fn-{i}": f"http://ok-{i}" for i in range(20)}
+    urls.update(down="http://down", slow="http://slow", sick="http://sick")
+
+    results = asyncio.run(probe_many(session, urls, concurrency=4))
+
+    assert session.max_in_flight == 4
+    assert results["fn-0"].status == HealthStatus.healthy
+    assert results["down"].status == HealthStatus.unreachable
+    assert results["slow"].status == HealthStatus.timeout
+    assert (results["sick"].status, results["sick"].http_status) == (
+        HealthStatus.unhealthy,
+        503,
+    )
+
+
+def test_knative_readiness():
+    ready = {"status": {"conditions": [{"type": "Ready", "status": "True"}]}}
+    failed = {
+        "status": {
+            "conditions": [{"type": "Ready", "status": "False", "message": "boom"}]
+        }
+    }
+
+    assert readiness(None, None).status == HealthStatus.not_found
+    assert readiness(failed, None).detail == "boom"
+    assert readiness(ready, {"status": {"actualReplicas": 2}}).status == "healthy"
+    assert (
+        readiness(ready, {"status": {"actualReplicas": 0}}).status
+        == HealthStatus.scaled_to_zero
+    )
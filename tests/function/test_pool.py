@@ -0,0 +1,150 @@
+import asyncio
+
+from kubernetes.client.exceptions import ApiException
+
+from src.function import models as function_models
+
+
+def _instance(name: str, ready: bool) -> dict:
+    return {
+        "metadata": {"name": name, "resourceVersion": "1"},
+        "status": {
+            "url": f"http://{name}.example",
+            "conditions": [{"type": "Ready", "status": str(ready)}],
+        },
+    }
+
+
+class _StandInCustomObjects:
+    """Idle instances of which `taken` were already claimed by another replica"""
+
+    def __init__(self, items: list, taken: set):
+        self.items = items
+        self.taken = taken
+        self.claimed = []
+
+    def list_namespaced_custom_object(self, **kwargs):
+        return {"items": list(self.items)}
+
+    def patch_namespaced_custom_object(self, name, body, **kwargs):
+        if name in self.taken:
+            raise ApiException(status=409)
+        self.claimed.append(name)
+
+
+def test_claim_skips_taken_and_unready_instances(monkeypatch):
+    from prometheus_client import REGISTRY
+
+    from src.function import pool
+
+    custom_client = _StandInCustomObjects(
+        [_instance("a", True), _instance("b", False), _instance("c", True)],
+        taken={"a"},
+    )
+    monkeypatch.setattr(pool.client, "CustomObjectsApi", lambda _: custom_client)
+
+    injected = []
+
+    async def inject(self, k8s_api_client, http_session, service, body, scaling):
+        injected.append((service["metadata"]["name"], body))
+
+    async def record(db_session, function_id, url):
+        return function_models.Function(id=function_id, url=url)
+
+    monkeypatch.setattr(pool.WarmPool, "_inject", inject)
+    monkeypatch.setattr(pool, "record", record)
+
+    warm_pool = pool.WarmPool("python")
+    function = asyncio.run(warm_pool.claim(None, None, None, "body"))
+
+    # The unready instance is never tried, the conflicting one is skipped
+    assert function.id == "c" and function.url == "http://c.example"
+    assert custom_client.claimed == ["c"]
+    assert injected == [("c", "body")]
+    assert (warm_pool.hits, warm_pool.misses) == (1, 0)
+
+    # An exhausted pool is a miss and leaves the caller to deploy normally
+    custom_client.taken.add("c")
+    assert asyncio.run(warm_pool.claim(None, None, None, "body")) is None
+    assert (warm_pool.hits, warm_pool.misses) == (1, 1)
+    for outcome in ("hit", "miss"):
+        labels = {"language": "python", "outcome": outcome}
+        assert REGISTRY.get_sample_value("faas_warm_pool_claims_total", labels) >= 1
+
+
+def test_refill_creates_missing_instances_concurrently(monkeypatch):
+    from prometheus_client import REGISTRY
+
+    from src.function import pool
+
+    custom_client = _StandInCustomObjects(
+        [_instance("a", True), _instance("b", False)], taken=set()
+    )
+    monkeypatch.setattr(pool.client, "CustomObjectsApi", lambda _: custom_client)
+    in_flight = []
+    most_in_flight = []
+
+    async def create_instance(self, k8s_api_client):
+        in_flight.append(1)
+        most_in_flight.append(len(in_flight))
+        # Waits for the instance to become Ready
+        await asyncio.sleep(0.01)
+        in_flight.pop()
+
+    monkeypatch.setattr(pool.WarmPool, "_create_instance", create_instance)
+
+    asyncio.run(pool.WarmPool("go").refill(None, 5))
+
+    assert len(most_in_flight) == 3 and max(most_in_flight) == 3
+
+    def instances(state):
+        labels = {"language": "go", "state": state}
+        return REGISTRY.get_sample_value("faas_warm_pool_instances", labels)
+
+    assert (instances("ready"), instances("warming")) == (1, 1)
+
+
+def test_claim_falls_back_when_inject_and_cleanup_fail(monkeypatch):
+    from src.function import pool
+
+    custom_client = _StandInCustomObjects([_instance("a", True)], taken=set())
+    monkeypatch.setattr(pool.client, "CustomObjectsApi", lambda _: custom_client)
+
+    async def inject(self, *args):
+        raise RuntimeError("handler load failed")
+
+    async def delete_knative_service(custom_client, name):
+        raise ApiException(status=500)
+
+    monkeypatch.setattr(pool.WarmPool, "_inject", inject)
+    monkeypatch.setattr(pool, "delete_knative_service", delete_knative_service)
+
+    warm_pool = pool.WarmPool("python")
+
+    # A miss, so the caller deploys normally
+    assert asyncio.run(warm_pool.claim(None, None, None, "body")) is None
+    assert (warm_pool.hits, warm_pool.misses) == (0, 1)
+
+
+def test_pool_instances_keep_ownership_label(monkeypatch):
+    from src.function import pool
+    from src.function.service import apply_patches
+
+    applied = []
+
+    async def apply_runtime_service(k8s_api_client, function_id, *args, patches):
+        manifest = pool.build_runtime_service_manifest(function_id, "runtime")
+        applied.append(apply_patches(manifest, patches))
+
+    monkeypatch.setattr(pool, "runtime_image", lambda language: "runtime")
+    monkeypatch.setattr(pool, "apply_runtime_service", apply_runtime_service)
+
+    asyncio.run(pool.WarmPool("python")._create_instance(None))
+
+    # The pool labels are added to the ownership label, not in place of it
+    labels = applied[0]["metadata"]["labels"]
+    assert labels == {
+        "app.kubernetes.io/managed-by": "faas-platform",
+        pool.POOL_LABEL: "python",
+        pool.STATE_LABEL: "idle",
+    }
@@ -0,0 +1,144 @@
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from kubernetes.client.exceptions import ApiException
+from sqlalchemy.sql import Delete
+
+NOW = datetime.now(timezone.utc)
+
+
+def _bound_list(query) -> list:
+    """Values of the IN / NOT IN list of a statement, if any"""
+    params = query.compile().params.values()
+    return next((value for value in params if isinstance(value, list)), [])
+
+
+class _StandInSession:
+    """Serves the expired rows of a stand-in database, ignoring row locks."""
+
+    def __init__(self, db: "_StandInDb"):
+        self.db = db
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def execute(self, query):
+        if isinstance(query, Delete):
+            ids = _bound_list(query)
+            self.db.rows = [row for row in self.db.rows if row.id not in ids]
+            return None
+        excluded = _bound_list(query)
+        page = [row for row in self.db.rows if row.id not in excluded][: query._limit]
+        self.db.pages.append([row.id for row in page])
+        return SimpleNamespace(all=lambda: page)
+
+    async def commit(self):
+        pass
+
+
+class _StandInDb:
+    def __init__(self, rows: list):
+        self.rows = rows
+        self.pages = []
+        self.ref_counts = Counter()
+
+    def session(self) -> _StandInSession:
+        return _StandInSession(self)
+
+    async def release_many(self, db_session, counts: dict[str, int]) -> int:
+        self.ref_counts.subtract(counts)
+        return sum(1 for tag in counts if self.ref_counts[tag] <= 0)
+
+
+def _row(id: str, tag: str | None, expired_secs: int):
+    return SimpleNamespace(
+        id=id,
+        container_image_tag=tag,
+        expire_at=NOW - timedelta(seconds=expired_secs),
+    )
+
+
+def _stand_in(monkeypatch, failures: dict[str, list[int]]) -> tuple:
+    """Reaper against a stand-in database and Knative API.
+
+    `failures` holds the statuses each function's deletes fail with in turn.
+    """
+    from src.function import reaper
+
+    db = _StandInDb(
+        [
+            _row("f1", "img-a", 50),
+            _row("f2", "img-a", 40),
+            _row("f3", "img-b", 30),
+            _row("f4", "img-c", 20),
+            _row("f5", None, 10),
+        ]
+    )
+    db.ref_counts.update({"img-a": 2, "img-b": 1, "img-c": 2})
+    calls = Counter()
+
+    async def delete_knative_service(k8s_client, name):
+        calls[name] += 1
+        if failures.get(name):
+            raise ApiException(status=failures[name].pop(0))
+
+    monkeypatch.setattr(reaper, "async_session_factory", db.session)
+    monkeypatch.setattr(reaper, "delete_knative_service", delete_knative_service)
+    monkeypatch.setattr(reaper.container_service, "release_many", db.release_many)
+    monkeypatch.setattr(reaper.config, "REAPER_ATTEMPTS", 3)
+    monkeypatch.setattr("src.retry.backoff_delay", lambda *args: 0)
+    return reaper, db, calls
+
+
+def test_reap_expired(monkeypatch):
+    failures = {
+        # Throttled once, then deleted on retry
+        "f2": [503],
+        # Fails every attempt
+        "f3": [500, 500, 500],
+        # Already gone counts as deleted
+        "f4": [404],
+        # Forbidden isn't retried
+        "f5": [403],
+    }
+    reaper, db, calls = _stand_in(monkeypatch, failures)
+
+    result = asyncio.run(reaper.reap_expired(None, NOW, page_size=2, concurrency=2))
+
+    # Failed functions are skipped by later pages rather than selected again
+    assert db.pages == [["f1", "f2"], ["f3", "f4"], ["f5"], []]
+    assert calls == {"f1": 1, "f2": 2, "f3": 3, "f4": 1, "f5": 1}
+    assert [row.id for row in db.rows] == ["f3", "f5"]
+    assert (result.selected, result.deleted, result.failed) == (5, 3, 2)
+    assert result.failed_ids == ["f3", "f5"]
+    assert result.pages == 3
+    # img-a lost both references, img-c still has one
+    assert result.images_deleted == 1
+    assert result.max_lag_secs >= 50
+
+
+def test_reap_expired_next_run_retries_failures(monkeypatch):
+    reaper, db, calls = _stand_in(monkeypatch, {"f3": [500, 500, 500]})
+
+    first = asyncio.run(reaper.reap_expired(None, NOW))
+    second = asyncio.run(reaper.reap_expired(None, NOW))
+
+    assert first.failed_ids == ["f3"]
+    assert (second.selected, second.deleted, second.failed) == (1, 1, 0)
+    assert second.images_deleted == 1
+    assert db.rows == []
+
+
+def test_reap_expired_lag_includes_failures(monkeypatch):
+    reaper, db, _ = _stand_in(monkeypatch, {"f1": [403]})
+
+    result = asyncio.run(reaper.reap_expired(None, NOW))
+
+    # The most overdue function failed, its lag is still reported
+    assert result.failed_ids == ["f1"]
+    assert result.max_lag_secs >= 50
@@ -0,0 +1,49 @@
+import asyncio
+import shutil
+
+import pytest
+
+from src.function.exceptions import HandlerValidationError
+from src.function.validation import validate_handler
+
+
+def _rejected(language: str, body: str) -> HandlerValidationError:
+    with pytest.raises(HandlerValidationError) as e:
+        asyncio.run(validate_handler(language, body))
+    return e.value
+
+
+def test_python_handlers():
+    asyncio.run(validate_handler("python", "def handler(event, ctx):\n    return 1\n"))
+    asyncio.run(validate_handler("python", "from lib import handler\n"))
+
+    # Syntax errors are reported with their line
+    error = _rejected("python", "def handler(event, ctx):\n    return (\n")
+    assert "Syntax error" in str(error) and error.line is not None
+
+    # The runtime calls handler(event, ctx) synchronously
+    assert "No top-level" in str(_rejected("python", "def main(event, ctx): ..."))
+    assert "async" in str(_rejected("python", "async def handler(event, ctx): ..."))
+    assert "(event, ctx)" in str(_rejected("python", "def handler(event): ..."))
+
+
+def test_handler_limits():
+    assert "Unsupported" in str(_rejected("cobol", "def handler(e, c): ..."))
+    assert "limit" in str(_rejected("python", "#" * (1024 * 1024)))
+
+
+def test_go_handlers():
+    body = (
+        "package main\n\n"
+        "func Handle(event Event, ctx Context) (Result, error) {\n"
+        "\treturn Result{StatusCode: 200}, nil\n"
+        "}\n"
+    )
+    asyncio.run(validate_handler("go", body))
+
+    assert "package main" in str(_rejected("go", body.replace("main", "lib", 1)))
+    assert "func Handle" in str(_rejected("go", body.replace("Handle", "Run")))
+
+    if shutil.which("gofmt"):
+        error = _rejected("go", body.replace("nil\n", "nil\n{\n"))
+        assert "Syntax error" in str(error) and error.line is not None
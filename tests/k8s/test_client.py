@@ -0,0 +1,67 @@
+import socket
+
+from kubernetes.config import kube_config
+
+from src.k8s import client
+
+KUBECONFIG = """
+apiVersion: v1
+kind: Config
+clusters:
+- cluster: {server: "https://127.0.0.1:6443"}
+  name: unittest
+contexts:
+- context: {cluster: unittest, user: unittest}
+  name: unittest
+current-context: unittest
+users:
+- name: unittest
+  user: {token: unittest}
+"""
+
+
+def test_shared_api_client(tmp_path, monkeypatch):
+    kubeconfig = tmp_path / "config"
+    kubeconfig.write_text(KUBECONFIG)
+    monkeypatch.setattr(client.config, "IN_CLUSTER", False)
+    monkeypatch.setattr(kube_config, "KUBE_CONFIG_DEFAULT_LOCATION", str(kubeconfig))
+    client.close_api_client()
+
+    api_client = client.get_api_client()
+    try:
+        # One client per process, configured with pooling and keep-alive
+        assert client.get_api_client() is api_client
+        configuration = api_client.configuration
+        assert configuration.host == "https://127.0.0.1:6443"
+        assert configuration.connection_pool_maxsize == client.config.K8S_POOL_MAXSIZE
+        # Connections the pool opens to the API server use TCP keep-alive
+        pool = api_client.rest_client.pool_manager.connection_from_url(
+            configuration.host
+        )
+        assert pool.pool.maxsize == client.config.K8S_POOL_MAXSIZE
+        assert (
+            socket.SOL_SOCKET,
+            socket.SO_KEEPALIVE,
+            1,
+        ) in pool.conn_kw["socket_options"]
+    finally:
+        client.close_api_client()
+
+
+def test_default_request_timeout(monkeypatch):
+    captured = {}
+
+    def request(self, method, url, **kwargs):
+        captured["timeout"] = kwargs["_request_timeout"]
+
+    monkeypatch.setattr(client.client.ApiClient, "request", request)
+    api_client = client.PooledApiClient(
+        client.client.Configuration(), request_timeout=(1, 2)
+    )
+
+    api_client.request("GET", "https://unittest")
+    assert captured["timeout"] == (1, 2)
+
+    # Explicit timeouts, e.g. for watches, take precedence
+    api_client.request("GET", "https://unittest", _request_timeout=(1, 70))
+    assert captured["timeout"] == (1, 70)
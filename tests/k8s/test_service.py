@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from src.k8s import service
+from src.k8s.exceptions import KnativeServiceFailedError, KnativeServiceTimeoutError
+
+_real_sleep = asyncio.sleep
+
+
+async def _no_sleep(delay):
+    await _real_sleep(0)
+
+
+def make_service(ready_status=None, reason=None, generation=1, observed=1):
+    conditions = []
+    if ready_status:
+        conditions.append(
+            {
+                "type": "Ready",
+                "status": ready_status,
+                "reason": reason,
+                "message": "unittest",
+            }
+        )
+    return {
+        "metadata": {"name": "unittest", "generation": generation},
+        "status": {
+            "observedGeneration": observed,
+            "url": "http://unittest.functions.example.com",
+            "conditions": conditions,
+        },
+    }
+
+
+class _StandInCustomObjectsClient:
+    """Returns the given service states in order, repeating the last one."""
+
+    def __init__(self, states):
+        self.states = list(states)
+
+    def get_namespaced_custom_object(self, **kwargs):
+        if len(self.states) > 1:
+            return self.states.pop(0)
+        return self.states[0]
+
+
+def test_wait_for_knative_ready(monkeypatch):
+    states = [
+        make_service(),
+        # Stale Ready condition from the previous generation is ignored
+        make_service("True", generation=2, observed=1),
+        make_service("Unknown", "RevisionMissing", generation=2, observed=2),
+        make_service("True", generation=2, observed=2),
+    ]
+    client = _StandInCustomObjectsClient(states)
+    monkeypatch.setattr(service, "k8s_custom_objects_client", lambda: client)
+    monkeypatch.setattr(asyncio, "sleep", _no_sleep)
+
+    ready = asyncio.run(service.wait_for_knative_ready("unittest", "unittest", 10))
+    assert ready["metadata"]["generation"] == 2
+    assert client.states == [states[-1]]
+
+
+def test_wait_for_knative_ready_fails_fast(monkeypatch):
+    client = _StandInCustomObjectsClient([make_service("False", "RevisionFailed")])
+    monkeypatch.setattr(service, "k8s_custom_objects_client", lambda: client)
+
+    with pytest.raises(KnativeServiceFailedError, match="RevisionFailed"):
+        asyncio.run(service.wait_for_knative_ready("unittest", "unittest", 10))
+
+
+def test_wait_for_knative_ready_timeout(monkeypatch):
+    client = _StandInCustomObjectsClient([make_service("Unknown", "Deploying")])
+    monkeypatch.setattr(service, "k8s_custom_objects_client", lambda: client)
+
+    with pytest.raises(KnativeServiceTimeoutError, match="Deploying"):
+        asyncio.run(service.wait_for_knative_ready("unittest", "unittest", 0.1))
@@ -0,0 +1,70 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from src.k8s import watcher
+
+
+def make_pod(name="unittest", phase="Pending", reason=None, waiting_reason=None):
+    container_statuses = None
+    if waiting_reason:
+        waiting = SimpleNamespace(reason=waiting_reason, message="unittest")
+        container_statuses = [SimpleNamespace(state=SimpleNamespace(waiting=waiting))]
+    return SimpleNamespace(
+        metadata=SimpleNamespace(name=name),
+        status=SimpleNamespace(
+            phase=phase, reason=reason, container_statuses=container_statuses
+        ),
+    )
+
+
+class _StandInWatch:
+    """Watch stream with no events, the tests dispatch pods directly."""
+
+    def stream(self, func, *args, **kwargs):
+        time.sleep(0.01)
+        return iter(())
+
+    def stop(self):
+        pass
+
+
+def test_terminal_state():
+    assert watcher.terminal_state(make_pod(phase="Pending")) is None
+    assert watcher.terminal_state(make_pod(phase="Running")) is None
+    assert watcher.terminal_state(make_pod(phase="Succeeded")) == (True, "Succeeded")
+    assert watcher.terminal_state(make_pod(phase="Failed", reason="Evicted")) == (
+        False,
+        "Evicted",
+    )
+
+    # Unrecoverable waiting reasons fail without waiting for the pod phase
+    succeeded, reason = watcher.terminal_state(
+        make_pod(waiting_reason="ImagePullBackOff")
+    )
+    assert not succeeded
+    assert reason.startswith("ImagePullBackOff")
+
+    # Transient waiting reasons keep waiting
+    assert watcher.terminal_state(make_pod(waiting_reason="ContainerCreating")) is None
+
+
+def test_dispatch_resolves_waiters(monkeypatch):
+    monkeypatch.setattr(watcher.watch, "Watch", _StandInWatch)
+    monkeypatch.setattr(watcher, "k8s_core_client", lambda: None)
+    pod_watcher = watcher.PodPhaseWatcher("unittest")
+
+    async def wait():
+        first = pod_watcher.register("unittest")
+        second = pod_watcher.register("unittest")
+        other = pod_watcher.register("other")
+
+        pod_watcher.dispatch(make_pod(phase="Running"))
+        pod_watcher.dispatch(make_pod(phase="Failed", reason="Error"))
+
+        results = await asyncio.wait_for(asyncio.gather(first, second), 1)
+        assert not other.done()
+        pod_watcher.unregister("other", other)
+        return results
+
+    assert asyncio.run(wait()) == [(False, "Error"), (False, "Error")]
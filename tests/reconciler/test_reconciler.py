@@ -0,0 +1,228 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from kubernetes.client.exceptions import ApiException
+
+from src.function import models as function_models  # noqa: F401 registers Function mapper
+
+NOW = datetime.now(timezone.utc)
+OLD = (NOW - timedelta(hours=2)).strftime("%Y-%m-%dT%H:%M:%SZ")
+RECENT = (NOW - timedelta(minutes=1)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _service(name: str, created: str, modified: str | None = None) -> dict:
+    metadata = {"name": name, "creationTimestamp": created}
+    if modified:
+        metadata["managedFields"] = [{"manager": "faas", "time": modified}]
+    return {"metadata": metadata}
+
+
+class _StandInCustomObjects:
+    """Knative services served in pages of two"""
+
+    def __init__(self, items: list):
+        self.items = items
+        self.deleted = []
+        self.selectors = set()
+
+    def list_namespaced_custom_object(self, limit, _continue, label_selector, **kwargs):
+        self.selectors.add(label_selector)
+        start = int(_continue or 0)
+        end = start + limit
+        token = str(end) if end < len(self.items) else None
+        return {"items": self.items[start:end], "metadata": {"continue": token}}
+
+
+def _reconciler(monkeypatch, known: set, **kwargs):
+    from src.reconciler import service
+
+    async def existing(column, values):
+        return known.intersection(values)
+
+    monkeypatch.setattr(service, "existing", existing)
+    options = {"grace_secs": 3600, "page_size": 2, "rate_per_sec": 1000}
+    return service.Reconciler(**(options | kwargs))
+
+
+def test_knative_orphans(monkeypatch):
+    from src.reconciler import service
+
+    custom_client = _StandInCustomObjects(
+        [
+            _service("orphan", OLD),
+            _service("live", OLD),
+            _service("young", RECENT),
+            # A pool instance claimed a moment ago, its function not yet recorded
+            _service("claimed", OLD, modified=RECENT),
+            _service("gone", OLD),
+        ]
+    )
+
+    async def delete_knative_service(k8s_client, name):
+        if name == "gone":
+            raise ApiException(status=404)
+        custom_client.deleted.append(name)
+
+    monkeypatch.setattr(service, "delete_knative_service", delete_knative_service)
+    reconciler = _reconciler(monkeypatch, known={"live"})
+    counts = service.OrphanCounts()
+
+    asyncio.run(reconciler.reconcile_knative_services(custom_client, counts))
+
+    assert custom_client.deleted == ["orphan"]
+    assert counts == service.OrphanCounts(found=2, deleted=2, failed=0)
+    # Only services this platform created, warm pool instances excepted
+    assert custom_client.selectors == {
+        "app.kubernetes.io/managed-by=faas-platform,!faas.platform/pool"
+    }
+
+
+def test_dry_run_deletes_nothing(monkeypatch):
+    from src.reconciler import service
+
+    custom_client = _StandInCustomObjects([_service("orphan", OLD)])
+    monkeypatch.setattr(
+        service, "delete_knative_service", lambda *args: custom_client.deleted.append(1)
+    )
+    reconciler = _reconciler(monkeypatch, known=set(), dry_run=True)
+    counts = service.OrphanCounts()
+
+    asyncio.run(reconciler.reconcile_knative_services(custom_client, counts))
+
+    assert custom_client.deleted == []
+    assert counts.found == 1 and counts.deleted == 0
+
+
+def test_max_deletes(monkeypatch):
+    from src.reconciler import service
+
+    custom_client = _StandInCustomObjects([_service(f"o{i}", OLD) for i in range(5)])
+
+    async def delete_knative_service(k8s_client, name):
+        custom_client.deleted.append(name)
+
+    monkeypatch.setattr(service, "delete_knative_service", delete_knative_service)
+    reconciler = _reconciler(monkeypatch, known=set(), max_deletes=3)
+    counts = service.OrphanCounts()
+
+    asyncio.run(reconciler.reconcile_knative_services(custom_client, counts))
+
+    assert custom_client.deleted == ["o0", "o1", "o2"]
+    assert counts.found == 5 and counts.deleted == 3
+
+
+def test_registry_orphans(monkeypatch):
+    from src.config import config
+    from src.reconciler import service
+
+    def artifact(digest, tags, pushed=OLD):
+        return {
+            "digest": digest,
+            "push_time": pushed,
+            "tags": [{"name": tag} for tag in tags] or None,
+        }
+
+    pages = [
+        [artifact("d1", ["live"]), artifact("d2", ["orphan"])],
+        [artifact("d3", []), artifact("d4", ["runtime"])],
+        [artifact("d5", ["young"], pushed=RECENT)],
+    ]
+    deleted = []
+
+    async def list_container_images(project, repository, page, page_size):
+        return pages[page - 1]
+
+    async def delete_container_image(project, repository, reference):
+        deleted.append(reference)
+
+    monkeypatch.setattr(service, "list_container_images", list_container_images)
+    monkeypatch.setattr(service, "delete_container_image", delete_container_image)
+    monkeypatch.setattr(
+        config, "PYTHON_RUNTIME_IMAGE", f"{config.CONTAINER_REGISTRY}:runtime"
+    )
+    reconciler = _reconciler(monkeypatch, known={"live"})
+    counts = service.OrphanCounts()
+
+    asyncio.run(reconciler.reconcile_registry(counts))
+
+    # Untagged artifacts go by digest, the runtime image stays
+    assert deleted == ["orphan", "d3"]
+    assert counts.deleted == 2
+
+
+def test_builder_pods(monkeypatch):
+    from src.reconciler import service
+
+    def pod(name, created, phase="Succeeded"):
+        return SimpleNamespace(
+            metadata=SimpleNamespace(name=name, creation_timestamp=created),
+            status=SimpleNamespace(phase=phase),
+        )
+
+    old, recent = NOW - timedelta(hours=2), NOW - timedelta(minutes=1)
+    monkeypatch.setattr(
+        service.container_service, "max_build_timeout_secs", lambda: 7200
+    )
+    deleted = []
+
+    class _CoreClient:
+        def list_namespaced_pod(self, namespace, label_selector, limit, _continue):
+            return SimpleNamespace(
+                items=[
+                    pod("python-1", old),
+                    pod("python-2", recent),
+                    pod("warm-python-abc", old),
+                    # Within the longest build timeout, the build may still push
+                    pod("python-3", old, phase="Running"),
+                    pod("python-4", NOW - timedelta(hours=4), phase="Pending"),
+                ],
+                metadata=SimpleNamespace(_continue=None),
+            )
+
+        def delete_namespaced_pod(self, name, namespace):
+            deleted.append(name)
+
+    reconciler = _reconciler(monkeypatch, known=set())
+    asyncio.run(
+        reconciler.reconcile_builder_pods(_CoreClient(), service.OrphanCounts())
+    )
+
+    assert deleted == ["python-1", "python-4"]
+
+
+def test_failed_deletes_counted(monkeypatch):
+    from src.reconciler import service
+
+    custom_client = _StandInCustomObjects(
+        [_service(name, OLD) for name in ("o1", "o2", "o3", "o4")]
+    )
+
+    async def delete_knative_service(k8s_client, name):
+        if name in ("o1", "o3"):
+            raise ApiException(status=500)
+        custom_client.deleted.append(name)
+
+    monkeypatch.setattr(service, "delete_knative_service", delete_knative_service)
+    reconciler = _reconciler(monkeypatch, known=set())
+    counts = service.OrphanCounts()
+
+    asyncio.run(reconciler.reconcile_knative_services(custom_client, counts))
+
+    # A failure is logged and counted, later pages are still reconciled
+    assert custom_client.deleted == ["o2", "o4"]
+    assert counts == service.OrphanCounts(found=4, deleted=2, failed=2)
+
+
+def test_rate_limiter():
+    from src.reconciler.service import RateLimiter
+
+    async def calls(n: int) -> float:
+        limiter = RateLimiter(50)
+        started = time.perf_counter()
+        await asyncio.gather(*(limiter.wait() for _ in range(n)))
+        return time.perf_counter() - started
+
+    # The first call goes right away, the others are spaced by 20ms
+    assert asyncio.run(calls(6)) >= 0.1
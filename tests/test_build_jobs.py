@@ -0,0 +1,140 @@
+import json
+from datetime import datetime, timezone
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.build import service, views
+from src.build.enums import BuildPhase
+from src.build.models import BuildJob
+from src.database import get_db_session, get_read_session
+from src.dependencies import http_session
+from src.function.views import router as function_router
+from src.k8s.dependencies import k8s_api_client
+
+HANDLER = "def handler(event, context):\n    return {}\n"
+
+
+class _StandInDb:
+    """Build jobs in memory, moving through `phases` one read at a time."""
+
+    def __init__(self, phases: list[BuildPhase] = ()):
+        self.jobs: dict[str, BuildJob] = {}
+        self.phases = list(phases)
+
+    def session(self) -> "_StandInSession":
+        return _StandInSession(self)
+
+
+class _StandInSession:
+    def __init__(self, db: _StandInDb):
+        self.db = db
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    def add(self, job: BuildJob):
+        self.db.jobs[job.id] = job
+
+    async def commit(self):
+        for job in self.db.jobs.values():
+            job.created_at = job.created_at or datetime.now(timezone.utc)
+
+    async def get(self, model, id: str) -> BuildJob | None:
+        job = self.db.jobs.get(id)
+        if job is not None and self.db.phases:
+            job.phase = self.db.phases.pop(0)
+        return job
+
+
+def _client(monkeypatch, db: _StandInDb) -> tuple[TestClient, list]:
+    """Function and job routes on the stand-in database, jobs never started."""
+
+    async def session():
+        yield db.session()
+
+    started = []
+    monkeypatch.setattr(service, "start", lambda job_id, *args: started.append(job_id))
+    monkeypatch.setattr(views, "async_session_factory", db.session)
+    monkeypatch.setattr(views, "EVENT_POLL_SECS", 0.01)
+
+    app = FastAPI()
+    app.include_router(views.router, prefix="/functions/jobs")
+    app.include_router(function_router, prefix="/functions")
+    app.dependency_overrides[get_db_session] = session
+    app.dependency_overrides[get_read_session] = session
+    app.dependency_overrides[k8s_api_client] = lambda: None
+    app.dependency_overrides[http_session] = lambda: None
+    return TestClient(app), started
+
+
+def _job(db: _StandInDb, phase: BuildPhase = BuildPhase.queued) -> BuildJob:
+    job = BuildJob(
+        id="job-unittest",
+        language="python",
+        phase=phase,
+        created_at=datetime.now(timezone.utc),
+    )
+    db.jobs[job.id] = job
+    return job
+
+
+def test_create_returns_queued_job(monkeypatch):
+    db = _StandInDb()
+    client, started = _client(monkeypatch, db)
+
+    response = client.post("/functions", json={"language": "python", "body": HANDLER})
+
+    assert response.status_code == 202
+    job = response.json()
+    assert job["phase"] == "queued"
+    assert job["function"] is None
+    # The build runs in the background of the job just recorded
+    assert started == [job["id"]]
+    assert list(db.jobs) == [job["id"]]
+    # Leased from the start, so the job fails if the replica dies before it runs
+    assert db.jobs[job["id"]].lease_expires_at is not None
+
+
+def test_get_job(monkeypatch):
+    db = _StandInDb()
+    client, _ = _client(monkeypatch, db)
+    _job(db, BuildPhase.builder_scheduled)
+
+    assert client.get("/functions/jobs/unknown").status_code == 404
+    response = client.get("/functions/jobs/job-unittest")
+    assert response.status_code == 200
+    assert response.json()["phase"] == "builder_scheduled"
+
+
+def test_job_events(monkeypatch):
+    # Phases seen by successive polls, with repeats while a phase lasts
+    db = _StandInDb(
+        [
+            BuildPhase.queued,
+            BuildPhase.queued,
+            BuildPhase.queued,
+            BuildPhase.context_uploaded,
+            BuildPhase.builder_scheduled,
+            BuildPhase.builder_scheduled,
+            BuildPhase.failed,
+            BuildPhase.healthy,
+        ]
+    )
+    client, _ = _client(monkeypatch, db)
+    _job(db)
+
+    assert client.get("/functions/jobs/unknown/events").status_code == 404
+    with client.stream("GET", "/functions/jobs/job-unittest/events") as response:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        body = response.read().decode()
+
+    events = [e for e in body.split("\n\n") if e]
+    assert all(e.startswith("event: phase\ndata: ") for e in events)
+    phases = [json.loads(e.split("data: ", 1)[1])["phase"] for e in events]
+    # One event per transition, closed at the first terminal phase
+    assert phases == ["queued", "context_uploaded", "builder_scheduled", "failed"]
+    assert db.phases == [BuildPhase.healthy]
@@ -0,0 +1,265 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from sqlalchemy.sql import Update
+
+from src.build import queue, service
+from src.build.enums import BuildPhase
+from src.build.models import BuildJob
+from src.build.queue import BuildQueue, QueuedBuild, estimate_wait, fair_order
+
+
+def _queue(*builds: tuple[str, str, int]) -> list[QueuedBuild]:
+    start = datetime.now(timezone.utc)
+    return [
+        QueuedBuild(id, tenant, priority, start + timedelta(seconds=i))
+        for i, (id, tenant, priority) in enumerate(builds)
+    ]
+
+
+def test_fair_order_alternates_tenants():
+    # A burst from tenant a arrives before a single build of tenant b
+    waiting = _queue(("a1", "a", 0), ("a2", "a", 0), ("a3", "a", 0), ("b1", "b", 0))
+
+    assert [b.id for b in fair_order(waiting, {})] == ["a1", "b1", "a2", "a3"]
+
+    # Tenants already running builds wait for the others
+    assert [b.id for b in fair_order(waiting, {"a": 2})] == ["b1", "a1", "a2", "a3"]
+
+
+def test_fair_order_priorities_first():
+    waiting = _queue(("a1", "a", 0), ("b1", "b", 0), ("b2", "b", 5), ("a2", "a", 5))
+
+    assert [b.id for b in fair_order(waiting, {})] == ["b2", "a2", "a1", "b1"]
+
+
+def test_estimate_wait():
+    # Four slots finishing a 60s build each: every four builds wait a minute
+    assert estimate_wait(1, 4, 60) == 15
+    assert estimate_wait(8, 4, 60) == 120
+
+
+class _StandInQueueDb:
+    """Build queue rows: waiting builds, running counts and admitted ids.
+
+    Updates aren't applied, only recorded for the tests to inspect.
+    """
+
+    def __init__(self, waiting=(), running=None, admitted=()):
+        self.waiting = list(waiting)
+        self.running = running or {}
+        self.admitted = set(admitted)
+        self.updates: list[str] = []
+        self.average_queries = 0
+
+    def session(self) -> "_StandInQueueSession":
+        return _StandInQueueSession(self)
+
+    def updated(self, column: str) -> list[list[str]]:
+        """Job ids of each update that set `column`, in order"""
+        return [ids for sql, ids in self.updates if f"SET {column}=" in sql]
+
+
+class _StandInQueueSession:
+    def __init__(self, db: _StandInQueueDb):
+        self.db = db
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def execute(self, query):
+        if isinstance(query, Update):
+            params = query.compile().params.values()
+            # One job by id, or many with IN
+            ids = [v for v in params if isinstance(v, str)]
+            ids = next((v for v in params if isinstance(v, list)), ids)
+            self.db.updates.append((str(query), ids))
+            return SimpleNamespace(rowcount=len(ids))
+        if query._group_by_clauses:
+            return SimpleNamespace(all=lambda: list(self.db.running.items()))
+        return list(self.db.waiting)
+
+    async def scalars(self, query):
+        ids = next(v for v in query.compile().params.values() if isinstance(v, list))
+        return [id for id in ids if id in self.db.admitted]
+
+    async def scalar(self, query):
+        self.db.average_queries += 1
+        return 30
+
+    async def commit(self):
+        pass
+
+
+def _stand_in_queue(monkeypatch, db: _StandInQueueDb, lock: bool = True):
+    @asynccontextmanager
+    async def advisory_lock(name):
+        yield lock
+
+    monkeypatch.setattr(queue, "async_session_factory", db.session)
+    monkeypatch.setattr(queue, "advisory_lock", advisory_lock)
+    return BuildQueue(max_concurrent=3, poll_secs=1, lease_secs=30)
+
+
+def test_dispatch_fills_free_slots_fairly(monkeypatch):
+    db = _StandInQueueDb(
+        waiting=_queue(("a1", "a", 0), ("a2", "a", 0), ("b1", "b", 0), ("c1", "c", 0)),
+        running={"a": 1},
+    )
+    build_queue = _stand_in_queue(monkeypatch, db)
+
+    admitted = asyncio.run(build_queue.dispatch())
+
+    # Two free slots, the tenants without running builds go first
+    assert admitted == ["b1", "c1"]
+    assert db.updated("admitted_at") == [["b1", "c1"]]
+
+
+def test_dispatch_without_free_slots(monkeypatch):
+    db = _StandInQueueDb(waiting=_queue(("a1", "a", 0)), running={"a": 2, "b": 1})
+    build_queue = _stand_in_queue(monkeypatch, db)
+
+    assert asyncio.run(build_queue.dispatch()) == []
+    assert db.updated("admitted_at") == []
+
+
+def test_tick_renews_leases_and_wakes_admitted(monkeypatch):
+    db = _StandInQueueDb(admitted={"j1"})
+    # Another replica holds the dispatch lock
+    build_queue = _stand_in_queue(monkeypatch, db, lock=False)
+    dispatches = []
+    monkeypatch.setattr(build_queue, "dispatch", lambda: dispatches.append(1))
+
+    async def tick() -> dict:
+        loop = asyncio.get_running_loop()
+        build_queue._waiting = {"j1": loop.create_future(), "j2": loop.create_future()}
+        waiting = dict(build_queue._waiting)
+        build_queue._leased = {"j1", "j2"}
+        await build_queue.tick()
+        await build_queue.tick()
+        return waiting
+
+    waiting = asyncio.run(tick())
+
+    assert waiting["j1"].done() and not waiting["j2"].done()
+    assert list(build_queue._waiting) == ["j2"]
+    assert dispatches == []
+    # Leases are renewed once per third of their duration, not every tick
+    assert [sorted(ids) for ids in db.updated("lease_expires_at")] == [["j1", "j2"]]
+
+
+def test_slot_enqueues_waits_and_releases(monkeypatch):
+    db = _StandInQueueDb()
+    build_queue = _stand_in_queue(monkeypatch, db, lock=False)
+    monkeypatch.setattr(build_queue, "dispatch", lambda: None)
+    entered = []
+
+    async def build():
+        async with build_queue.slot("j1"):
+            entered.append("j1")
+
+    async def run():
+        task = asyncio.create_task(build())
+        await asyncio.sleep(0.01)
+        await build_queue.tick()
+        assert entered == []
+
+        db.admitted.add("j1")
+        await build_queue.tick()
+        await task
+
+    asyncio.run(run())
+
+    assert entered == ["j1"]
+    assert db.updated("enqueued_at") == [["j1"]]
+    assert db.updated("released_at") == [["j1"]]
+    # The slot leaves the job's lease alone, it outlives the build
+    assert db.updated("lease_expires_at") == []
+    assert not build_queue._waiting
+
+
+def test_lease_renewed_until_job_ends(monkeypatch):
+    db = _StandInQueueDb()
+    build_queue = _stand_in_queue(monkeypatch, db, lock=False)
+    monkeypatch.setattr(build_queue, "dispatch", lambda: None)
+    db.admitted.add("j1")
+
+    async def job():
+        async with build_queue.lease("j1"):
+            async with build_queue.slot("j1"):
+                pass
+            # Deploying and waiting for health after the slot was released,
+            # a third of the lease later
+            build_queue._renewed_at = 0
+            await build_queue.tick()
+            assert build_queue._leased == {"j1"}
+
+    async def run():
+        task = asyncio.create_task(job())
+        await asyncio.sleep(0.01)
+        await build_queue.tick()
+        await task
+
+    asyncio.run(run())
+
+    assert db.updated("released_at") == [["j1"]]
+    # Renewed past the slot, then ended with the job
+    renewals = [sql for sql, _ in db.updates if "SET lease_expires_at=" in sql]
+    assert len(renewals) == 3
+    assert all("now() +" in sql for sql in renewals[:2])
+    assert "now() +" not in renewals[2]
+    assert not build_queue._leased
+
+
+def test_fail_abandoned(monkeypatch):
+    db = _StandInQueueDb()
+    build_queue = _stand_in_queue(monkeypatch, db)
+
+    asyncio.run(build_queue.fail_abandoned())
+
+    # Any unfinished job with a lapsed lease, whichever phase it was in
+    ((sql, _),) = db.updates
+    assert "SET phase=" in sql
+    assert "lease_expires_at <= now()" in sql
+    assert "phase NOT IN" in sql
+
+
+def test_average_build_secs_cached(monkeypatch):
+    db = _StandInQueueDb()
+    queue._average_build_secs.invalidate("average")
+
+    async def averages():
+        return [await queue.average_build_secs(db.session()) for _ in range(3)]
+
+    try:
+        assert asyncio.run(averages()) == [30.0, 30.0, 30.0]
+        assert db.average_queries == 1
+    finally:
+        queue._average_build_secs.invalidate("average")
+
+
+def test_queue_status_only_while_queued(monkeypatch):
+    calls = []
+
+    async def queue_status(db_session, job):
+        calls.append(job.phase)
+        return 2, 15.0
+
+    monkeypatch.setattr(service, "queue_status", queue_status)
+    now = datetime.now(timezone.utc)
+
+    async def response(phase: BuildPhase):
+        job = BuildJob(id="j1", language="python", phase=phase, created_at=now)
+        return await service.to_response(None, job)
+
+    queued = asyncio.run(response(BuildPhase.queued))
+    building = asyncio.run(response(BuildPhase.builder_scheduled))
+
+    assert (queued.queue_position, queued.estimated_wait_secs) == (2, 15.0)
+    assert building.queue_position is None
+    assert calls == [BuildPhase.queued]
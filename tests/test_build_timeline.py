@@ -0,0 +1,93 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from src.build.enums import TimelinePhase
+from src.build.timeline import Timeline
+
+
+def _builder_pod(created: datetime, scheduled: datetime, started: datetime, done):
+    return SimpleNamespace(
+        metadata=SimpleNamespace(creation_timestamp=created),
+        status=SimpleNamespace(
+            conditions=[
+                SimpleNamespace(type="Initialized", last_transition_time=created),
+                SimpleNamespace(type="PodScheduled", last_transition_time=scheduled),
+            ],
+            container_statuses=[
+                SimpleNamespace(
+                    state=SimpleNamespace(
+                        terminated=SimpleNamespace(started_at=started, finished_at=done)
+                    )
+                )
+            ],
+        ),
+    )
+
+
+def test_phase_records_completed_blocks():
+    timeline = Timeline()
+    with timeline.phase(TimelinePhase.knative_ready):
+        pass
+    with pytest.raises(RuntimeError):
+        with timeline.phase(TimelinePhase.first_healthy):
+            raise RuntimeError()
+
+    assert list(timeline.phases) == [TimelinePhase.knative_ready]
+    started_at, finished_at = timeline.phases[TimelinePhase.knative_ready]
+    assert started_at <= finished_at
+
+
+def test_add_builder_pod():
+    created = datetime(2026, 10, 18, 12, 0, 0, tzinfo=timezone.utc)
+    scheduled = created + timedelta(seconds=2)
+    started = scheduled + timedelta(seconds=5)
+    done = started + timedelta(seconds=40)
+
+    timeline = Timeline()
+    timeline.add_builder_pod(_builder_pod(created, scheduled, started, done))
+
+    assert timeline.phases == {
+        TimelinePhase.pod_scheduled: (created, scheduled),
+        TimelinePhase.pod_running: (scheduled, started),
+        TimelinePhase.image_pushed: (started, done),
+    }
+
+
+def test_add_builder_pod_without_status():
+    pod = SimpleNamespace(
+        metadata=SimpleNamespace(creation_timestamp=datetime.now(timezone.utc)),
+        status=SimpleNamespace(conditions=None, container_statuses=None),
+    )
+    timeline = Timeline()
+    timeline.add_builder_pod(pod)
+
+    assert timeline.phases == {}
+
+
+def test_phase_percentiles_query():
+    from src.build import timeline
+
+    captured = []
+
+    class _Session:
+        async def execute(self, query):
+            captured.append(query)
+            return [
+                (TimelinePhase.first_healthy, 3, 0.2, 0.5, 0.6),
+                (TimelinePhase.context_upload, 3, 0.1, 0.3, 0.4),
+            ]
+
+    results = asyncio.run(timeline.phase_percentiles(_Session(), 3600))
+
+    # Pipeline order, whatever order the database returns
+    assert [r.phase for r in results] == [
+        TimelinePhase.context_upload,
+        TimelinePhase.first_healthy,
+    ]
+    assert results[0].p95_secs == 0.3
+    sql = str(captured[0].compile(dialect=postgresql.dialect()))
+    assert "percentile_cont" in sql and "WITHIN GROUP" in sql
@@ -0,0 +1,10 @@
+from src.database import lock_key
+
+
+def test_lock_key():
+    key = lock_key("function_delete_expired")
+
+    # Stable across processes and within PostgreSQL's bigint range
+    assert key == lock_key("function_delete_expired")
+    assert -(2**63) <= key < 2**63
+    assert key != lock_key("another_job")
@@ -0,0 +1,62 @@
+import pytest
+
+from src.manifests import ManifestTemplate, ManifestTemplateError, set_path
+
+TEMPLATE = """
+apiVersion: v1
+kind: Pod
+metadata:
+  name: REPLACE_TAG
+spec:
+  containers:
+    - image: REPLACE_REGISTRY:REPLACE_TAG
+      args: ["--tag=REPLACE_TAG"]
+"""
+
+
+@pytest.fixture
+def template_path(tmp_path):
+    path = tmp_path / "pod.yaml"
+    path.write_text(TEMPLATE)
+    return str(path)
+
+
+def test_render(template_path):
+    template = ManifestTemplate(template_path, placeholders=("tag", "registry"))
+
+    manifest = template.render(
+        tag="unittest",
+        registry="docker.io",
+        patches={"spec.containers.0.resources": {"limits": {"cpu": "1"}}},
+    )
+    container = manifest["spec"]["containers"][0]
+    assert manifest["metadata"]["name"] == "unittest"
+    assert container["image"] == "docker.io:unittest"
+    assert container["args"] == ["--tag=unittest"]
+    assert container["resources"] == {"limits": {"cpu": "1"}}
+
+    # Renders never share state with each other or the cached template
+    other = template.render(tag="other", registry="docker.io")
+    assert other["metadata"]["name"] == "other"
+    assert "resources" not in other["spec"]["containers"][0]
+
+
+def test_placeholders_validated(template_path):
+    with pytest.raises(ManifestTemplateError, match="REPLACE_REGISTRY"):
+        ManifestTemplate(template_path, placeholders=("tag",))
+    with pytest.raises(ManifestTemplateError, match="REPLACE_CONTEXT"):
+        ManifestTemplate(template_path, placeholders=("tag", "registry", "context"))
+
+    template = ManifestTemplate(template_path, placeholders=("tag", "registry"))
+    with pytest.raises(ManifestTemplateError):
+        template.render(tag="unittest")
+
+
+def test_set_path_merges_mappings():
+    manifest = {"metadata": {"annotations": {"a": "1"}}}
+
+    set_path(manifest, "metadata.annotations", {"b": "2"})
+    set_path(manifest, "spec.template.metadata.labels", {"c": "3"})
+
+    assert manifest["metadata"]["annotations"] == {"a": "1", "b": "2"}
+    assert manifest["spec"]["template"]["metadata"]["labels"] == {"c": "3"}
@@ -0,0 +1,40 @@
+import asyncio
+
+import pytest
+
+from src.retry import backoff_delay, retry
+
+
+def test_backoff_delay_is_capped():
+    for attempt in range(10):
+        assert 0 <= backoff_delay(attempt, base_delay=0.5, max_delay=4) <= 4
+
+
+def test_retry_until_success():
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise RuntimeError("unittest")
+        return "ok"
+
+    assert asyncio.run(retry(flaky, attempts=3, base_delay=0)) == "ok"
+    assert len(calls) == 3
+
+
+def test_retry_gives_up():
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        raise ValueError("unittest")
+
+    # Errors rejected by retry_on are raised on the first attempt
+    with pytest.raises(ValueError):
+        asyncio.run(retry(failing, attempts=3, retry_on=lambda e: False))
+    assert len(calls) == 1
+
+    with pytest.raises(ValueError):
+        asyncio.run(retry(failing, attempts=3, base_delay=0))
+    assert len(calls) == 4
@@ -0,0 +1,71 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+from sqlalchemy.dialects import postgresql
+
+from src import scheduler
+
+
+def _stand_in(monkeypatch, lock: bool, claims: list[bool]) -> list:
+    """leader_only with a stand-in lock and run records, returns the claims made"""
+    claimed = []
+
+    @asynccontextmanager
+    async def advisory_lock(name):
+        yield lock
+
+    async def claim_run(name, interval_secs):
+        claimed.append((name, interval_secs))
+        return claims.pop(0)
+
+    monkeypatch.setattr(scheduler, "advisory_lock", advisory_lock)
+    monkeypatch.setattr(scheduler, "claim_run", claim_run)
+    return claimed
+
+
+def test_leader_only_runs_once_per_interval(monkeypatch):
+    # Two replicas tick within the interval, the second finds the first's run
+    claimed = _stand_in(monkeypatch, lock=True, claims=[True, False])
+
+    @scheduler.leader_only("unittest", interval_secs=60)
+    async def job():
+        return "ran"
+
+    assert asyncio.run(job()) == "ran"
+    assert asyncio.run(job()) is None
+    assert claimed == [("unittest", 60), ("unittest", 60)]
+
+
+def test_leader_only_skips_without_lock(monkeypatch):
+    claimed = _stand_in(monkeypatch, lock=False, claims=[True])
+
+    @scheduler.leader_only("unittest", interval_secs=60)
+    async def job():
+        return "ran"
+
+    assert asyncio.run(job()) is None
+    assert claimed == []
+
+
+def test_leader_only_without_interval(monkeypatch):
+    # Jobs triggered on demand only guard against overlapping runs
+    claimed = _stand_in(monkeypatch, lock=True, claims=[])
+
+    @scheduler.leader_only("unittest")
+    async def job():
+        return "ran"
+
+    assert asyncio.run(job()) == "ran"
+    assert claimed == []
+
+
+def test_claim_run_query():
+    query = scheduler.claim_run_query("unittest", 100)
+    sql = str(query.compile(dialect=postgresql.dialect()))
+
+    # Runs are only recorded once 90% of the interval passed on the DB clock
+    assert "ON CONFLICT (name) DO UPDATE SET last_run_at = now()" in sql
+    assert "WHERE scheduled_job_run.last_run_at <= now() - " in sql
+    assert "RETURNING scheduled_job_run.name" in sql
+    params = query.compile(dialect=postgresql.dialect()).params
+    assert [v.total_seconds() for k, v in params.items() if k != "name"] == [90]